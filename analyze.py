@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+    Tarkov Item Price Analyzer - Batch Analyzer
+    ~~~~~~~~~~
+
+    Runs a directory or archive (.zip/.tar) of screenshots through the
+    MessageFunc pipeline on every core, headless, and writes one JSON line
+    per screenshot with the item name, prices, quests and stage timings.
+
+    Mouse positions come from a screens.jsonl manifest next to the images
+    ({"image": "name.png", "mouse": {"x": 1190, "y": 594}}), from file names
+    like name_x1190_y594.png, or from --mouse for everything else.
+
+    Usage:
+        python analyze.py SCREENSHOTS [--output results.jsonl] [--workers N] [--mouse X,Y]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+"""
+
+import argparse
+import io
+import json
+import os
+import queue as q
+import re
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import freeze_support
+from typing import Callable
+
+from PIL import Image
+
+from logger_config import configure_worker_logging, log_queue, logger
+from pkg.config import configure_tesseract
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+MOUSE_IN_NAME = re.compile(r"_x(\d+)_y(\d+)\.\w+$")
+# Screenshots read ahead per worker, the rest stay on disk until a worker is free
+IN_FLIGHT_PER_WORKER = 2
+
+
+def read_screens(path: str, default_mouse: dict | None) -> tuple[list[dict], Callable[[str], bytes]]:
+    '''
+    the screenshots to analyze with their mouse position, and how to read the image of one
+    '''
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        read = lambda name: read_file(os.path.join(path, name))  # noqa: E731
+        manifest_data = read("screens.jsonl") if os.path.exists(os.path.join(path, "screens.jsonl")) else b""
+    elif zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        members = {os.path.basename(name): name for name in archive.namelist()}
+        names = sorted(name for name in members if name.lower().endswith(IMAGE_EXTENSIONS))
+        read = lambda name: archive.read(members[name])  # noqa: E731
+        manifest_data = read("screens.jsonl") if "screens.jsonl" in members else b""
+    elif tarfile.is_tarfile(path):
+        archive = tarfile.open(path)
+        members = {os.path.basename(member.name): member for member in archive.getmembers() if member.isfile()}
+        names = sorted(name for name in members if name.lower().endswith(IMAGE_EXTENSIONS))
+        read = lambda name: archive.extractfile(members[name]).read()  # noqa: E731
+        manifest_data = read("screens.jsonl") if "screens.jsonl" in members else b""
+    else:
+        raise ValueError(f"{path} is not a directory, zip or tar archive")
+
+    manifest = {}
+    for line in manifest_data.decode().splitlines():
+        if line.strip():
+            entry = json.loads(line)
+            manifest[entry["image"]] = entry["mouse"]
+
+    screens = []
+    for name in names:
+        mouse = manifest.get(name)
+        match = MOUSE_IN_NAME.search(name)
+        if mouse is None and match:
+            mouse = {"x": int(match.group(1)), "y": int(match.group(2))}
+        if mouse is None:
+            mouse = default_mouse
+        if mouse is None:
+            logger.warning("No mouse position for %s, skipping it", name)
+            continue
+        screens.append({"image": name, "mouse": mouse})
+    return screens, read
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as image_file:
+        return image_file.read()
+
+
+def init_worker(queue, level: int) -> None:
+    configure_worker_logging(queue, level)
+    configure_tesseract()
+
+
+def analyze_screen(screen: dict) -> dict:
+    '''
+    one lookup through the regular MessageFunc.run, the popup message becomes the result
+    '''
+    import cv2
+    import pytesseract
+
+    from pkg.messages import ERROR, error_message, item_record
+    from pkg.TIPA import MessageFunc, remove_prefix
+
+    start = time.perf_counter()
+    job = None
+    messages = q.SimpleQueue()
+    result = {"image": screen["image"], "mouse": screen["mouse"], "item": None, "error": None}
+    try:
+        with Image.open(io.BytesIO(screen["data"])) as img:
+            img.load()
+        job = MessageFunc(img, screen["mouse"], {})
+        job.run(threading.Lock(), messages)
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError, OSError, cv2.error) as e:
+        # One broken screenshot or a missing OCR engine shouldn't take down the whole batch
+        logger.error("Couldn't analyze %s: %s", screen["image"], e)
+        messages.put(error_message(f"{type(e).__name__}: {e}", {}))
+    except Exception as e:
+        # Nor should a page the scrapers didn't expect
+        logger.exception("Failed to analyze %s: %s", screen["image"], e)
+        messages.put(error_message(f"{type(e).__name__}: {e}", {}))
+
+    message = None if messages.empty() else messages.get()
+    if message is None:
+        result["error"] = "No result"
+    elif message.kind == ERROR:
+        result["error"] = remove_prefix(message.text, "ERROR: ")
+    else:
+        result.update(item_record(message.info))
+
+    result["timings"] = job.timings if job is not None else {}
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("screenshots", help="directory, .zip or .tar of screenshots")
+    parser.add_argument("--output", help="JSONL file to write, stdout by default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes, all cores by default")
+    parser.add_argument("--mouse", help="X,Y mouse position for screenshots without one")
+    args = parser.parse_args()
+
+    default_mouse = None
+    if args.mouse:
+        x, y = args.mouse.split(",")
+        default_mouse = {"x": int(x), "y": int(y)}
+
+    screens, read = read_screens(args.screenshots, default_mouse)
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=init_worker,
+        initargs=(log_queue, logger.level),
+    ) as pool:
+        # Only a few images are read ahead, so memory stays flat however many screenshots there are
+        pending = iter(screens)
+        running = set()
+        while True:
+            for screen in pending:
+                running.add(pool.submit(analyze_screen, {**screen, "data": read(screen["image"])}))
+                if len(running) >= args.workers * IN_FLIGHT_PER_WORKER:
+                    break
+            if not running:
+                break
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                failed += result["error"] is not None
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+
+    elapsed = time.perf_counter() - start
+    if output is not sys.stdout:
+        output.close()
+
+    print(
+        f"{len(screens)} screenshots in {elapsed:.1f}s with {args.workers} workers: "
+        f"{len(screens) / elapsed:.2f} items/s, {failed} failed",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
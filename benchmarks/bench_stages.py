@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Stage Benchmarks
+    ~~~~~~~~~~
+
+    Times every MessageFunc stage on the checked-in fixtures, without a
+    display or network, and compares the best times with the stored baselines.
+    Exits with 1 when a stage regressed by more than the threshold.
+    OCR is skipped when tesseract isn't installed.
+
+    Run from the repository root:
+        python -m benchmarks.bench_stages [--threshold 0.25] [--update-baseline]
+
+    Baselines are machine specific, update them on the box that runs the check.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+import pytesseract
+import requests
+from PIL import Image
+
+from pkg.history import PriceHistory
+from pkg.stash import detect_tiles, read_short_names
+from pkg.TIPA import MessageFunc, to_cv_image
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+# Size of the price history the analytics are timed on
+HISTORY_ITEMS = 3000
+HISTORY_ROWS = 200_000
+
+
+def best_time(func: Callable, repeat: int) -> float:
+    '''
+    fastest of the timed runs, the least noisy estimate for a micro-benchmark
+    '''
+    func()  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def load_response(name: str) -> requests.Response:
+    '''
+    a saved page as if it was just fetched
+    '''
+    response = requests.Response()
+    response.status_code = 200
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as page_file:
+        response._content = page_file.read()
+    return response
+
+
+def load_screens() -> list[dict]:
+    with open(os.path.join(FIXTURES_DIR, "screens.jsonl")) as manifest_file:
+        return [json.loads(line) for line in manifest_file if line.strip()]
+
+
+def has_tesseract() -> bool:
+    try:
+        pytesseract.get_tesseract_version()
+    except (pytesseract.TesseractNotFoundError, OSError):
+        return False
+    return True
+
+
+def run_benchmarks(repeat: int) -> dict[str, float]:
+    results = {}
+    ocr = has_tesseract()
+    if not ocr:
+        print("tesseract not found, skipping the ocr stage")
+
+    for screen in load_screens():
+        name = os.path.splitext(screen["image"])[0]
+        with Image.open(os.path.join(FIXTURES_DIR, screen["image"])) as img:
+            img.load()
+        job = MessageFunc(img, screen["mouse"], {})
+
+        results[f"classify/{name}"] = best_time(job.classify_screen, repeat)
+        is_inventory = job.classify_screen()
+        results[f"search_areas/{name}"] = best_time(lambda: job.get_search_areas(is_inventory), repeat)
+        results[f"crop/{name}"] = best_time(lambda: job.crop_search_areas(is_inventory), repeat)
+        crops = job.crop_search_areas(is_inventory)
+        results[f"localize/{name}"] = best_time(lambda: job.process_image(1, crops, is_inventory), repeat)
+
+        image = job.process_image(1, crops, is_inventory)
+        if ocr and image is not None:
+            results[f"ocr/{name}"] = best_time(lambda: job.extract_words(image), max(repeat // 10, 3))
+
+    stash_dir = os.path.join(FIXTURES_DIR, "stash")
+    for stash_name in sorted(os.listdir(stash_dir)):
+        if not stash_name.endswith(".png"):
+            continue
+        name = os.path.splitext(stash_name)[0]
+        with Image.open(os.path.join(stash_dir, stash_name)) as img:
+            image = to_cv_image(img.convert("RGB"))
+        results[f"stash_grid/{name}"] = best_time(lambda: detect_tiles(image), max(repeat // 5, 3))
+        if ocr:
+            tiles = detect_tiles(image)
+            results[f"stash_ocr/{name}"] = best_time(lambda: read_short_names(image, tiles), 3)
+
+    job = MessageFunc(None, {}, {})
+    with open(os.path.join(FIXTURES_DIR, "ocr_samples.txt")) as samples_file:
+        samples = [line.strip() for line in samples_file if line.strip()]
+    # Every other word read with little confidence, about as bad as real misreads get
+    readings = [[(word, 50.0 if idx % 2 else 95.0) for idx, word in enumerate(text.split())] for text in samples]
+    results["clean_words"] = best_time(lambda: [job.clean_words(words) for words in readings], repeat)
+    scored = [job.clean_words(words) for words in readings]
+    wordlists = [[word for word, _ in words] for words in scored]
+    results["correct_text"] = best_time(lambda: [job.correct_text(words) for words in wordlists], repeat)
+    results["best_reading"] = best_time(lambda: [job.best_reading(words) for words in scored], max(repeat // 10, 3))
+
+    market_page = load_response("tarkov_market.html")
+    for wiki_name in ("gamepedia", "gamepedia_quest"):
+        wiki_page = load_response(f"{wiki_name}.html")
+        results[f"parse_pages/{wiki_name}"] = best_time(
+            lambda: job.parse_pages(market_page, wiki_page, "Salewa first aid kit"), repeat,
+        )
+    market_info = job.parse_pages(market_page, load_response("gamepedia.html"), "Salewa first aid kit")
+
+    # The columns stay mapped until the history is collected, which Windows won't delete
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as history_dir:
+        history = PriceHistory(history_dir)
+        rng = np.random.default_rng(0)
+        names = [f"item {idx}" for idx in range(HISTORY_ITEMS)]
+        rows = rng.integers(0, HISTORY_ITEMS, HISTORY_ROWS)
+        history.extend(
+            [names[idx] for idx in rows], rng.uniform(1e3, 1e5, HISTORY_ROWS), np.nan,
+            rng.uniform(1e3, 5e4, HISTORY_ROWS), at=time.time() - np.sort(rng.uniform(0, 14 * 24 * 3600, HISTORY_ROWS))[::-1],
+        )
+        results["history/record"] = best_time(lambda: history.record(market_info), repeat)
+        results["history/summary"] = best_time(lambda: history.summary(names[0], "Therapist"), repeat)
+        results["history/analyze_all"] = best_time(history.analyze, max(repeat // 5, 3))
+
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per stage")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="slowdowns under this many ms are noise")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baselines")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+
+    baselines = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH) as baselines_file:
+            baselines = json.load(baselines_file)
+
+    regressions = []
+    print(f"{'stage':<36}{'best ms':>12}{'baseline ms':>13}{'change':>9}")
+    for stage, best in results.items():
+        baseline = baselines.get(stage)
+        if baseline:
+            change = best / baseline - 1
+            print(f"{stage:<36}{best * 1000:>12.3f}{baseline * 1000:>13.3f}{change:>+9.0%}")
+            if change > args.threshold and (best - baseline) * 1000 > args.min_delta:
+                regressions.append(stage)
+        else:
+            print(f"{stage:<36}{best * 1000:>12.3f}{'n/a':>13}{'n/a':>9}")
+
+    if args.update_baseline:
+        with open(BASELINES_PATH, "w") as baselines_file:
+            json.dump(results, baselines_file, indent=2, sort_keys=True)
+            baselines_file.write("\n")
+        print(f"Baselines written to {BASELINES_PATH}")
+        return 0
+
+    if regressions:
+        print(f"FAIL: {', '.join(regressions)} regressed by more than {args.threshold:.0%}")
+        return 1
+
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
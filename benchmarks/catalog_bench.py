@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Catalog Benchmark
+    ~~~~~~~~~~
+
+    Load time, lookup time and memory per worker process of the binary item
+    catalog against the same items loaded from JSON into dicts. Uses a
+    synthetic catalog unless a saved tarkov.dev response is given.
+
+    Run from the repository root:
+        python -m benchmarks.catalog_bench [--items 5000] [--workers 3] [--source items.json]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+from multiprocessing import Process, Queue, freeze_support
+
+import psutil
+
+from pkg.catalog import Catalog, build_catalog, name_key
+
+
+def synthetic_items(count: int, seed: int = 0) -> list[dict]:
+    '''
+    items in the CATALOG_QUERY shape with names about as long as the real ones
+    '''
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(2000)]
+    items = []
+    for idx in range(count):
+        name = " ".join(rng.choices(words, k=rng.randint(2, 6))).capitalize() + f" {idx}"
+        items.append({
+            "id": f"{rng.getrandbits(96):024x}",
+            "name": name,
+            "shortName": f"{name.split()[0][:5]}{idx}",
+            "normalizedName": name.lower().replace(" ", "-"),
+            "wikiLink": "https://escapefromtarkov.fandom.com/wiki/" + name.replace(" ", "_"),
+            "basePrice": rng.randint(100, 500000),
+            "width": rng.randint(1, 5),
+            "height": rng.randint(1, 5),
+            "types": rng.choice([["barter"], ["ammo"], ["noFlea", "keys"], []]),
+            "usedInTasks": [{"id": "task"}] if rng.random() < 0.1 else [],
+        })
+    return items
+
+
+def load_json(path: str) -> dict[str, dict]:
+    '''
+    what every worker would do without the catalog
+    '''
+    with open(path, encoding="utf-8") as items_file:
+        items = json.load(items_file)["items"]
+    by_name = {name_key(item["name"]): item for item in items}
+    by_name.update({name_key(item["shortName"]): item for item in items})
+    return by_name
+
+
+def best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def worker_memory(kind: str, path: str, names: list[str], results: Queue) -> None:
+    '''
+    memory a worker process holds privately after loading the items and looking all of them up
+    '''
+    process = psutil.Process()
+    before = process.memory_full_info().uss
+    if kind == "json":
+        items = load_json(path)
+        found = sum(name_key(name) in items for name in names)
+    else:
+        catalog = Catalog(path)
+        found = sum(catalog.by_name(name) is not None for name in names)
+    results.put((kind, process.memory_full_info().uss - before, found))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000, help="synthetic items")
+    parser.add_argument("--workers", type=int, default=3, help="processes loading the items at once")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--source", help="saved response of CATALOG_QUERY instead of synthetic items")
+    args = parser.parse_args()
+
+    if args.source:
+        with open(args.source, encoding="utf-8") as source_file:
+            data = json.load(source_file)
+        items = data["data"]["items"] if "data" in data else data["items"]
+    else:
+        items = synthetic_items(args.items)
+    names = [item["name"] for item in items]
+
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as directory:
+        json_path = os.path.join(directory, "items.json")
+        catalog_path = os.path.join(directory, "catalog.bin")
+        with open(json_path, "w", encoding="utf-8") as items_file:
+            json.dump({"items": items}, items_file)
+
+        start = time.perf_counter()
+        size = build_catalog(items, catalog_path)
+        print(f"{len(items)} items, catalog {size / 1024:.0f} KB built in {time.perf_counter() - start:.2f}s, "
+              f"JSON {os.path.getsize(json_path) / 1024:.0f} KB")
+
+        catalog = Catalog(catalog_path)
+        by_name = load_json(json_path)
+        sample = random.Random(1).sample(names, min(1000, len(names)))
+        print(f"{'':<20}{'load ms':>10}{'lookup us':>12}")
+        print("{:<20}{:>10.2f}{:>12.2f}".format(
+            "json + dicts", best_time(lambda: load_json(json_path), args.repeat) * 1000,
+            best_time(lambda: [by_name.get(name_key(name)) for name in sample], args.repeat) / len(sample) * 1e6,
+        ))
+        print("{:<20}{:>10.2f}{:>12.2f}".format(
+            "catalog", best_time(lambda: Catalog(catalog_path), args.repeat) * 1000,
+            best_time(lambda: [catalog.by_name(name) for name in sample], args.repeat) / len(sample) * 1e6,
+        ))
+
+        print(f"\nPrivate memory per worker, {args.workers} workers at once")
+        for kind, path in (("json", json_path), ("catalog", catalog_path)):
+            results = Queue()
+            workers = [Process(target=worker_memory, args=(kind, path, names, results)) for _ in range(args.workers)]
+            for worker in workers:
+                worker.start()
+            rows = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            mean_uss = sum(row[1] for row in rows) / len(rows)
+            print(f"{kind:<20}{mean_uss / 2**20:>10.1f} MB   {rows[0][2]} of {len(names)} names found")
+
+
+if __name__ == "__main__":
+    freeze_support()
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Icon Benchmark
+    ~~~~~~~~~~
+
+    Accuracy and time of identifying hovered items by their icon. Indexes a
+    set of synthetic item icons, draws them into stash screens at several
+    resolutions with the name box over the hovered tile, and counts how
+    often the right item, a wrong item or no item (the OCR fallback) comes
+    back. Half of the stash is filled with items missing from the index,
+    those must never match.
+
+    Run from the repository root:
+        python -m benchmarks.icon_bench [--items 3000] [--seeds 4]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import random
+import statistics
+import time
+
+from PIL import Image, ImageDraw
+
+from benchmarks.synthetic import TILE_TINTS, draw_tooltip, stash_layout, stash_screenshot
+from benchmarks.make_fixtures import STASH_TILES
+from pkg.geometry import geometry_for
+from pkg.icons import build_index, identify
+from pkg.TIPA import to_cv_image
+
+
+# Pixels per cell of the grid images the index is built from
+ICON_CELL = 64
+RESOLUTIONS = ((1920, 1080), (2560, 1440), (3840, 2160))
+
+
+def item_icon(width: int, height: int, rng: random.Random) -> Image:
+    '''
+    a grid image of width x height cells, random shapes standing in for the item on a tinted background
+    '''
+    size = (width * ICON_CELL, height * ICON_CELL)
+    icon = Image.new("RGB", size, rng.choice(TILE_TINTS))
+    draw = ImageDraw.Draw(icon)
+    # The item fills most of the tile but keeps clear of its border like the game's icons do
+    for _ in range(rng.randint(6, 12)):
+        points = [(rng.randint(8, size[0] - 8), rng.randint(16, size[1] - 8)) for _ in range(rng.randint(3, 5))]
+        draw.polygon(points, fill=tuple(rng.randint(40, 200) for _ in range(3)))
+    return icon
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=3000, help="icons in the index")
+    parser.add_argument("--seeds", type=int, default=4, help="stash screens per resolution")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    shapes = sorted({(w, h) for _, _, w, h, _ in STASH_TILES})
+    icons = {}
+    for number in range(args.items):
+        w, h = rng.choice(shapes)
+        icons[f"Item {number}"] = item_icon(w, h, rng)
+
+    start = time.perf_counter()
+    index = build_index([(name, to_cv_image(icon)) for name, icon in icons.items()])
+    print(f"Indexed {len(index)} icons in {time.perf_counter() - start:.2f}s")
+
+    counts = {"right": 0, "wrong": 0, "fallback": 0, "unknown matched": 0, "unknown fallback": 0}
+    times = []
+    for size in RESOLUTIONS:
+        x0, y0, cell, _ = stash_layout(size)
+        geometry = geometry_for(size)
+        for seed in range(args.seeds):
+            stash = stash_screenshot(size, STASH_TILES, seed)
+            tiles = []
+            for column, row, w, h, _ in STASH_TILES:
+                # Every other tile holds an item the index doesn't know
+                known = rng.random() < 0.5
+                if known:
+                    name = rng.choice([name for name, icon in icons.items() if icon.size == (w * ICON_CELL, h * ICON_CELL)])
+                    icon = icons[name]
+                else:
+                    name, icon = None, item_icon(w, h, rng)
+                left, top = x0 + column * cell, y0 + row * cell
+                stash.paste(icon.resize((w * cell - 1, h * cell - 1), Image.Resampling.LANCZOS), (left + 1, top + 1))
+                tiles.append((name, left, top, w * cell, h * cell))
+
+            for name, left, top, width, height in tiles:
+                mouse = {"x": left + rng.randint(3, width - 3), "y": top + rng.randint(3, height - 3)}
+                screen = stash.copy()
+                draw_tooltip(screen, (mouse["x"], mouse["y"]), "Some item name", geometry.scale)
+
+                start = time.perf_counter()
+                area = geometry.icon_search_area(mouse)
+                match = identify(to_cv_image(screen.crop(area)), mouse["x"] - area[0], mouse["y"] - area[1], index, geometry)
+                times.append(time.perf_counter() - start)
+
+                if name is None:
+                    counts["unknown matched" if match is not None else "unknown fallback"] += 1
+                elif match is None:
+                    counts["fallback"] += 1
+                else:
+                    counts["right" if match.name == name else "wrong"] += 1
+
+    for outcome, count in counts.items():
+        print(f"{outcome:<20}{count:>6}")
+    print(f"Median {statistics.median(times) * 1000:.2f} ms, max {max(times) * 1000:.2f} ms per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - IPC Benchmark
+    ~~~~~~~~~~
+
+    Startup time and per-message latency of the GUI/worker queues, with the
+    old Manager() proxy queues against the native multiprocessing queues.
+
+    Run from the repository root:
+        python -m benchmarks.ipc_bench [--messages N]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import statistics
+import time
+from multiprocessing import Manager, Process, Queue, freeze_support
+
+from pkg.messages import result_message
+
+
+def echo(in_queue: Queue, out_queue: Queue) -> None:
+    while True:
+        message = in_queue.get()
+        out_queue.put(message)
+        if message is None:
+            break
+
+
+def start_manager_queues() -> tuple:
+    # What main.main used to do, one Manager server process per queue
+    manager = Manager()
+    manager2 = Manager()
+    return (manager, manager2), manager.Queue(), manager2.Queue()
+
+
+def start_native_queues() -> tuple:
+    return (), Queue(), Queue()
+
+
+def run(name: str, start_queues, messages: int) -> None:
+    start = time.perf_counter()
+    managers, in_queue, out_queue = start_queues()
+    startup = time.perf_counter() - start
+
+    child = Process(target=echo, args=(in_queue, out_queue))
+    child.start()
+
+    message = result_message("Item\n\nLast lowest price: 12,345", {"itemName": "Item", "x": 0, "y": 0})
+    # Warm the pipes up before timing
+    in_queue.put(message)
+    out_queue.get()
+
+    round_trips = []
+    for _ in range(messages):
+        start = time.perf_counter()
+        in_queue.put(message)
+        out_queue.get()
+        round_trips.append(time.perf_counter() - start)
+
+    in_queue.put(None)
+    out_queue.get()
+    child.join()
+    for manager in managers:
+        manager.shutdown()
+
+    round_trips.sort()
+    print(
+        f"{name:>8}: startup {startup * 1000:8.1f} ms | round trip "
+        f"median {statistics.median(round_trips) * 1e6:8.1f} us, "
+        f"p95 {round_trips[int(len(round_trips) * 0.95)] * 1e6:8.1f} us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="round trips to time per queue type")
+    args = parser.parse_args()
+
+    run("Manager", start_manager_queues, args.messages)
+    run("native", start_native_queues, args.messages)
+
+
+if __name__ == "__main__":
+    freeze_support()
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Load Test
+    ~~~~~~~~~~
+
+    Drives the worker pool of the ProcessManager with storms of key presses
+    over the fixture screenshots, the way sorting a stash as fast as you can
+    does, against a local stand-in for the upstream sites with configurable
+    latency, jitter and error rate. The press rate is stepped up to find the
+    throughput ceiling of the pool and the rate where the newest press
+    starts waiting for a worker still busy with a superseded one.
+
+    Run from the repository root:
+        python -m benchmarks.load_test [--rates 1,2,5,10,20] [--duration 10] [--workers 3]
+            [--latency 0.2] [--jitter 0.1] [--error-rate 0.02] [--ocr-latency 0.15]
+
+    --ocr-latency stands in for tesseract with a fixed delay that reads the
+    fixture's name, for machines without it or to take the OCR out of the
+    numbers. Leave it out to run the real OCR.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import json
+import os
+import queue as q
+import random
+import statistics
+import threading
+import time
+from html import escape
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Queue, freeze_support
+from multiprocessing.synchronize import Lock as LockType
+from urllib.parse import parse_qs, quote, urlsplit
+
+from cv2.typing import MatLike
+from PIL import Image
+
+from pkg import metrics
+from pkg.messages import RESULT
+from pkg.scheduler import JobScheduler
+from pkg.TIPA import MessageFunc, ProcessManager
+from pkg.transport import UPSTREAM_ENV
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Seconds to wait for the last press of a step to be answered
+DRAIN_TIMEOUT = 30.0
+
+
+class StubUpstream(ThreadingHTTPServer):
+    '''
+    StubUpstream
+    ~~~~~~~~~~
+
+    Answers for every upstream host, which transport.route puts in front of
+    the path, with the saved fixture pages after a random delay. A share of
+    the requests fail with 503.
+    '''
+    daemon_threads = True
+
+    def __init__(self, latency: float, jitter: float, error_rate: float, seed: int = 0) -> None:
+        super().__init__(("127.0.0.1", 0), UpstreamHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.pages = {}
+        for name in ("tarkov_market.html", "gamepedia.html"):
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as page_file:
+                self.pages[name] = page_file.read()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def draw(self) -> tuple[float, bool]:
+        '''
+        the delay of a request and whether it fails
+        '''
+        with self.rng_lock:
+            self.requests += 1
+            delay = max(self.latency + self.rng.uniform(-self.jitter, self.jitter), 0.0)
+            failed = self.rng.random() < self.error_rate
+            self.errors += failed
+        return delay, failed
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StubUpstream
+
+    def do_GET(self) -> None:
+        self.respond(with_body=True)
+
+    def do_HEAD(self) -> None:
+        self.respond(with_body=False)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond(with_body=True)
+
+    def respond(self, with_body: bool) -> None:
+        delay, failed = self.server.draw()
+        time.sleep(delay)
+        status, content_type, body = (HTTPStatus.SERVICE_UNAVAILABLE, "text/plain", b"") if failed else self.page()
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def page(self) -> tuple[HTTPStatus, str, bytes]:
+        '''
+        what the host in front of the path would answer, close enough for the scrapers
+        '''
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        if host == "api.tarkov.dev":
+            return HTTPStatus.OK, "application/json", json.dumps({"data": {"items": []}}).encode()
+        if host == "tarkov-market.com" or (host.endswith("google.com") and path == "url"):
+            return HTTPStatus.OK, "text/html", self.server.pages["tarkov_market.html"]
+        if host == "escapefromtarkov.gamepedia.com":
+            return HTTPStatus.OK, "text/html", self.server.pages["gamepedia.html"]
+        if host.endswith("google.com") and path == "search":
+            # "tarkov market <name>" or "tarkov wiki <name>"
+            _, site, name = (parse_qs(parts.query).get("q", [""])[0].split(" ", 2) + ["", ""])[:3]
+            if site == "market":
+                body = f'<div class="egMi0 kCrYT"><a href="/url?q=https://tarkov-market.com/item/{quote(name)}">x</a></div>'
+            else:
+                body = f"<h3>{escape(name.replace('+', ' '))} - Escape from Tarkov Wiki</h3>"
+            return HTTPStatus.OK, "text/html", f"<html><body>{body}</body></html>".encode()
+        return HTTPStatus.NOT_FOUND, "text/plain", b""
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class LoadTestLookup(MessageFunc):
+    '''
+    LoadTestLookup
+    ~~~~~~~~~~
+
+    The lookup a key press submits, noting how long it waited for a worker.
+    With an OCR latency the name is read by waiting that long instead of by
+    tesseract.
+    '''
+    def __init__(self, img: Image, mouse_pos: dict, display_info_init: dict[str, int], text: str,
+                 ocr_latency: float | None = None) -> None:
+        super().__init__(img, mouse_pos, display_info_init)
+        self.text = text
+        self.ocr_latency = ocr_latency
+        self.pressed_at = time.time()
+
+    def run(self, lock: LockType, gui_queue: Queue, scheduler: JobScheduler | None = None) -> None:
+        metrics.observe("queue_wait", time.time() - self.pressed_at)
+        super().run(lock, gui_queue, scheduler)
+
+    def extract_words(self, image: MatLike) -> tuple[list[tuple[str, float]], MatLike]:
+        if self.ocr_latency is None:
+            return super().extract_words(image)
+        time.sleep(self.ocr_latency)
+        return [(word, 95.0) for word in self.text.split()], image
+
+
+def load_screens() -> list[tuple[Image.Image, dict, str]]:
+    screens = []
+    with open(os.path.join(FIXTURES_DIR, "screens.jsonl")) as manifest_file:
+        for line in manifest_file:
+            screen = json.loads(line)
+            with Image.open(os.path.join(FIXTURES_DIR, screen["image"])) as img:
+                screens.append((img.convert("RGB"), screen["mouse"], screen["text"]))
+    return screens
+
+
+def collect_answers(gui_queue: Queue, answers: dict[int, tuple[float, int]], stop: threading.Event) -> None:
+    '''
+    notes when each generation got its popup and of which kind
+    '''
+    while not stop.is_set():
+        try:
+            message = gui_queue.get(timeout=0.1)
+        except q.Empty:
+            continue
+        answers.setdefault(message.generation, (time.perf_counter(), message.kind))
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def run_step(manager: ProcessManager, screens: list, answers: dict, upstream: StubUpstream,
+             rate: float, duration: float, ocr_latency: float | None) -> dict[str, float]:
+    '''
+    presses the key rate times a second for duration seconds and waits for the last press to be answered
+    '''
+    metrics.registry.drain()
+    before = manager.scheduler.stats()
+    requests_before = upstream.requests
+
+    pressed: dict[int, float] = {}
+    start = time.perf_counter()
+    for press in range(max(int(rate * duration), 1)):
+        delay = start + press / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        img, mouse, text = screens[press % len(screens)]
+        job = LoadTestLookup(img, mouse, dict(manager.display_info), text, ocr_latency)
+        pressed[manager.scheduler.submit(job)] = time.perf_counter()
+    storm_time = time.perf_counter() - start
+
+    last = max(pressed)
+    deadline = time.perf_counter() + DRAIN_TIMEOUT
+    while last not in answers and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    # The workers ship their timings after the job, give the last one a moment
+    time.sleep(0.2)
+    manager.collect_metrics()
+    queue_wait = metrics.registry.summary().get("queue_wait", {})
+
+    after = manager.scheduler.stats()
+    results = [answers[gen][0] - at for gen, at in pressed.items() if gen in answers and answers[gen][1] == RESULT]
+    errors = sum(1 for gen in pressed if gen in answers and answers[gen][1] != RESULT)
+    return {
+        "rate": rate,
+        "presses": len(pressed),
+        "results": len(results),
+        "errors": errors,
+        "superseded": len(pressed) - len(results) - errors,
+        "results_per_s": len(results) / duration,
+        "p50": percentile(results, 0.5),
+        "p95": percentile(results, 0.95),
+        "last": answers[last][0] - pressed[last] if last in answers else float("nan"),
+        "queue_wait_p95": queue_wait.get("p95", float("nan")),
+        "dropped": after["dropped"] - before["dropped"],
+        "cancelled": after["cancelled"] - before["cancelled"],
+        "upstream_per_s": (upstream.requests - requests_before) / storm_time,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="1,2,5,10,20", help="key presses per second, one step each")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="upstream response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="upstream response time spread, +-seconds")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of upstream requests failing with 503")
+    parser.add_argument("--ocr-latency", type=float, help="seconds the stand-in OCR takes instead of running tesseract")
+    parser.add_argument("--wait-threshold", type=float, default=0.1,
+                        help="queue wait p95 in seconds from which the pool counts as saturated")
+    args = parser.parse_args()
+
+    upstream = StubUpstream(args.latency, args.jitter, args.error_rate)
+    threading.Thread(target=upstream.serve_forever, name="StubUpstream", daemon=True).start()
+    # Inherited by the workers, every upstream request goes to the stand-in
+    os.environ[UPSTREAM_ENV] = upstream.url
+
+    gui_queue = Queue()
+    manager = ProcessManager(gui_queue, Queue(), num_workers=args.workers)
+    manager.start_workers()
+    manager.wait_for_workers()
+
+    answers: dict[int, tuple[float, int]] = {}
+    stop = threading.Event()
+    collector = threading.Thread(target=collect_answers, args=(gui_queue, answers, stop), daemon=True)
+    collector.start()
+
+    screens = load_screens()
+    print(f"{args.workers} workers, upstream {args.latency:.2f}s +-{args.jitter:.2f}s with {args.error_rate:.0%} errors, "
+          f"OCR {'tesseract' if args.ocr_latency is None else f'{args.ocr_latency:.2f}s stand-in'}")
+    columns = ("rate", "presses", "results", "errors", "superseded", "results_per_s", "p50", "p95", "last",
+               "queue_wait_p95", "dropped", "cancelled", "upstream_per_s")
+    print("".join(f"{column:>15}" for column in columns))
+
+    steps = []
+    try:
+        for rate in (float(rate) for rate in args.rates.split(",")):
+            step = run_step(manager, screens, answers, upstream, rate, args.duration, args.ocr_latency)
+            steps.append(step)
+            print("".join(f"{step[column]:>15.3f}" if isinstance(step[column], float) else f"{step[column]:>15}"
+                          for column in columns))
+    finally:
+        stop.set()
+        manager.stop_workers()
+        upstream.shutdown()
+
+    ceiling = max(steps, key=lambda step: step["results_per_s"])
+    print(f"\nThroughput ceiling {ceiling['results_per_s']:.2f} results/s at {ceiling['rate']:g} presses/s")
+    saturated = [step for step in steps if step["queue_wait_p95"] > args.wait_threshold]
+    if saturated:
+        step = saturated[0]
+        print(f"Presses wait for a worker from {step['rate']:g} presses/s on "
+              f"(queue wait p95 {step['queue_wait_p95']:.2f}s, last press answered after {step['last']:.2f}s)")
+    else:
+        print(f"No press waited more than {args.wait_threshold:.2f}s for a worker")
+    if steps and not statistics.fmean(step["results"] for step in steps):
+        print("No lookup succeeded, check the OCR (tesseract or --ocr-latency)")
+
+
+if __name__ == "__main__":
+    freeze_support()
+    main()
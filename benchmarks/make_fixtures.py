@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Benchmark Fixtures
+    ~~~~~~~~~~
+
+    Regenerates the fixture screenshots in benchmarks/fixtures and their
+    screens.jsonl manifest (image, mouse position, expected item text), and
+    the stash screenshots in benchmarks/fixtures/stash with their tiles.json
+    (column, row, width, height in cells and the short name of every tile).
+
+    Run from the repository root:
+        python -m benchmarks.make_fixtures
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import json
+import os
+
+from benchmarks.synthetic import inventory_screenshot, raid_screenshot, stash_screenshot
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+RESOLUTIONS = ((1920, 1080), (2560, 1440), (3840, 2160))
+ITEM_TEXT = "Salewa first aid kit"
+LOOSE_ITEM_TEXT = "Salewa"
+STASH_TILES = [
+    (0, 0, 1, 1, "Salewa"), (1, 0, 2, 1, "GPU"), (3, 0, 1, 2, "Roler"), (4, 0, 2, 2, "LEDX"),
+    (6, 0, 4, 2, "AKM"), (0, 1, 1, 1, "AI-2"), (1, 1, 1, 1, "Bolts"), (2, 1, 1, 1, "Bolts"),
+    (0, 3, 3, 2, "Tri-Zip"), (5, 4, 1, 1, "M995"), (7, 3, 2, 3, "Blackjack"), (3, 5, 1, 1, "Tushonka"),
+]
+
+
+def main() -> None:
+    manifest = []
+    for width, height in RESOLUTIONS:
+        # Hover somewhere in the stash, right of the equipment slots
+        mouse = {"x": int(width * 0.62), "y": int(height * 0.55)}
+        name = f"inventory_{width}x{height}.png"
+        inventory_screenshot((width, height), (mouse["x"], mouse["y"]), ITEM_TEXT).save(
+            os.path.join(FIXTURES_DIR, name), optimize=True,
+        )
+        manifest.append({"image": name, "mouse": mouse, "text": ITEM_TEXT})
+
+        name = f"raid_{width}x{height}.png"
+        raid_screenshot((width, height), LOOSE_ITEM_TEXT).save(os.path.join(FIXTURES_DIR, name), optimize=True)
+        manifest.append({"image": name, "mouse": {"x": width // 2, "y": height // 2}, "text": LOOSE_ITEM_TEXT})
+
+    with open(os.path.join(FIXTURES_DIR, "screens.jsonl"), "w") as manifest_file:
+        for entry in manifest:
+            manifest_file.write(json.dumps(entry) + "\n")
+
+    stash_dir = os.path.join(FIXTURES_DIR, "stash")
+    os.makedirs(stash_dir, exist_ok=True)
+    for width, height in RESOLUTIONS:
+        stash_screenshot((width, height), STASH_TILES).save(
+            os.path.join(stash_dir, f"stash_{width}x{height}.png"), optimize=True,
+        )
+    with open(os.path.join(stash_dir, "tiles.json"), "w") as tiles_file:
+        json.dump(STASH_TILES, tiles_file)
+        tiles_file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
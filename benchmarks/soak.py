@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Soak Test
+    ~~~~~~~~~~
+
+    Replays thousands of lookups through the image pipeline and the popup
+    path and checks that RSS, handle counts and Tk widget counts stay flat.
+    OCR and the network are not part of the replay.
+
+    Run from the repository root:
+        python -m benchmarks.soak [--iterations N | --duration SECONDS] [--gui]
+
+    --gui also drives the GUI widgets and needs a display.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Queue, freeze_support
+
+import psutil
+
+from benchmarks.synthetic import inventory_screenshot
+from pkg.backends import BACKEND_ENV
+from pkg.messages import error_message, result_message
+from pkg.overlay import PopupScheduler
+from pkg.TIPA import MessageFunc
+
+
+def handle_count(process: psutil.Process) -> int:
+    if sys.platform == "win32":
+        return process.num_handles()
+    return process.num_fds()
+
+
+def widget_count(widget) -> int:
+    return 1 + sum(widget_count(child) for child in widget.winfo_children())
+
+
+def soak_gui():
+    '''
+    the GUI on the null backend and without the ProcessManager, the soak test hands it the results itself
+    '''
+    from tkinter import Tk
+    from pkg.gui import GUI
+
+    class SoakGUI(GUI):
+        def on_pipeline_loaded(self, _event=None) -> None:
+            # No workers, key hooks or upstream connections
+            self.hide_body_message()
+
+    os.environ[BACKEND_ENV] = "null"
+    return SoakGUI(Tk(), Queue(), Queue(), "Soak Test")
+
+
+def replay_lookup(img, mouse: dict, display_info: dict) -> None:
+    job = MessageFunc(img, mouse, display_info)
+    is_inventory = job.classify_screen()
+    crops = job.crop_search_areas(is_inventory)
+    job.img = None
+    job.process_image(1, crops, is_inventory)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000, help="lookups to replay")
+    parser.add_argument("--duration", type=float, default=0, help="replay for this many seconds instead")
+    parser.add_argument("--sample-every", type=int, default=250, help="lookups between samples")
+    parser.add_argument("--max-rss-growth", type=float, default=10.0, help="allowed RSS growth in MB")
+    parser.add_argument("--max-handle-growth", type=int, default=5, help="allowed handle/fd growth")
+    parser.add_argument("--gui", action="store_true", help="also render every result with the GUI")
+    args = parser.parse_args()
+
+    display_info = {"x": 0, "y": 0, "w": 210, "h": 120}
+    mouse = {"x": 900, "y": 600}
+    img = inventory_screenshot((1920, 1080), (mouse["x"], mouse["y"]), "Salewa first aid kit")
+    popup_scheduler = PopupScheduler()
+
+    gui = None
+    if args.gui:
+        gui = soak_gui()
+
+    process = psutil.Process()
+    samples = []
+    start = time.perf_counter()
+    iteration = 0
+    while True:
+        if args.duration:
+            if time.perf_counter() - start > args.duration:
+                break
+        elif iteration >= args.iterations:
+            break
+
+        replay_lookup(img, mouse, display_info)
+
+        iteration += 1
+        generation = iteration
+        if iteration % 10 == 0:
+            message = error_message("Error, please try again", display_info, generation)
+        else:
+            message = result_message(f"Item {iteration}\n\nLast lowest price: {iteration}", display_info, generation)
+        popup_scheduler.accept(message)
+
+        if gui is not None:
+            gui.results.put(message)
+            gui.on_result_ready()
+            gui.root.update()
+
+        if iteration % args.sample_every == 0:
+            sample = (
+                iteration,
+                process.memory_info().rss / 2**20,
+                handle_count(process),
+                widget_count(gui.root) if gui is not None else 0,
+            )
+            samples.append(sample)
+            print("{:>8} lookups | rss {:8.1f} MB | handles {:>5} | widgets {:>5}".format(*sample))
+
+    if gui is not None:
+        gui.root.destroy()
+
+    # The first samples include the warm-up allocations
+    if len(samples) < 3:
+        print("Not enough samples, run more iterations")
+        return 1
+    baseline, last = samples[1], samples[-1]
+
+    failures = []
+    if last[1] - baseline[1] > args.max_rss_growth:
+        failures.append(f"RSS grew {last[1] - baseline[1]:.1f} MB")
+    if last[2] - baseline[2] > args.max_handle_growth:
+        failures.append(f"handles grew by {last[2] - baseline[2]}")
+    if last[3] != baseline[3]:
+        failures.append(f"widgets went from {baseline[3]} to {last[3]}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{iteration} lookups in {elapsed:.1f}s ({iteration / elapsed:.1f}/s)")
+    if failures:
+        print("FAIL: " + ", ".join(failures))
+        return 1
+
+    print("OK: resources stayed flat")
+    return 0
+
+
+if __name__ == "__main__":
+    freeze_support()
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Startup Report
+    ~~~~~~~~~~
+
+    Measures the startup path in fresh interpreters: the -X importtime
+    breakdown of what main imports before the window, the pipeline import
+    that happens in the background afterwards, and the time until the first
+    window is drawn. Exits with 1 when a budget is exceeded.
+    The first window needs a display, it's skipped without one.
+
+    Run from the repository root:
+        python -m benchmarks.startup [--top 15] [--import-budget 0.25] [--window-budget 1.0]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs main up to the Tk main loop and reports how long the first window took
+FIRST_WINDOW_SCRIPT = """
+import os, time, tkinter
+import main
+tkinter.Tk.mainloop = lambda self, n=0: print(f"first_window {time.perf_counter() - main.STARTED}", flush=True)
+main.main()
+os._exit(0)
+"""
+
+
+def run_python(args: list[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, timeout=120)
+
+
+def import_times(module: str) -> list[tuple[str, float, float]]:
+    '''
+    (module, self seconds, cumulative seconds) of every module imported by importing module
+    '''
+    result = run_python(["-X", "importtime", "-c", f"import {module}"])
+    if result.returncode:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return times
+
+
+def best_import_time(module: str, repeat: int) -> tuple[float, list[tuple[str, float, float]]]:
+    '''
+    fastest total import time of the module and the breakdown of that run
+    '''
+    runs = [import_times(module) for _ in range(repeat)]
+    best = min(runs, key=lambda times: times[-1][2])
+    return best[-1][2], best
+
+
+def first_window_time() -> float | None:
+    result = run_python(["-c", FIRST_WINDOW_SCRIPT])
+    for line in result.stdout.splitlines():
+        if line.startswith("first_window "):
+            return float(line.split()[1])
+
+    print(f"First window skipped, no display? {result.stderr.strip().splitlines()[-1:]}")
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement, the best counts")
+    parser.add_argument("--import-budget", type=float, default=0.25, help="seconds main may take to import")
+    parser.add_argument("--window-budget", type=float, default=1.0, help="seconds until the first window")
+    args = parser.parse_args()
+
+    main_total, main_times = best_import_time("main", args.repeat)
+    pipeline_total, _ = best_import_time("pkg.TIPA", args.repeat)
+
+    print(f"Slowest imports before the window (cumulative, from {len(main_times)} modules)")
+    print(f"{'module':<48}{'self ms':>10}{'cumul ms':>10}")
+    for name, self_s, cumulative_s in sorted(main_times, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{name:<48}{self_s * 1000:>10.1f}{cumulative_s * 1000:>10.1f}")
+
+    print("")
+    failures = []
+    print(f"{'import main':<36}{main_total * 1000:>10.0f} ms   budget {args.import_budget * 1000:.0f} ms")
+    if main_total > args.import_budget:
+        failures.append("import main")
+    print(f"{'import pkg.TIPA (background)':<36}{pipeline_total * 1000:>10.0f} ms")
+
+    window = first_window_time()
+    if window is not None:
+        print(f"{'first window':<36}{window * 1000:>10.0f} ms   budget {args.window_budget * 1000:.0f} ms")
+        if window > args.window_budget:
+            failures.append("first window")
+
+    if failures:
+        print(f"FAIL: {', '.join(failures)} over budget")
+        return 1
+
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
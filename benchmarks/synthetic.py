@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Synthetic Screens
+    ~~~~~~~~~~
+
+    Draws inventory and in-raid screenshots with an item name tooltip, and
+    stash screens full of item tiles, so the image pipeline can be exercised
+    without the game.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+from pkg.geometry import COMPARE_IMG_PATH, geometry_for
+
+
+BACKGROUND = (24, 26, 24)
+TOOLTIP_FILL = (8, 8, 8)
+TOOLTIP_BORDER = (120, 120, 110)
+TEXT_COLOR = (210, 210, 200)
+GRID_LINE = (58, 62, 58)
+TILE_BORDER = (96, 100, 94)
+TILE_TINTS = ((34, 42, 52), (44, 34, 50), (50, 48, 34), (34, 46, 38), (46, 38, 34))
+
+# Stash cell pitch at 1080p, the UI scales with the screen height
+STASH_CELL = 63
+STASH_COLUMNS = 10
+
+
+def inventory_screenshot(size: tuple[int, int], mouse: tuple[int, int], text: str) -> Image:
+    '''
+    an inventory screen with the "eyewear" slot text and a name tooltip above the cursor
+    '''
+    img = Image.new("RGB", size, BACKGROUND)
+    geometry = geometry_for(size)
+    x1, y1, x2, y2 = geometry.eyewear
+    with Image.open(COMPARE_IMG_PATH) as eyewear:
+        img.paste(eyewear.convert("RGB").resize((x2 - x1, y2 - y1), Image.Resampling.LANCZOS), (x1, y1))
+
+    draw_tooltip(img, mouse, text, geometry.scale)
+    return img
+
+
+def draw_tooltip(img: Image, mouse: tuple[int, int], text: str, scale: float = 1.0) -> None:
+    '''
+    the item name box the game shows above the cursor, drawn scale times its 1080p size
+    '''
+    x, y = mouse
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(
+        (x - 10 * scale, y - 38 * scale, x + (12 + 7 * len(text)) * scale, y - 14 * scale),
+        fill=TOOLTIP_FILL, outline=TOOLTIP_BORDER,
+    )
+    draw.text((x - 4 * scale, y - 32 * scale), text, fill=TEXT_COLOR, font=ImageFont.load_default(size=round(10 * scale)))
+
+
+def raid_screenshot(size: tuple[int, int], text: str) -> Image:
+    '''
+    an in-raid screen with the loose item name under the crosshair
+    '''
+    img = Image.new("RGB", size, BACKGROUND)
+    width, height = size
+    scale = geometry_for(size).scale
+    draw = ImageDraw.Draw(img)
+    draw.text(
+        (width // 2 - 3 * len(text) * scale, height // 2 + 44 * scale), text, fill=TEXT_COLOR,
+        font=ImageFont.load_default(size=round(10 * scale)),
+    )
+    return img
+
+
+def stash_layout(size: tuple[int, int]) -> tuple[int, int, int, int]:
+    '''
+    (x, y) of the top left stash cell, the cell pitch and the number of rows that fit
+    '''
+    width, height = size
+    cell = round(STASH_CELL * height / 1080)
+    x, y = round(width * 0.62), round(height * 0.12)
+    return x, y, cell, (height - y - cell // 2) // cell
+
+
+def stash_screenshot(size: tuple[int, int], tiles: list[tuple[int, int, int, int, str]], seed: int = 0) -> Image:
+    '''
+    a stash grid with an item tile for each (column, row, width, height, short name) in cells,
+    the short name in the top right corner of the tile like the game draws it
+    '''
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    x0, y0, cell, rows = stash_layout(size)
+    font = ImageFont.load_default(size=round(11 * cell / STASH_CELL))
+
+    for row in range(rows + 1):
+        draw.line((x0, y0 + row * cell, x0 + STASH_COLUMNS * cell, y0 + row * cell), fill=GRID_LINE)
+    for column in range(STASH_COLUMNS + 1):
+        draw.line((x0 + column * cell, y0, x0 + column * cell, y0 + rows * cell), fill=GRID_LINE)
+
+    for column, row, w, h, short_name in tiles:
+        left, top = x0 + column * cell, y0 + row * cell
+        right, bottom = left + w * cell, top + h * cell
+        draw.rectangle((left, top, right, bottom), fill=rng.choice(TILE_TINTS), outline=TILE_BORDER)
+
+        # Something icon-like in the middle of the tile
+        icon_color = tuple(rng.randint(70, 150) for _ in range(3))
+        margin = cell // 4
+        if rng.random() < 0.5:
+            draw.ellipse((left + margin, top + margin + 4, right - margin, bottom - margin), fill=icon_color)
+        else:
+            draw.rectangle((left + margin, top + margin + 4, right - margin, bottom - margin), fill=icon_color)
+
+        text_width = draw.textlength(short_name, font=font)
+        draw.text((right - 3 - text_width, top + 2), short_name, fill=TEXT_COLOR, font=font)
+    return img
@@ -1,59 +1,101 @@
-import json
+import atexit
 import logging
-import logging.config
 import logging.handlers
-import os
-from logging import LogRecord
-
-
-class ImmediateFlushHandler(logging.StreamHandler):
-    def emit(self, record: LogRecord) -> None:
-        try:
-            super().emit(record)
-            self.flush()
-        except Exception as e:
-            self.handleError(record)
-
-class ImmediateFlushRotatingFileHandler(logging.handlers.RotatingFileHandler):
-    def emit(self, record: LogRecord) -> None:
-        try:
-            super().emit(record)
-            self.flush()
-        except Exception as e:
-            self.handleError(record)
-
-if os.path.exists("_internal/settings.json"):
-    with open("_internal/settings.json") as settings_file:
-        settings = json.load(settings_file)
-        debug_level = settings.get("debug_level", "INFO")
-
-# Centralized logging configuration using dictConfig
-logging.config.dictConfig({
-    "version": 1,
-    "disable_existing_loggers": False,  # Ensure existing loggers are not disabled
-    "handlers": {  # Handlers define where and how logs are output
-        "file": {
-            "class": "logger_config.ImmediateFlushRotatingFileHandler",  # Custom handler class for writing logs to a file
-            "filename": "debug.log",
-            "maxBytes": 100000,              # Maximum size of a log file in bytes before rotation
-            "backupCount": 3,                # Number of backup files to keep
-            "formatter": "simple",           # Refer to the formatter defined below
-            "errors": "replace",
-        },
-        "console": {
-            "class": "logger_config.ImmediateFlushHandler",  # Custom handler class for writing logs to the console
-            "formatter": "simple",                           # Refer to the formatter defined below
-        },
-    },
-    "formatters": {
-        "simple": {
-            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        },
-    },
-    "root": {
-        "level": debug_level,
-        "handlers": ["file", "console"],
-    },
-})
+import multiprocessing
+import time
+
+from pkg.config import settings
+
+
+class BatchFlushMixin:
+    '''
+    emit() leaves the flushing to the listener, which flushes once per batch of records
+    '''
+    def flush(self) -> None:
+        # Called by StreamHandler.emit for every record
+        pass
+
+    def flush_batch(self) -> None:
+        with self.lock:
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+
+
+class BatchFlushHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchFlushRotatingFileHandler(BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    '''
+    Single writer for the records of every process, flushes when the queue runs dry
+    so a burst of records costs one flush. A queue that never runs dry is still
+    flushed every MAX_BATCH records or MAX_DELAY seconds.
+    '''
+    MAX_BATCH = 200
+    MAX_DELAY = 1.0
+
+    def __init__(self, queue, *handlers, respect_handler_level: bool = False) -> None:
+        super().__init__(queue, *handlers, respect_handler_level=respect_handler_level)
+        self.batched = 0
+        self.last_flush = time.monotonic()
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        self.batched += 1
+        if self.queue.empty() or self.batched >= self.MAX_BATCH or time.monotonic() - self.last_flush >= self.MAX_DELAY:
+            for handler in self.handlers:
+                handler.flush_batch()
+            self.batched = 0
+            self.last_flush = time.monotonic()
+
+
+def configure_worker_logging(queue: multiprocessing.Queue, level: int | str) -> None:
+    '''
+    routes the records of a worker process to the listener of the main process
+    '''
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(queue))
+    root.setLevel(level)
+
+
+def stop_logging() -> None:
+    '''
+    writes out the records still queued
+    '''
+    try:
+        listener.stop()
+    except RuntimeError:
+        # Nothing was ever logged, the queue can't start its feeder thread at shutdown
+        pass
+
 
 logger = logging.getLogger()
+logger.setLevel(settings.debug_level)
+
+# Records of every process go through this queue, only the main process writes them
+log_queue = None
+if multiprocessing.parent_process() is None:
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    file_handler = BatchFlushRotatingFileHandler(
+        "debug.log",
+        maxBytes=100000,  # Maximum size of a log file in bytes before rotation
+        backupCount=3,    # Number of backup files to keep
+        errors="replace",
+    )
+    file_handler.setFormatter(formatter)
+    console_handler = BatchFlushHandler()
+    console_handler.setFormatter(formatter)
+
+    log_queue = multiprocessing.Queue()
+    listener = BatchingQueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    atexit.register(stop_logging)
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
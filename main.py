@@ -15,11 +15,15 @@
 __author__ = "Nicholas Murphy"
 __version__ = '1.0.0-alpha'
 
-from tkinter import Tk
-from multiprocessing import Manager
-from multiprocessing import freeze_support
-from pkg.gui import GUI
-from logger_config import logger
+import time
+# Taken before the other imports so the startup time includes them
+STARTED = time.perf_counter()
+
+from tkinter import Tk  # noqa: E402
+from multiprocessing import Queue  # noqa: E402
+from multiprocessing import freeze_support  # noqa: E402
+from pkg.gui import GUI  # noqa: E402
+from logger_config import logger  # noqa: E402
 
 
 freeze_support()
@@ -29,11 +33,9 @@ def main() -> None:
         
         logger.info("Starting Tarkov Item Analyzer")
     
-        # Gui manager and command manager queues'
-        manager = Manager()
-        gui_queue = manager.Queue()
-        manager2 = Manager()
-        cmd_queue = manager2.Queue()
+        # Gui and command queues, native pipes shared with the workers
+        gui_queue = Queue()
+        cmd_queue = Queue()
 
         # Start the root app
         root = Tk()
@@ -41,6 +43,8 @@ def main() -> None:
 
         # Run the gui
         _ = GUI(root, gui_queue, cmd_queue, "Tarkov Item Analyzer")
+        root.update()
+        logger.info("First window after %.2fs", time.perf_counter() - STARTED)
 
         # End of the main app.
         root.mainloop()
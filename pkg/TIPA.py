@@ -11,32 +11,39 @@
     :license: GPLv2, see LICENSE for more details.
 '''
 
-import atexit
-import json
+import functools
 import os
+import queue as q
 import re
-import tempfile
 import threading
 import time
 from urllib.parse import urlencode, urlparse
 
 import cv2
-import keyboard
 import numpy as np
 import pytesseract
 import requests
 from bs4 import BeautifulSoup
 from cv2.typing import MatLike
-from ctypes import byref, c_long, Structure, windll
-from multiprocessing import Lock, Process, Queue
+from multiprocessing import Event, Lock, Process, Queue, Value
 from multiprocessing.synchronize import Lock as LockType
-from PIL import Image, ImageGrab
+from PIL import Image
 from requests import HTTPError, RequestException, Response, Timeout
-# pylint: disable=no-name-in-module, method-hidden
-from win32gui import GetForegroundWindow, GetWindowText
-# pylint: enable=no-name-in-module
 
-from logger_config import logger
+from logger_config import configure_worker_logging, log_queue, logger
+from . import metrics, transport
+from .backends import Backend, get_backend
+from .candidates import rank_readings
+from .catalog import load_catalog
+from .config import configure_tesseract, settings
+from .geometry import BASE_SIZE, COMPARE_IMG_PATH, PROFILES, geometry_for
+from .icons import identify, load_icon_index
+from .messages import error_message, result_message
+from .recorder import recorder
+from .scheduler import JobScheduler
+from .speculative import DWELL, JOB_BUDGET, MOVED, DwellTracker, Speculation, SpeculationCache
+from .stash import StashScan
+from .tooltip import TOOLTIP_TIMEOUT, gray_roi, tooltip_present, wait_for_tooltip
 
 
 class ProcessManager(threading.Thread):
@@ -49,16 +56,21 @@ class ProcessManager(threading.Thread):
     Communicates with the GUI via a queue.
     Recieves instructions from the GUI via a different queue.
     '''
-    def __init__(self, gui_queue: Queue, command_queue: Queue) -> None:
+    def __init__(self, gui_queue: Queue, command_queue: Queue, num_workers: int = 3,
+                 backend: Backend | None = None) -> None:
         super().__init__(name="ProcessManagerThread")
         self.daemon = True
+        # Screen, cursor and keys of the platform, picked on first use when not given
+        self._backend = backend
         self.need_quit = False
         # Setup the queues for the workers
-        self.process_queue = Queue()
+        self.num_workers = num_workers
+        self.scheduler = JobScheduler(maxsize=self.num_workers)
+        # Stage histograms shipped back by the workers
+        self.metrics_queue = Queue()
         self.command_queue = command_queue
         self.gui_queue = gui_queue
         self.position_list = []
-        self.num_workers = 3
         self.workers = []
         self.position_record = []
         self.lock = Lock()
@@ -66,6 +78,12 @@ class ProcessManager(threading.Thread):
         self.listen = True
         self.listen_lock = False
         self.resumeEvent = threading.Event()
+        # Lookups of the item under a resting cursor, the worker is started once they're enabled
+        self.speculative_scheduler = JobScheduler(maxsize=1)
+        self.speculation_queue = Queue()
+        self.speculative_worker = None
+        self.dwell = DwellTracker()
+        self.speculations = SpeculationCache()
         # Define display information for the popup window
         self.display_info = {
             "x": 0,
@@ -74,27 +92,40 @@ class ProcessManager(threading.Thread):
             "h": 120,  # height for the Tk root
         }
 
+    @property
+    def backend(self) -> Backend:
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
     def run(self) -> None:
         self.need_quit = False
         self.listen = True
+        self.start_workers()
+        self.wait_for_workers()
+        self.capture_screenshots()
+
+    def start_workers(self) -> None:
         # Make the workers and start them up
         for idx in range(self.num_workers):
-            worker = Worker(self.process_queue, self.lock, name=f"Worker-{idx}")
+            worker = Worker(self.scheduler, self.lock, self.gui_queue, self.metrics_queue, name=f"Worker-{idx}")
             self.workers.append(worker)
             worker.start()
 
-        self.capture_screenshots()
+    def wait_for_workers(self, timeout: float = 30) -> None:
+        '''
+        waits until every worker finished its warm-up phase
+        '''
+        start = time.perf_counter()
+        for worker in self.workers:
+            if not worker.ready.wait(timeout):
+                logger.warning("%s is not ready after %ds, continuing", worker.name, timeout)
+        logger.info("Workers ready after %.2fs", time.perf_counter() - start)
 
     def capture_screenshots(self) -> None:
-        try:
-            with open("_internal/settings.json", "r") as settings_file:
-                settings = json.load(settings_file)
-                interact_key = settings.get("interact_key", "f")
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(f"Failed to load settings: {e}")
-            interact_key = "f"
-
-        keyboard.on_press_key(key=interact_key, callback=self.on_release)
+        interact_key, scan_key = settings.interact_key, settings.scan_key
+        self.backend.hook_key(interact_key, self.on_release)
+        self.backend.hook_key(scan_key, self.on_scan)
 
         # Take the screenshot for the item name (in inventory/stash)
         while not self.need_quit:
@@ -102,28 +133,22 @@ class ProcessManager(threading.Thread):
                 self.resumeEvent.wait()
                 self.listen = True
 
-                keyboard.unhook_key(interact_key)
-                try:
-                    with open("_internal/settings.json", "r") as settings_file:
-                        settings = json.load(settings_file)
-                        interact_key = settings.get("interact_key", "f")
-                    # Re-register the keyboard interact key
-                    keyboard.on_press_key(key=interact_key, callback=self.on_release)
-
-                except (FileNotFoundError, json.JSONDecodeError) as e:
-                    logger.error(f"Failed to reload settings: {e}")
-                    interact_key = "f"
-                    keyboard.on_press_key(key=interact_key, callback=self.on_release)
+                # Re-register the keyboard keys, they may have been changed in the settings
+                self.backend.unhook_key(interact_key)
+                self.backend.unhook_key(scan_key)
+                interact_key, scan_key = settings.interact_key, settings.scan_key
+                self.backend.hook_key(interact_key, self.on_release)
+                self.backend.hook_key(scan_key, self.on_scan)
 
                 self.resumeEvent.clear()
 
             try:
-                self.img = ImageGrab.grab()
+                with metrics.span("capture"):
+                    self.img = self.backend.grab()
+                if settings.speculative_lookup:
+                    self.speculate()
                 time.sleep(0.1)
                 self.listen_lock = False
-            except ImageGrab.ImageGrabError:
-                logger.exception("Error capturing screenshot")
-                self.need_quit = True
             except OSError:
                 logger.exception("Error accessing screenshot")
                 self.need_quit = True
@@ -132,34 +157,47 @@ class ProcessManager(threading.Thread):
         logger.info("Stopping")
         self.listen = False
         self.need_quit = True
-        # Sentinel objects to allow clean shutdown: 1 per worker.
-        for _ in range(self.num_workers):
-            self.process_queue.put(None)
+        self.stop_workers()
+
+        # Stop the ProcessManager
+        self.join()
+
+    def stop_workers(self) -> None:
+        # Drop pending jobs, then sentinel objects to allow clean shutdown: 1 per worker.
+        self.scheduler.stop(self.num_workers)
 
         # wait for the workers to finish
         for worker in self.workers:
             worker.join()
-
-        # Stop the ProcessManager
-        self.join()
+        if self.speculative_worker is not None:
+            self.speculative_scheduler.stop(1)
+            self.speculative_worker.join()
 
     def on_release(self, _) -> None:
+        '''
+        takes the press and the cursor position, runs on the keyboard hook thread
+        '''
         if self.listen_lock or self.need_quit:
             return
 
         self.listen_lock = True
         logger.debug("Got Listen Lock / released f")
+        mouse_position = self.backend.cursor_position()
+        # Every keystroke waits while the hook thread is busy, the name box is waited for elsewhere
+        threading.Thread(target=self.look_up, args=(mouse_position,), name="KeyPress", daemon=True).start()
+
+    def look_up(self, mouse_position: dict) -> None:
+        '''
+        captures the screen of a key press and submits its lookup
+        '''
+        self.collect_metrics()
 
         # Check if Tarkov is the focused window before doing anything else
-        active_window = GetWindowText(GetForegroundWindow())
-        if active_window != "EscapeFromTarkov":
+        if not self.backend.game_focused():
             logger.warning("Target process is not active")
             self.popup_error(self.lock, "Tarkov is not the active window")
             return
 
-        # Get the mouse position
-        mouse_position = queryMouse_position()
-
         # Define display information for the popup window
         display_info = {
             "x": 0,
@@ -168,16 +206,141 @@ class ProcessManager(threading.Thread):
             "h": 120,  # height for the Tk root
         }
 
-        # Add this instance to the process queue and run it with a pool worker
-        self.process_queue.put(MessageFunc(self.img, mouse_position, display_info, self.gui_queue))
+        if settings.speculative_lookup and self.serve_speculation(mouse_position):
+            return
 
-    def popup_error(self, lock: LockType, err_msg: str) -> None:
-        # Make the popup string message
-        popup_str = f"ERROR: {err_msg}"
+        try:
+            img = self.fresh_frame(mouse_position)
+        except OSError:
+            logger.exception("Error capturing screenshot")
+            self.popup_error(self.lock, "Couldn't capture the screen")
+            return
+
+        # Add this instance to the process queue and run it with a pool worker,
+        # superseding any job from an earlier press
+        self.scheduler.submit(MessageFunc(img, mouse_position, display_info))
 
+    def fresh_frame(self, mouse_position: dict) -> Image:
+        '''
+        a screenshot taken after the key press, in the inventory only once the item name box is up
+        '''
+        # The screen doesn't switch between inventory and raid within a frame, the last one tells which
+        if self.img is not None and MessageFunc(self.img, mouse_position, {}).classify_screen():
+            with metrics.span("tooltip_wait"):
+                waited = wait_for_tooltip(mouse_position, geometry_for(self.img.size), grab=self.backend.grab)
+            if waited is None:
+                logger.debug("No item name box after %.2fs, capturing anyway", TOOLTIP_TIMEOUT)
+            else:
+                logger.debug("Item name box up after %.3fs", waited)
+
+        with metrics.span("capture"):
+            return self.backend.grab()
+
+    def speculate(self) -> None:
+        '''
+        starts a lookup of the item under a resting cursor, cancelled as soon as the cursor moves on
+        '''
+        self.collect_speculations()
+        if not self.backend.game_focused():
+            return
+
+        mouse_position = self.backend.cursor_position()
+        event = self.dwell.update(mouse_position, time.monotonic())
+        if event == MOVED:
+            self.speculative_scheduler.invalidate()
+            return
+        if event != DWELL or not MessageFunc(self.img, mouse_position, {}).classify_screen():
+            return
+
+        roi = gray_roi(self.img.crop(geometry_for(self.img.size).tooltip_box(mouse_position)))
+        if not tooltip_present(roi) or self.speculations.has(mouse_position, roi, time.time()):
+            return
+
+        if self.speculative_worker is None:
+            self.speculative_worker = SpeculativeWorker(
+                self.speculative_scheduler, self.lock, self.speculation_queue, self.metrics_queue, name="Speculative",
+            )
+            self.speculative_worker.start()
+        self.speculative_scheduler.submit(SpeculativeLookup(self.img, mouse_position, self.display_info, roi))
+
+    def serve_speculation(self, mouse_position: dict) -> bool:
+        '''
+        pops up the speculative result of the item under the cursor, False when there isn't one
+        '''
+        self.collect_speculations()
+        try:
+            geometry = geometry_for(self.img.size if self.img is not None else BASE_SIZE)
+            roi = gray_roi(self.backend.grab(bbox=geometry.tooltip_box(mouse_position)))
+        except OSError:
+            return False
+
+        message = self.speculations.match(mouse_position, roi, time.time())
+        if message is None:
+            # The key press needs the CPU more than a speculation that didn't make it in time
+            self.speculative_scheduler.invalidate()
+            return False
+
+        logger.debug("Serving the speculative lookup of %s", message.info["itemName"])
+        generation = self.scheduler.invalidate()
+        with self.lock:
+            self.gui_queue.put(message._replace(generation=generation, sent_at=time.time()))
+        return True
+
+    def collect_speculations(self) -> None:
+        while True:
+            try:
+                self.speculations.put(self.speculation_queue.get_nowait())
+            except q.Empty:
+                return
+
+    def on_scan(self, _) -> None:
+        '''
+        prices everything on the stash screen in one job
+        '''
+        if self.listen_lock or self.need_quit:
+            return
+
+        self.listen_lock = True
+        self.collect_metrics()
+
+        if not self.backend.game_focused():
+            logger.warning("Target process is not active")
+            self.popup_error(self.lock, "Tarkov is not the active window")
+            return
+
+        self.scheduler.submit(StashScan(self.img, self.display_info))
+
+    def collect_metrics(self) -> metrics.MetricsRegistry:
+        '''
+        merges the stage histograms shipped by the workers into this process' registry
+        '''
+        while True:
+            try:
+                metrics.registry.merge(self.metrics_queue.get_nowait())
+            except q.Empty:
+                return metrics.registry
+
+    def stats(self) -> dict[str, float]:
+        '''
+        dropped and cancelled job counts of the scheduler, and the worker lookup latencies
+        '''
+        stats = self.scheduler.stats()
+
+        # First lookups (cold) and the steady-state lookups are reported separately
+        first_lookups = [worker.first_lookup.value for worker in self.workers if worker.first_lookup.value]
+        steady_count = sum(worker.steady_count.value for worker in self.workers)
+        steady_total = sum(worker.steady_total.value for worker in self.workers)
+        stats["warm_up_s"] = max((worker.warm_up_time.value for worker in self.workers), default=0.0)
+        stats["first_lookup_s"] = max(first_lookups, default=0.0)
+        stats["steady_lookup_s"] = steady_total / steady_count if steady_count else 0.0
+        stats["speculative_hits"] = self.speculations.hits
+        stats["speculative_misses"] = self.speculations.misses
+        return stats
+
+    def popup_error(self, lock: LockType, err_msg: str) -> None:
         # Get the multiprocess lock and update the GUI window
         with lock:
-            self.gui_queue.put([popup_str, self.display_info])
+            self.gui_queue.put(error_message(err_msg, self.display_info))
 
 
 class Worker(Process):
@@ -186,20 +349,136 @@ class Worker(Process):
     ~~~~~~~~~~
 
     Does stuff it's told to do in the queue.
+    Jobs superseded before they start are dropped without running.
+    Warms up the templates, OCR engine and connections before taking jobs,
+    and sets the ready event when done.
     '''
-    def __init__(self, queue: Queue, lock: LockType, name: str = "WorkerProcess") -> None:
+
+    # Prepended to the stage names of the shipped timings
+    STAGE_PREFIX = ""
+
+    def __init__(
+        self, scheduler: JobScheduler, lock: LockType, gui_queue: Queue, metrics_queue: Queue, name: str = "WorkerProcess",
+    ) -> None:
         super().__init__(name=name)
         self.daemon = True
-        self.queue = queue
+        self.scheduler = scheduler
         self.lock = lock
+        self.gui_queue = gui_queue
+        self.metrics_queue = metrics_queue
+        # Records go to the single log writer of the main process
+        self.log_queue = log_queue
+        self.log_level = logger.level
+        self.ready = Event()
+        # Latency report shared with the ProcessManager, in seconds
+        self.warm_up_time = Value("d", 0.0)
+        self.first_lookup = Value("d", 0.0)
+        self.steady_total = Value("d", 0.0)
+        self.steady_count = Value("i", 0)
 
     def run(self) -> None:
+        configure_worker_logging(self.log_queue, self.log_level)
+        configure_tesseract()
+        self.warm_up()
+
         # Worker Loop
         while True:
-            process = self.queue.get()
+            process = self.scheduler.get()
             if process is None:
                 break
-            process.run(self.lock)
+            if not self.scheduler.is_current(process.generation):
+                self.scheduler.discard(process)
+                continue
+
+            start = time.perf_counter()
+            try:
+                process.run(self.lock, self.gui_queue, self.scheduler)
+            except Exception as e:
+                # A page or stash the scrapers didn't expect fails the job, not the worker
+                logger.exception("%s failed job %d: %s", self.name, process.generation, e)
+                self.job_failed(process)
+            # Stash scans have their own span, they'd skew the single item latency
+            if isinstance(process, MessageFunc):
+                self.record_lookup(time.perf_counter() - start)
+
+            # Ship this job's stage timings to the ProcessManager
+            self.metrics_queue.put({
+                self.STAGE_PREFIX + stage: histogram for stage, histogram in metrics.registry.drain().items()
+            })
+
+    def job_failed(self, process: "MessageFunc | StashScan") -> None:
+        '''
+        pops up an error for a job that raised, unless a newer press superseded it
+        '''
+        if self.scheduler.is_current(process.generation):
+            with self.lock:
+                self.gui_queue.put(error_message("Error, please try again", process.display_info_init, process.generation))
+
+    def warm_up(self) -> None:
+        '''
+        pays for the lazy setup up front instead of on the first lookup
+        '''
+        start = time.perf_counter()
+
+        # Templates at every common screen size, the item catalog and the icon index
+        for geometry in PROFILES.values():
+            x1, y1, x2, y2 = geometry.eyewear
+            scaled_template(COMPARE_IMG_PATH, (x2 - x1, y2 - y1))
+        load_catalog()
+        load_icon_index()
+
+        # OCR engine, the first run loads the language model
+        try:
+            pytesseract.image_to_string(np.zeros((32, 96), dtype=np.uint8), lang="eng", config="--psm 6")
+        except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError, OSError) as e:
+            logger.warning("%s couldn't initialise tesseract: %s", self.name, e)
+
+        # Upstream connections, opened in the background so an unreachable host doesn't hold up the worker
+        transport.warm_up_connections()
+
+        self.warm_up_time.value = time.perf_counter() - start
+        metrics.observe("warm_up", self.warm_up_time.value)
+        logger.info("%s warmed up in %.2fs", self.name, self.warm_up_time.value)
+        self.ready.set()
+
+    def record_lookup(self, duration: float) -> None:
+        if not self.first_lookup.value:
+            self.first_lookup.value = duration
+            logger.info("%s first lookup took %.2fs", self.name, duration)
+            return
+
+        self.steady_total.value += duration
+        self.steady_count.value += 1
+        logger.info(
+            "%s lookup took %.2fs (steady-state avg %.2fs)",
+            self.name, duration, self.steady_total.value / self.steady_count.value,
+        )
+
+
+class SpeculativeWorker(Worker):
+    '''
+    SpeculativeWorker
+    ~~~~~~~~~~
+
+    Runs the speculative lookups at idle priority on a single thread, so
+    they only get the CPU time the game leaves over.
+    '''
+
+    STAGE_PREFIX = "speculative/"
+
+    def run(self) -> None:
+        import psutil
+
+        process = psutil.Process()
+        process.nice(psutil.IDLE_PRIORITY_CLASS if hasattr(psutil, "IDLE_PRIORITY_CLASS") else 19)
+        cv2.setNumThreads(1)
+        # Inherited by the tesseract processes, like the priority
+        os.environ["OMP_THREAD_LIMIT"] = "1"
+        super().run()
+
+    def job_failed(self, process: "SpeculativeLookup") -> None:
+        # The key press looks the item up itself
+        pass
 
 
 class MessageFunc():
@@ -212,22 +491,23 @@ class MessageFunc():
     and popups the item's market price and item quest information if it exists.
     '''
 
-    # Constants for UI coordinates
-    INVENTORY_COORDS = {
-        'eyewear_text': {
-            'x1': 598,
-            'y1': 421,
-            'x2': 692,
-            'y2': 441
-        }
-    }
-
-    def __init__(self, img: Image, mouse_pos: dict, display_info_init: dict[str, int], gui_queue: Queue):
+    def __init__(self, img: Image, mouse_pos: dict, display_info_init: dict[str, int]):
         self.need_quit = False
+        # Set by the JobScheduler, a newer generation supersedes this job
+        self.generation = 0
+        self.scheduler = None
+        self.cancelled = False
+        # Flight recorder job, started by the first artifact
+        self.record_id: int | None = None
+        # Seconds spent per stage, filled in while running
+        self.timings: dict[str, float] = {}
         self.img = img
+        # Crop boxes and size filters of the screen the image was taken on
+        self.geometry = geometry_for(img.size if img is not None else BASE_SIZE)
         self.mouse_pos = mouse_pos
         self.display_info_init = display_info_init
-        self.gui_queue = gui_queue
+        # Handed over by the worker, queues can't travel inside a queued job
+        self.gui_queue = None
         # The debug mode determines what logs and images are shown when running
         logger_levels = {
             10: 3,  # DEBUG
@@ -238,130 +518,169 @@ class MessageFunc():
         }
         self.debug_mode = logger_levels[logger.level]
 
-    def run(self, lock: LockType) -> None:
+    def run(self, lock: LockType, gui_queue: Queue, scheduler: JobScheduler | None = None) -> None:
+        self.gui_queue = gui_queue
+        self.scheduler = scheduler
+        with metrics.job(self.generation) as self.timings, metrics.span("lookup"):
+            self.lookup(lock)
+
+        if self.debug_mode >= 3:
+            recorder.note(self.record_job(), timings=self.timings, cancelled=self.cancelled)
+
+    def lookup(self, lock: LockType) -> None:
         while not self.need_quit:
-            # Temp files for the images to be worked with
-            temp_files = self.create_temp_files()
+            if self.superseded():
+                break
 
             # Determine if in inventory/stash or game(picking up loose item)
-            # Get the "eyewear" inventory text  in the inventory screen as a determinate
-            check_img = self.img.crop((
-                self.INVENTORY_COORDS['eyewear_text']['x1'],
-                self.INVENTORY_COORDS['eyewear_text']['y1'],
-                self.INVENTORY_COORDS['eyewear_text']['x2'],
-                self.INVENTORY_COORDS['eyewear_text']['y2'],
-            ))
-            check_img.save(temp_files[0], dpi=(5000, 5000))
-            check_img = cv2.imread(temp_files[0])
-            os.remove(temp_files[0])
-            compare_img = cv2.imread("_internal/compare_img.png")
-
-            if self.debug_mode >= 2:
-                self.show_image(compare_img, "compare_img", "Showing eyewear inventory text expected image")
-                self.show_image(check_img, "check_img", "Showing eyewear inventory text captured image")
-
-            diff_num = self.mse(check_img, compare_img)
-            is_inventory = self.determine_inventory(diff_num)
-
-            search_areas = self.get_search_areas(is_inventory)
-            # Save the cropped screen image
-            self.img.crop(search_areas[0]).save(temp_files[1], dpi=(500, 500))
-            # Save the cropped screen image
-            self.img.crop(search_areas[1]).save(temp_files[2], dpi=(500, 500))
-
-            page = None
-            main_try_attempt = 1
-            main_try_limit = 2
-            found = False
+            with metrics.span("classify"):
+                is_inventory = self.classify_screen()
+
+            # The cropped screen images to be worked with
+            with metrics.span("crop"):
+                crops = self.crop_search_areas(is_inventory)
+
+            if self.debug_mode >= 3:
+                for idx, crop in enumerate(crops):
+                    self.record_image(crop, f"search_crop_{idx}", "Recording search crop")
+
+            # A confident match of the hovered icon makes the OCR unnecessary
+            icon_name = None
+            if is_inventory:
+                with metrics.span("icon"):
+                    icon_name = self.identify_icon()
+
+            # The job only needs its crops from here on
+            self.img = None
 
             try:
-                while not found:
-                    if self.debug_mode >= 1:
-                        logger.info(f"Found?? {found} {main_try_attempt} > {main_try_limit}")
+                display_info = self.item_info(self.name_text(icon_name)) if icon_name is not None else None
+                # Falls back to the OCR when there's no icon match or its item can't be looked up
+                if display_info is None and not self.superseded():
+                    display_info = self.read_item(crops, is_inventory)
 
-                    if main_try_attempt > main_try_limit:
-                        self.need_quit = True
-                        break
+                if display_info is not None:
+                    # Popup display information/position dictionary
+                    display_info.update(self.display_info_init)
+                    self.update_gui(lock, display_info)
+                elif not self.superseded():
+                    self.popup_error(lock, "Error, please try again")
 
-                    # Run tesseract on the image
-                    image = self.process_image(main_try_attempt, temp_files, is_inventory)
+                # Stop the runloop for this process
+                self.need_quit = True
 
-                    if image is None:
-                        if self.debug_mode >= 1:
-                            logger.info("No captures found")
-                        self.popup_error(lock, "Error, please try again")
-                        main_try_attempt = main_try_attempt + 1
-                        self.need_quit = True
-                        break
+            except (requests.RequestException, ValueError) as error:
+                if self.debug_mode >= 1:
+                    logger.exception("Failed to process request: %s", error)
 
-                    text, threshold = self.extract_text(image)
+                self.popup_error(lock, "Error, please try again")
+                # Stop the runloop for this process
+                self.need_quit = True
 
-                    if self.debug_mode >= 3:
-                        try:
-                            img = Image.fromarray(threshold, "RGB")
-                            img.show()
-                            cv2.waitKey(0)
-                        except (ValueError, OSError) as e:
-                            logger.error(f"Error displaying threshold image: {e}")
+    def read_item(self, crops: tuple[MatLike, MatLike], is_inventory: bool) -> dict | None:
+        '''
+        reads the item name and looks up its most likely reading, None when nothing usable was read
+        '''
+        # The name is localized in the first search area that has it, nothing is looked up in between
+        with metrics.span("localize"):
+            for attempt in range(1, len(crops) + 1):
+                image = self.process_image(attempt, crops, is_inventory)
+                if image is not None:
+                    break
 
-                    elif self.debug_mode >= 1:
-                        logger.debug(f"Extracted Text: {text}")
+        if image is None:
+            if self.debug_mode >= 1:
+                logger.info("No captures found")
+            return None
 
-                    wordlist = self.clean_text(text)
+        with metrics.span("ocr"):
+            words, threshold = self.extract_words(image)
 
-                    if not self.validate_wordlist(wordlist):
-                        main_try_attempt += 1
-                        self.popup_error(lock, "Error, please try again")
-                        self.need_quit = True
-                        break
+        if self.debug_mode >= 3:
+            self.record_image(threshold, f"threshold_{attempt}", "Recording threshold image")
+            recorder.note(self.record_job(), text=" ".join(word for word, _ in words), confidences=[conf for _, conf in words])
 
-                    corrected_text = self.correct_text(wordlist)
-                    true_name = self.get_full_item_name(corrected_text, "wiki")
+        elif self.debug_mode >= 1:
+            logger.debug("Extracted Words: %s", words)
 
-                    if not true_name:
-                        main_try_attempt += 1
-                        self.popup_error(lock, "Error, please try again")
-                        self.need_quit = True
-                        break
+        if self.superseded():
+            return None
 
-                    if self.debug_mode >= 1:
-                        logger.info(f"{corrected_text} to correct {true_name}")
+        words = self.clean_words(words)
+        if not self.validate_wordlist([word for word, _ in words]):
+            return None
 
-                    URL = self.get_item_url(corrected_text, "market")
-                    page, page2 = self.fetch_pages(URL, true_name, corrected_text)
+        # One scored decision between the readings instead of a lookup per try
+        with metrics.span("correct"):
+            corrected_text = self.correct_text(self.best_reading(words))
 
-                    if not page or not page2:
-                        main_try_attempt += 1
-                        self.popup_error(lock, "Error, please try again")
-                        self.need_quit = True
-                        break
+        return self.item_info(corrected_text)
 
-                    if self.debug_mode >= 1:
-                        logger.info("Getting Item Information...")
+    def item_info(self, corrected_text: str) -> dict | None:
+        '''
+        resolves the corrected item text and scrapes its prices and quests, None when it can't be found
+        '''
+        with metrics.span("resolve"):
+            true_name = self.catalog_name(corrected_text) or self.get_full_item_name(corrected_text, "wiki")
 
-                    display_info = self.parse_pages(page, page2, true_name)
+        if not true_name:
+            return None
 
-                    if self.debug_mode >= 1:
-                        logger.info(f"PARSED INFO: {display_info["itemLastLowSoldPrice"]}, {display_info["item24hrAvgPrice"]}, {display_info["traderName"]}, {display_info["itemTraderPrice"]}, \n {display_info["quests"]}")
+        if self.debug_mode >= 1:
+            logger.info("%s to correct %s", corrected_text, true_name)
+        if self.debug_mode >= 3:
+            recorder.note(self.record_job(), corrected_text=corrected_text, name=true_name)
 
-                    # Popup display information/position dictionary
-                    display_info.update(self.display_info_init)
-                    self.update_gui(lock, display_info)
+        if self.superseded():
+            return None
 
-                    found = True
-                    if not found:
-                        self.popup_error(lock, "Error, please try again")
+        URL = self.get_item_url(corrected_text, "market")
+        page, page2 = self.fetch_pages(URL, true_name, corrected_text)
 
-                # Stop the runloop for this process
-                self.need_quit = True
+        if self.superseded() or not page or not page2:
+            return None
 
-            except (requests.RequestException, ValueError) as error:
-                if self.debug_mode >= 1:
-                    logger.exception(f"Failed to process request: {error}")
+        if self.debug_mode >= 1:
+            logger.info("Getting Item Information...")
 
-                self.popup_error(lock, "Error, please try again")
-                # Stop the runloop for this process
-                self.need_quit = True
+        with metrics.span("parse"):
+            display_info = self.parse_pages(page, page2, true_name)
+
+        if self.debug_mode >= 1:
+            logger.info(
+                "PARSED INFO: %s, %s, %s, %s, \n %s",
+                display_info["itemLastLowSoldPrice"], display_info["item24hrAvgPrice"],
+                display_info["traderName"], display_info["itemTraderPrice"], display_info["quests"],
+            )
+        return display_info
+
+    def catalog_name(self, corrected_text: str) -> str | None:
+        '''
+        wiki page of the corrected text from the item catalog, saves the search request when it's there
+        '''
+        catalog = load_catalog()
+        item = catalog.find(corrected_text.replace("+", " ")) if catalog is not None else None
+        return item.wiki_name if item is not None and item.wiki_name else None
+
+    def identify_icon(self) -> str | None:
+        '''
+        name of the hovered item from its icon, None when the name box has to be read
+        '''
+        index = load_icon_index()
+        if index is None:
+            return None
+
+        area = self.geometry.icon_search_area(self.mouse_pos)
+        x, y = self.mouse_pos["x"] - area[0], self.mouse_pos["y"] - area[1]
+        match = identify(to_cv_image(self.img.crop(area)), x, y, index, self.geometry)
+        if match is None:
+            return None
+
+        if self.debug_mode >= 1:
+            logger.info("Icon matched %s, %d bits off, %d ahead", match.name, match.distance, match.margin)
+        if self.debug_mode >= 3:
+            recorder.note(self.record_job(), icon=match.name, icon_distance=match.distance)
+        return match.name
 
     def mse(self, imageA: np.ndarray, imageB: np.ndarray) -> float:
         '''
@@ -376,39 +695,66 @@ class MessageFunc():
         # Return the MSE, the lower the error, the more "similar" the two images are.
         return np.mean((imageA.astype("float") - imageB.astype("float")) ** 2)
 
+    def superseded(self) -> bool:
+        '''
+        checked at the stage boundaries, a newer job from the scheduler cancels this one
+        '''
+        if self.cancelled:
+            return True
+
+        if self.scheduler is None or self.scheduler.is_current(self.generation):
+            return False
+
+        self.cancelled = True
+        self.scheduler.cancel(self)
+        return True
+
     def popup_error(self, lock: LockType, err_msg: str) -> None:
-        # Make the popup string message
-        popup_str = f"ERROR: {err_msg}"
+        # A superseded job has nothing left to report
+        if self.superseded():
+            return
 
         # Get the multiprocess lock and update the GUI window
         with lock:
-            self.gui_queue.put([popup_str, self.display_info_init])
-
-    def create_temp_files(self) -> tuple[str, ...]:
-        """Create temporary files with proper cleanup."""
-        temp_files = []
-        for _ in range(3):
-            with tempfile.NamedTemporaryFile(
-                delete=False,
-                suffix=".png",
-                prefix="tia_",  # Add prefix for identification
-                mode="w+b"
-            ) as temp:
-                temp_files.append(temp.name)
-
-        # Register cleanup handler
-        atexit.register(lambda: [os.unlink(f) for f in temp_files if os.path.exists(f)])
-        return tuple(temp_files)
-
-    def show_image(self, image: MatLike, title: str, message: str, use_waitkey: bool = True) -> None:
-        logger.info(message)
-        cv2.imshow(title, image)
-        if use_waitkey:
-            cv2.waitKey(0)
+            self.gui_queue.put(error_message(err_msg, self.display_info_init, self.generation))
+
+    def classify_screen(self) -> bool:
+        '''
+        Get the "eyewear" inventory text in the inventory screen as a determinate
+        '''
+        x1, y1, x2, y2 = self.geometry.eyewear
+        check_img = to_cv_image(self.img.crop((x1, y1, x2, y2)))
+        compare_img = scaled_template(COMPARE_IMG_PATH, (x2 - x1, y2 - y1))
+
+        if self.debug_mode >= 3:
+            self.record_image(compare_img, "compare_img", "Recording eyewear inventory text expected image")
+            self.record_image(check_img, "check_img", "Recording eyewear inventory text captured image")
+
+        diff_num = self.mse(check_img, compare_img)
+        return self.determine_inventory(diff_num)
+
+    def crop_search_areas(self, is_inventory: bool) -> tuple[MatLike, MatLike]:
+        search_areas = self.get_search_areas(is_inventory)
+        return tuple(to_cv_image(self.img.crop(area)) for area in search_areas)
+
+    def record_job(self) -> int:
+        '''
+        the flight recorder job of this lookup, its generation can repeat across workers and runs
+        '''
+        if self.record_id is None:
+            self.record_id = recorder.start_job(generation=self.generation)
+        return self.record_id
+
+    def record_image(self, image: MatLike, title: str, message: str) -> None:
+        '''
+        hands the image to the flight recorder, never blocks the lookup
+        '''
+        logger.debug(message)
+        recorder.capture(self.record_job(), title, image)
 
     def determine_inventory(self, diff_num: int) -> bool:
         if self.debug_mode >= 1:
-            logger.debug(f"Diff: {diff_num}")
+            logger.debug("Diff: %s", diff_num)
         if diff_num < 2000:
             if self.debug_mode:
                 logger.info("Inventory screenshot")
@@ -418,54 +764,44 @@ class MessageFunc():
         return False
 
     def get_search_areas(self, inventory: bool) -> tuple:
-        if inventory:
-            return (
-                (self.mouse_pos["x"] - 16, self.mouse_pos["y"] - 42, self.mouse_pos["x"] + 420, self.mouse_pos["y"] - 10),
-                (self.mouse_pos["x"] - 400, self.mouse_pos["y"] - 65, self.mouse_pos["x"] + 420, self.mouse_pos["y"] - 10),
-            )
+        return self.geometry.search_areas(inventory, self.mouse_pos)
 
-        width, height = self.img.size
-        return (
-            ((width / 2) - 39, (height / 2) + 42, (width / 2) + 40, (height / 2) + 57),
-            ((width / 2) - 32, (height / 2) + 42, (width / 2) + 32, (height / 2) + 57),
-        )
-
-    def extract_text(self, image: MatLike) -> tuple[str, MatLike]:
+    def extract_words(self, image: MatLike) -> tuple[list[tuple[str, float]], MatLike]:
+        '''
+        the words on the image in reading order with tesseract's confidence in each, from 0 to 100
+        '''
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         _, threshold = cv2.threshold(gray, 80, 255, cv2.THRESH_BINARY_INV)
-        return pytesseract.image_to_string(threshold, lang="eng", config="--psm 6"), threshold
-
-    def clean_text(self, text: str) -> list:
-        wordlist = text.strip().split()
+        data = pytesseract.image_to_data(threshold, lang="eng", config="--psm 6", output_type=pytesseract.Output.DICT)
+        words = [(text.strip(), float(conf)) for text, conf in zip(data["text"], data["conf"]) if text.strip()]
+        return words, threshold
 
+    def clean_words(self, words: list[tuple[str, float]]) -> list[tuple[str, float]]:
+        '''
+        the words read with their confidence cleaned of OCR noise, the ones with nothing left dropped
+        '''
         if self.debug_mode >= 1:
-            logger.info(f"{wordlist} {wordlist[len(wordlist)-1]}")
-
-        new_wordlist = []
-        for word in wordlist:
-            if len(word) > 1 and re.match(r"^[-\(\)/.,\"\'a-zA-Z0-9_]*$", word):
-                new_wordlist.append(word.strip(r"[-'”\".`@_!#$%^&*<>?/\}{~:]"))
-        return new_wordlist
+            logger.info("%s", words)
 
-    def process_image(self, attempt: int, temp_files: tuple, is_inventory: bool) -> MatLike | None:
-        if attempt == 1:
-            image1 = cv2.imread(temp_files[1])
-            image2 = cv2.imread(temp_files[2])
-            os.remove(temp_files[1])
-            os.remove(temp_files[2])
-            image = cv2.resize(image1, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+        cleaned_words = [(clean_word(word), confidence) for word, confidence in words]
+        return [(cleaned, confidence) for cleaned, confidence in cleaned_words if cleaned is not None]
 
-        if attempt == 2:
-            image = cv2.resize(image2, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+    def process_image(self, attempt: int, crops: tuple[MatLike, MatLike], is_inventory: bool) -> MatLike | None:
+        # Each attempt works on its own search area
+        # Upscaled to the same size on every screen, the contour limits are in these pixels
+        upscale = self.geometry.upscale
+        image = cv2.resize(crops[attempt - 1], None, fx=upscale, fy=upscale, interpolation=cv2.INTER_CUBIC)
+        (min_width, max_width), (min_height, max_height) = self.geometry.contour_width, self.geometry.contour_height
+        trim_top, trim_bottom, trim_left, trim_right = self.geometry.contour_trim
 
         if is_inventory:
             logger.debug("In inventory contour corrector")
             gray = cv2.cvtColor(image ,cv2.COLOR_BGR2GRAY)
             edged = cv2.Canny(image, 10, 250)
 
-            if self.debug_mode >= 2:
-                self.show_image(gray, "gray", "Showing gray image", False)
-                self.show_image(edged, "edged", "Showing edged image")
+            if self.debug_mode >= 3:
+                self.record_image(gray, f"gray_{attempt}", "Recording gray image")
+                self.record_image(edged, f"edged_{attempt}", "Recording edged image")
 
             (cnts, _) = cv2.findContours(edged.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
@@ -482,20 +818,20 @@ class MessageFunc():
                 # Crop the image to the contour
                 x, y, w, h = cv2.boundingRect(c)
                 # if w>130 and h<175 and h>95:
-                if w > 66 and w < 1212 and h > 66 and h < 168:
+                if w > min_width and w < max_width and h > min_height and h < max_height:
                     idx += 1
-                    new_img = image[y+13:y+h-11,x+11:x+w-11]
+                    new_img = image[y+trim_top:y+h-trim_bottom,x+trim_left:x+w-trim_right]
                     imagesList.append(new_img)
                     height, width, _ = np.array(new_img).shape
                     area = height * width
                     areaList.append(area)
                     if self.debug_mode >= 3:
-                        self.show_image(new_img, f"slice_img{str(i)}", f"Showing slice image {str(i)}")
+                        self.record_image(new_img, f"slice_img_{attempt}_{i}", f"Recording slice image {str(i)}")
                     i += 1
 
-            if self.debug_mode >= 2:
-                self.show_image(image, "image", "Showing image with contours")
-                logger.debug(f"Number of Contours: {len(areaList) == 0}")
+            if self.debug_mode >= 3:
+                self.record_image(image, f"contours_{attempt}", "Recording image with contours")
+                logger.debug("Number of Contours: %d", len(areaList))
 
             # Check that it's a good image grab that has contour areas
             if len(areaList) == 0:
@@ -511,8 +847,8 @@ class MessageFunc():
         else:
             logger.debug("In raid, no contour corrector")
 
-        if self.debug_mode >= 2:
-            self.show_image(image, "final_image", "Showing final image")
+        if self.debug_mode >= 3:
+            self.record_image(image, f"final_image_{attempt}", "Recording final image")
 
         return image
 
@@ -521,6 +857,23 @@ class MessageFunc():
             return False
         return not wordlist[0] == "Body"
 
+    def best_reading(self, words: list[tuple[str, float]]) -> list[str]:
+        '''
+        the most likely reading of the words that names an item in the catalog, else the most likely one
+        '''
+        readings = [list(reading.words) for reading in rank_readings(words)]
+        readings = [wordlist for wordlist in readings if self.validate_wordlist(wordlist)] or [[word for word, _ in words]]
+
+        # Every reading is checked locally, only the chosen one is looked up online
+        catalog = load_catalog()
+        if catalog is not None:
+            for rank, wordlist in enumerate(readings):
+                if catalog.find(self.correct_text(wordlist).replace("+", " ")) is not None:
+                    if self.debug_mode >= 1 and rank:
+                        logger.info("Read %s as %s", readings[0], wordlist)
+                    return wordlist
+        return readings[0]
+
     def correct_text(self, wordlist: list) -> str:
         corrected_text = " ".join(wordlist)
 
@@ -541,6 +894,13 @@ class MessageFunc():
         pattern = re.compile("|".join(rep.keys()))
         return pattern.sub(lambda m: rep[re.escape(m.group(0))], corrected_text).replace("__", "_").lstrip("()").strip("_-.,").replace("/", "_").replace("_Version", "")
 
+    def name_text(self, name: str) -> str:
+        '''
+        an item name in the form correct_text gives a reading of it, the market URL fallbacks expect it
+        '''
+        # Without the fixes for OCR misreads, they'd mangle a name that's spelled right
+        return name.replace(" ", "+").replace("/", "_")
+
     def construct_search_url(self, site: str, search_text: str) -> str:
         if not search_text:
             return None
@@ -574,7 +934,7 @@ class MessageFunc():
             if not all([parsed.scheme, parsed.netloc]):
                 raise ValueError("Invalid URL constructed")
 
-            page = requests.get(search_url, timeout=10)
+            page = transport.get(search_url, timeout=10)
             page.raise_for_status()  # Raises an HTTPError if the status is 4xx, 5xx
 
             soup = BeautifulSoup(page.content, 'html.parser')
@@ -587,13 +947,13 @@ class MessageFunc():
                 return None
 
         except (RequestException, HTTPError) as e:
-            logger.exception("Failed to fetch search results: %s", str(e))
+            logger.exception("Failed to fetch search results: %s", e)
             return None
         except Timeout:
             logger.error("Request timed out")
             return None
         except ValueError as e:
-            logger.error("Invalid URL or site: %s", str(e))
+            logger.error("Invalid URL or site: %s", e)
             return None
 
 
@@ -603,7 +963,7 @@ class MessageFunc():
                 raise ValueError("Invalid site. Choose 'market' or 'wiki'.")
 
             search_url = self.construct_search_url(site, search_text)
-            page = requests.get(search_url, timeout=10)
+            page = transport.get(search_url, timeout=10)
             page.raise_for_status()  # Raises an HTTPError if the status is 4xx, 5xx
 
             soup = BeautifulSoup(page.content, 'html.parser')
@@ -622,7 +982,7 @@ class MessageFunc():
             return f"https://google.com{a_list[0]['href']}" if a_list else None
 
         except Exception as e:
-            logger.exception(f"Error: Couldn't get item url from {site} search: {e}")
+            logger.exception("Error: Couldn't get item url from %s search: %s", site, e)
             return None
 
     def fetch_pages(self, URL: str, true_name: str, corrected_text: str) -> tuple:
@@ -633,17 +993,18 @@ class MessageFunc():
         while tryCounter <= tryLimit:
             try:
                 if self.debug_mode >= 1:
-                    logger.debug("Tarkov market request Try: ", tryCounter, " ", URL)
+                    logger.debug("Tarkov market request Try: %d %s", tryCounter, URL)
 
-                page1 = requests.get(URL, timeout=10)
+                page1 = transport.get(URL, timeout=10)
 
                 if page1.status_code != 200:
-                    raise Exception("Error Code: ", page1.status_code)
+                    # Retried with the next URL like a failed request
+                    raise requests.HTTPError(f"Error Code: {page1.status_code}", response=page1)
 
                 else:
                     break
 
-            except requests.RequestException as e:
+            except requests.RequestException:
                 if tryCounter == 1:
                     URL = f"https://tarkov-market.com/item/{corrected_text}".lower().capitalize()
 
@@ -667,14 +1028,14 @@ class MessageFunc():
         # Scrape the gamepedia item webpage for more item details
         try:
             URL2 = f"https://escapefromtarkov.gamepedia.com/{true_name}"
-            page2 = requests.get(URL2, timeout=10)
+            page2 = transport.get(URL2, timeout=10)
 
             if page2.status_code != 200:
-                raise Exception("Error Code on gamepedia request: ", page2.status_code)
+                raise requests.HTTPError(f"Error Code on gamepedia request: {page2.status_code}", response=page2)
 
-        except Exception as e:
+        except requests.RequestException as e:
             if self.debug_mode >= 1:
-                logger.exception("Unexpected error: ", e, exc_info=True)
+                logger.exception("Unexpected error: %s", e)
 
         if page2 is None or page2.status_code != 200:
             if self.debug_mode >= 1:
@@ -727,25 +1088,93 @@ class MessageFunc():
             "quests": quests,
         }
 
-    def update_gui(self, lock: LockType, display_info: dict[str, str]) -> None:
-        popup_str = ("{}\n\nLast lowest price: {}\n           24hr Avg: {}\n {}: {}\n\n{}".format(
+    def popup_text(self, display_info: dict[str, str]) -> str:
+        return ("{}\n\nLast lowest price: {}\n           24hr Avg: {}\n {}: {}\n\n{}".format(
             display_info["itemName"], display_info["itemLastLowSoldPrice"],
             display_info["item24hrAvgPrice"], display_info["traderName"].strip(),
             display_info["itemTraderPrice"].strip(), display_info["quests"]
         ))
 
+    def update_gui(self, lock: LockType, display_info: dict[str, str]) -> None:
+        popup_str = self.popup_text(display_info)
+
+        # Only the newest job gets to popup its result
+        if self.superseded():
+            return
+
         with lock:
-            self.gui_queue.put([popup_str, display_info])
+            self.gui_queue.put(result_message(popup_str, display_info, self.generation))
+
+
+class SpeculativeLookup(MessageFunc):
+    '''
+    SpeculativeLookup
+    ~~~~~~~~~~
+
+    A lookup started before the key press. The result goes to the
+    ProcessManager's speculation queue instead of the GUI, errors are
+    dropped, and it gives up once it ran longer than its budget.
+    '''
+    def __init__(self, img: Image, mouse_pos: dict, display_info_init: dict[str, int], roi: np.ndarray) -> None:
+        super().__init__(img, mouse_pos, display_info_init)
+        self.roi = roi
+        self.deadline = 0.0
 
+    def run(self, lock: LockType, gui_queue: Queue, scheduler: JobScheduler | None = None) -> None:
+        self.deadline = time.perf_counter() + JOB_BUDGET
+        super().run(lock, gui_queue, scheduler)
 
-class POINT(Structure):
-    _fields_ = [("x", c_long), ("y", c_long)]
+    def superseded(self) -> bool:
+        if not self.cancelled and self.deadline and time.perf_counter() > self.deadline:
+            logger.debug("Speculative lookup %d ran out of its %.1fs budget", self.generation, JOB_BUDGET)
+            self.cancelled = True
+        return super().superseded()
+
+    def popup_error(self, lock: LockType, err_msg: str) -> None:
+        logger.debug("Speculative lookup %d failed: %s", self.generation, err_msg)
+
+    def update_gui(self, lock: LockType, display_info: dict[str, str]) -> None:
+        if self.superseded():
+            return
+
+        message = result_message(self.popup_text(display_info), display_info, self.generation)
+        with lock:
+            self.gui_queue.put(Speculation(self.mouse_pos, self.roi, message, time.time()))
 
 
-def queryMouse_position() -> dict:
-    pt = POINT()
-    windll.user32.GetCursorPos(byref(pt))
-    return {"x": pt.x, "y": pt.y}
+def to_cv_image(img: Image) -> MatLike:
+    '''
+    PIL image to the BGR array cv2 works with, without a round trip through a file
+    '''
+    return cv2.cvtColor(np.asarray(img.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+
+@functools.cache
+def load_template(path: str) -> MatLike:
+    '''
+    template images are read once per process
+    '''
+    return cv2.imread(path)
+
+
+@functools.cache
+def scaled_template(path: str, size: tuple[int, int]) -> MatLike:
+    '''
+    a template resized to (width, height) of the screen it's compared on
+    '''
+    template = load_template(path)
+    if (template.shape[1], template.shape[0]) == size:
+        return template
+    return cv2.resize(template, size, interpolation=cv2.INTER_AREA)
+
+
+def clean_word(word: str) -> str | None:
+    '''
+    the word without stray punctuation, None when it isn't part of an item name
+    '''
+    if len(word) > 1 and re.match(r"^[-\(\)/.,\"\'a-zA-Z0-9_]*$", word):
+        return word.strip(r"[-'”\".`@_!#$%^&*<>?/\}{~:]")
+    return None
 
 
 def remove_prefix(text: str, prefix: str) -> str:
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Platform Backends
+    ~~~~~~~~~~
+
+    Picks the platform backend of this process. Only the chosen one is
+    imported, so the Windows and X11 libraries are only needed where
+    they're used. TIA_BACKEND overrides the choice (windows, x11 or null).
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import functools
+import importlib
+import os
+import sys
+
+from .base import Backend
+
+
+BACKEND_ENV = "TIA_BACKEND"
+# Module and factory of every backend
+BACKENDS = {
+    "windows": ("windows", "WindowsBackend"),
+    "x11": ("x11", "X11Backend"),
+    "null": ("null", "replay_backend"),
+}
+
+
+def default_backend() -> str:
+    if sys.platform == "win32":
+        return "windows"
+    if os.environ.get("DISPLAY"):
+        return "x11"
+    return "null"
+
+
+@functools.cache
+def get_backend(name: str | None = None) -> Backend:
+    '''
+    the backend of this process, created on first use. Raises ImportError when the platform libraries are missing
+    '''
+    name = name or os.environ.get(BACKEND_ENV) or default_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, choose one of {', '.join(BACKENDS)}")
+
+    module, factory = BACKENDS[name]
+    return getattr(importlib.import_module(f".{module}", __name__), factory)()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Platform Backend
+    ~~~~~~~~~~
+
+    What the analyzer needs from the desktop it runs on: screenshots, the
+    cursor position, whether the game has the focus and is running at all,
+    and global key hooks. The lookup pipeline itself only works on the
+    images, so it runs wherever a backend is available.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from PIL import Image
+
+from logger_config import logger
+
+
+GAME_WINDOW = "EscapeFromTarkov"
+GAME_PROCESS = "escapefromtarkov.exe"
+
+
+class Backend(ABC):
+    '''
+    Backend
+    ~~~~~~~~~~
+
+    The platform interface of the live app. grab raises OSError when the
+    screen can't be captured.
+    '''
+    name = "base"
+
+    @abstractmethod
+    def grab(self, bbox: tuple[int, int, int, int] | None = None) -> Image.Image:
+        ...
+
+    @abstractmethod
+    def cursor_position(self) -> dict:
+        '''
+        {"x": x, "y": y} of the mouse on the screen
+        '''
+
+    @abstractmethod
+    def game_focused(self) -> bool:
+        ...
+
+    def game_running(self) -> bool:
+        return process_running(GAME_PROCESS)
+
+    @abstractmethod
+    def hook_key(self, key: str, callback: Callable) -> None:
+        '''
+        calls callback with the key event every time key is pressed, whichever window has the focus
+        '''
+
+    @abstractmethod
+    def unhook_key(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def valid_key(self, key: str) -> bool:
+        '''
+        whether key names a key that can be hooked
+        '''
+
+
+def process_running(name: str) -> bool:
+    '''
+    whether a process of that executable name runs, also under Wine where only the command line has the full name
+    '''
+    import psutil
+
+    try:
+        for process in psutil.process_iter(["name", "cmdline"]):
+            cmdline = process.info["cmdline"] or [""]
+            names = (process.info["name"] or "", cmdline[0].replace("\\", "/").rsplit("/", 1)[-1])
+            if any(found.lower() == name for found in names):
+                return True
+        return False
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        logger.warning("Failed to properly check if Tarkov is running")
+        return False
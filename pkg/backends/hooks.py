@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Keyboard Hooks
+    ~~~~~~~~~~
+
+    The global key hooks of the keyboard package, shared by the backends
+    of real desktops.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+from typing import Callable
+
+import keyboard
+
+
+class KeyboardHooks():
+    '''
+    KeyboardHooks
+    ~~~~~~~~~~
+
+    hook_key, unhook_key and valid_key of a Backend through the keyboard
+    package, listed before Backend in the bases.
+    '''
+    def hook_key(self, key: str, callback: Callable) -> None:
+        keyboard.on_press_key(key=key, callback=callback)
+
+    def unhook_key(self, key: str) -> None:
+        keyboard.unhook_key(key)
+
+    def valid_key(self, key: str) -> bool:
+        try:
+            keyboard.key_to_scan_codes(key)
+        except ValueError:
+            return False
+        return True
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Null Backend
+    ~~~~~~~~~~
+
+    A desktop without a screen or keyboard, for running the analyzer
+    headless: it plays back recorded screenshots with their mouse positions
+    and presses the hooked keys when told to. Without screenshots it shows a
+    black screen and a game that's never running.
+
+    Replay the fixture screenshots (a screens.jsonl manifest like the one
+    of benchmarks/fixtures) with:
+        TIA_BACKEND=null TIA_REPLAY_SCREENS=benchmarks/fixtures/screens.jsonl
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import json
+import os
+import threading
+from typing import Callable
+
+from PIL import Image
+
+from .base import Backend
+
+
+# Manifest of the screenshots the null backend plays back
+REPLAY_ENV = "TIA_REPLAY_SCREENS"
+
+
+class NullBackend(Backend):
+    '''
+    NullBackend
+    ~~~~~~~~~~
+
+    Plays back (screenshot, mouse position) frames, the current one until
+    advance() moves on to the next. press() calls the callbacks hooked to a
+    key like the keyboard hook would.
+    '''
+    name = "null"
+
+    def __init__(self, frames: list[tuple[Image.Image, dict]] | None = None, size: tuple[int, int] = (1920, 1080)) -> None:
+        self.frames = frames or []
+        self.frame = 0
+        self.size = size
+        self.hooks: dict[str, list[Callable]] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_manifest(cls, path: str) -> "NullBackend":
+        '''
+        the frames of a screens.jsonl manifest, images are relative to it
+        '''
+        frames = []
+        with open(path) as manifest:
+            for line in manifest:
+                if line.strip():
+                    entry = json.loads(line)
+                    image = Image.open(os.path.join(os.path.dirname(path), entry["image"]))
+                    frames.append((image.convert("RGB"), entry["mouse"]))
+        return cls(frames)
+
+    def advance(self) -> None:
+        with self.lock:
+            self.frame = (self.frame + 1) % max(len(self.frames), 1)
+
+    def grab(self, bbox: tuple[int, int, int, int] | None = None) -> Image.Image:
+        with self.lock:
+            image = self.frames[self.frame][0] if self.frames else Image.new("RGB", self.size)
+        return image.crop(bbox) if bbox is not None else image.copy()
+
+    def cursor_position(self) -> dict:
+        with self.lock:
+            if not self.frames:
+                return {"x": self.size[0] // 2, "y": self.size[1] // 2}
+            return dict(self.frames[self.frame][1])
+
+    def game_focused(self) -> bool:
+        return bool(self.frames)
+
+    def game_running(self) -> bool:
+        return bool(self.frames)
+
+    def hook_key(self, key: str, callback: Callable) -> None:
+        with self.lock:
+            self.hooks.setdefault(key, []).append(callback)
+
+    def unhook_key(self, key: str) -> None:
+        with self.lock:
+            self.hooks.pop(key, None)
+
+    def valid_key(self, key: str) -> bool:
+        return bool(key)
+
+    def press(self, key: str) -> None:
+        with self.lock:
+            callbacks = list(self.hooks.get(key, ()))
+        for callback in callbacks:
+            callback(None)
+
+
+def replay_backend() -> NullBackend:
+    '''
+    the null backend playing the screenshots of TIA_REPLAY_SCREENS, if it's set
+    '''
+    manifest = os.environ.get(REPLAY_ENV)
+    return NullBackend.from_manifest(manifest) if manifest else NullBackend()
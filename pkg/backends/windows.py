@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Windows Backend
+    ~~~~~~~~~~
+
+    The desktop as the game sees it on Windows: PIL's screen grab, the
+    user32 cursor, the foreground window title and the keyboard hooks.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+from ctypes import byref, c_long, Structure, windll
+
+from PIL import Image, ImageGrab
+# pylint: disable=no-name-in-module
+from win32gui import GetForegroundWindow, GetWindowText
+# pylint: enable=no-name-in-module
+
+from .base import GAME_WINDOW, Backend
+from .hooks import KeyboardHooks
+
+
+class POINT(Structure):
+    _fields_ = [("x", c_long), ("y", c_long)]
+
+
+class WindowsBackend(KeyboardHooks, Backend):
+    '''
+    WindowsBackend
+    ~~~~~~~~~~
+
+    The live app on Windows.
+    '''
+    name = "windows"
+
+    def grab(self, bbox: tuple[int, int, int, int] | None = None) -> Image.Image:
+        return ImageGrab.grab(bbox=bbox)
+
+    def cursor_position(self) -> dict:
+        pt = POINT()
+        windll.user32.GetCursorPos(byref(pt))
+        return {"x": pt.x, "y": pt.y}
+
+    def game_focused(self) -> bool:
+        return GetWindowText(GetForegroundWindow()) == GAME_WINDOW
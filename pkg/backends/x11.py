@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - X11 Backend
+    ~~~~~~~~~~
+
+    The desktop on Linux with an X server, for the game under Wine/Proton:
+    PIL's XCB screen grab, the pointer and the active window from
+    python-xlib, and the keyboard hooks, which need root on Linux.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+from PIL import Image, ImageGrab
+from Xlib import X, display
+from Xlib.error import XError
+
+from .base import GAME_WINDOW, Backend
+from .hooks import KeyboardHooks
+
+
+class X11Backend(KeyboardHooks, Backend):
+    '''
+    X11Backend
+    ~~~~~~~~~~
+
+    The live app on an X11 display, the one in DISPLAY unless given.
+    '''
+    name = "x11"
+
+    def __init__(self, display_name: str | None = None) -> None:
+        self.display_name = display_name
+        self.display = display.Display(display_name)
+        self.root = self.display.screen().root
+        self.active_window = self.display.intern_atom("_NET_ACTIVE_WINDOW")
+        self.window_name = self.display.intern_atom("_NET_WM_NAME")
+
+    def grab(self, bbox: tuple[int, int, int, int] | None = None) -> Image.Image:
+        return ImageGrab.grab(bbox=bbox, xdisplay=self.display_name)
+
+    def cursor_position(self) -> dict:
+        pointer = self.root.query_pointer()
+        return {"x": pointer.root_x, "y": pointer.root_y}
+
+    def game_focused(self) -> bool:
+        try:
+            active = self.root.get_full_property(self.active_window, X.AnyPropertyType)
+            if not active or not active.value[0]:
+                return False
+            window = self.display.create_resource_object("window", active.value[0])
+            title = window.get_full_property(self.window_name, X.AnyPropertyType)
+            name = title.value if title else window.get_wm_name()
+        except XError:
+            # The window closed in between
+            return False
+        if isinstance(name, bytes):
+            name = name.decode(errors="replace")
+        return name == GAME_WINDOW
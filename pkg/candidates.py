@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Reading Candidates
+    ~~~~~~~~~~
+
+    Tesseract's confidence per word tells which words of an item name it
+    is unsure about. Those get the characters it tends to confuse swapped,
+    or are dropped when they're likely noise, and every combination is
+    scored by how likely it is given the confidences. The lookup then takes
+    the most likely reading that names a known item instead of retrying.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import heapq
+import itertools
+import math
+from typing import NamedTuple
+
+
+# Words read with less confidence get alternatives, below NOISE_CONFIDENCE they may be dropped
+LOW_CONFIDENCE = 85.0
+NOISE_CONFIDENCE = 40.0
+# Only the least confident words get a few alternatives, and only the most likely readings are kept
+MAX_UNSURE = 4
+MAX_ALTERNATIVES = 8
+MAX_READINGS = 64
+
+# What tesseract reads instead of what's on the name box
+CONFUSIONS = (
+    ("0", "O"), ("O", "0"), ("1", "I"), ("I", "1"), ("1", "l"), ("l", "1"), ("l", "I"), ("I", "l"), ("l", "i"), ("i", "l"),
+    ("5", "S"), ("S", "5"), ("8", "B"), ("B", "8"), ("2", "Z"), ("Z", "2"), ("6", "G"), ("G", "6"),
+    ("rn", "m"), ("m", "rn"), ("vv", "w"), ("cl", "d"),
+)
+
+
+class Reading(NamedTuple):
+    '''
+    Reading
+    ~~~~~~~~~~
+
+    One way to read the words and its log likelihood given the confidences.
+    '''
+    words: tuple[str, ...]
+    score: float
+
+
+def alternatives(word: str) -> list[str]:
+    '''
+    the word with one confusable character swapped, for every place it can be swapped
+    '''
+    found = []
+    for seen, meant in CONFUSIONS:
+        start = word.find(seen)
+        while start >= 0:
+            found.append(word[:start] + meant + word[start + len(seen):])
+            start = word.find(seen, start + 1)
+    return list(dict.fromkeys(found))
+
+
+def word_options(word: str, confidence: float) -> list[tuple[str, float]]:
+    '''
+    (word, log likelihood) of the word as read and of its alternatives, which share the rest
+    '''
+    likelihood = min(max(confidence / 100, 0.01), 0.99)
+    options = alternatives(word)[:MAX_ALTERNATIVES]
+    if confidence < NOISE_CONFIDENCE:
+        options.append("")
+    if not options:
+        return [(word, 0.0)]
+
+    share = math.log((1 - likelihood) / len(options))
+    return [(word, math.log(likelihood))] + [(option, share) for option in options]
+
+
+def rank_readings(words: list[tuple[str, float]]) -> list[Reading]:
+    '''
+    the most likely readings of the (word, confidence) pairs, most likely first. The first one is
+    the words as read unless tesseract was surer of an alternative
+    '''
+    unsure = sorted(
+        (idx for idx, (_, confidence) in enumerate(words) if confidence < LOW_CONFIDENCE),
+        key=lambda idx: words[idx][1],
+    )[:MAX_UNSURE]
+    choices = [
+        word_options(word, confidence) if idx in unsure else [(word, 0.0)]
+        for idx, (word, confidence) in enumerate(words)
+    ]
+
+    best = heapq.nlargest(
+        MAX_READINGS, itertools.product(*choices), key=lambda combination: sum(score for _, score in combination),
+    )
+    readings: dict[tuple[str, ...], float] = {}
+    for combination in best:
+        reading = tuple(word for word, _ in combination if word)
+        readings.setdefault(reading, sum(score for _, score in combination))
+    return [Reading(reading, score) for reading, score in readings.items()]
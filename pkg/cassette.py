@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - HTTP Cassette
+    ~~~~~~~~~~
+
+    Records the upstream responses of real lookups to a file and plays them
+    back instead of going online, so benchmarks and regression runs give the
+    same answers on a box without internet. Playback can wait as long as the
+    recorded request took, or a fixed time, to keep the timings realistic.
+
+    The file is a run of entries, each written with a single append so
+    every worker process can record to the same cassette:
+        entry header    magic, key, headers and body lengths, status, seconds the request took
+        key             method and URL (plus a hash of the JSON body of a POST), UTF-8
+        headers         the response headers as JSON
+        body            the zlib compressed response body
+    Opening it indexes the newest entry of every key, bodies are only
+    decompressed when they're played.
+
+    Record and play with the transport environment, from the repository root:
+        TIA_TRANSPORT=record TIA_CASSETTE=lookups.cassette python main.py
+        TIA_TRANSPORT=record TIA_CASSETTE=lookups.cassette python analyze.py screenshots/
+        TIA_TRANSPORT=replay TIA_CASSETTE=lookups.cassette TIA_REPLAY_LATENCY=recorded python analyze.py screenshots/
+    List or compact a cassette (keeps the newest entry of every key):
+        python -m pkg.cassette list [cassette]
+        python -m pkg.cassette pack [cassette] [--out packed.cassette]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from typing import NamedTuple
+
+import requests
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from logger_config import logger
+
+
+CASSETTE_PATH = "_internal/http.cassette"
+MAGIC = b"TIH1"
+# Magic, key length, headers length, body length, status, seconds
+ENTRY = struct.Struct("<4sIIIHf")
+# The body is stored decoded, so the headers describing the transfer don't apply on playback
+DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie")
+
+
+class Entry(NamedTuple):
+    '''
+    Entry
+    ~~~~~~~~~~
+
+    Where a recorded response sits in the cassette file.
+    '''
+    key: str
+    status: int
+    seconds: float
+    headers: tuple[int, int]
+    body: tuple[int, int]
+
+
+def request_key(method: str, url: str, json_body: dict | None = None) -> str:
+    '''
+    what a request is recorded under, POSTs to the same URL told apart by their JSON body
+    '''
+    key = f"{method.upper()} {url}"
+    if json_body is not None:
+        body = json.dumps(json_body, sort_keys=True, separators=(",", ":")).encode()
+        key += f" {hashlib.sha1(body).hexdigest()[:16]}"
+    return key
+
+
+def encode_entry(key: str, status: int, seconds: float, headers: dict, content: bytes) -> bytes:
+    key_bytes = key.encode()
+    header_bytes = json.dumps(
+        {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS},
+        separators=(",", ":"),
+    ).encode()
+    body = zlib.compress(content, 6)
+    return ENTRY.pack(MAGIC, len(key_bytes), len(header_bytes), len(body), status, seconds) + key_bytes + header_bytes + body
+
+
+class Cassette():
+    '''
+    Cassette
+    ~~~~~~~~~~
+
+    The recorded responses of a cassette file by key, and the appending end
+    for recording more. Entries are read through a read-only memory map, a
+    cassette opened for playback doesn't see entries recorded after it.
+    '''
+    def __init__(self, path: str = CASSETTE_PATH) -> None:
+        self.path = path
+        self.entries: dict[str, Entry] = {}
+        self.data: mmap.mmap | bytes = b""
+        self.appender: int | None = None
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as cassette_file:
+                self.data = mmap.mmap(cassette_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.index()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def index(self) -> None:
+        offset = 0
+        while offset + ENTRY.size <= len(self.data):
+            magic, key_length, headers_length, body_length, status, seconds = ENTRY.unpack_from(self.data, offset)
+            end = offset + ENTRY.size + key_length + headers_length + body_length
+            if magic != MAGIC or end > len(self.data):
+                # A recording cut off mid-write, everything before it is still good
+                logger.warning("Cassette %s is damaged at byte %d, ignoring the rest", self.path, offset)
+                break
+
+            start = offset + ENTRY.size
+            key = bytes(self.data[start:start + key_length]).decode()
+            start += key_length
+            # Later entries of a key replace earlier ones
+            self.entries[key] = Entry(
+                key, status, seconds, (start, start + headers_length),
+                (start + headers_length, end),
+            )
+            offset = end
+
+    def response(self, key: str, url: str) -> Response:
+        '''
+        the recorded response of the key, raises a ConnectionError like an unreachable host when there's none
+        '''
+        entry = self.entries.get(key)
+        if entry is None:
+            raise requests.ConnectionError(f"No recorded response for {key} in {self.path}")
+
+        response = Response()
+        response.status_code = entry.status
+        response.url = url
+        response.headers = CaseInsensitiveDict(json.loads(bytes(self.data[slice(*entry.headers)])))
+        response._content = zlib.decompress(self.data[slice(*entry.body)])
+        response.encoding = response.headers.get("content-type", "").partition("charset=")[2] or None
+        response.elapsed = datetime.timedelta(seconds=entry.seconds)
+        return response
+
+    def record(self, key: str, response: Response) -> None:
+        '''
+        appends the response, kept when the cassette is opened next
+        '''
+        if self.appender is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.appender = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        os.write(self.appender, encode_entry(
+            key, response.status_code, response.elapsed.total_seconds(), dict(response.headers), response.content,
+        ))
+
+    def close(self) -> None:
+        if self.appender is not None:
+            os.close(self.appender)
+            self.appender = None
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+            self.data = b""
+
+
+def pack(path: str, out: str) -> int:
+    '''
+    writes the newest entry of every key to out, sorted by key, and returns how many there are
+    '''
+    cassette = Cassette(path)
+    packed = bytearray()
+    for key in sorted(cassette.entries):
+        entry = cassette.entries[key]
+        packed += ENTRY.pack(
+            MAGIC, len(key.encode()), entry.headers[1] - entry.headers[0], entry.body[1] - entry.body[0],
+            entry.status, entry.seconds,
+        )
+        packed += key.encode() + cassette.data[entry.headers[0]:entry.body[1]]
+    count = len(cassette)
+    cassette.close()
+
+    with open(f"{out}.tmp", "wb") as out_file:
+        out_file.write(packed)
+    os.replace(f"{out}.tmp", out)
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Lists or compacts recorded HTTP responses")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="print the recorded requests")
+    listing.add_argument("cassette", nargs="?", default=CASSETTE_PATH)
+    packing = commands.add_parser("pack", help="drop all but the newest entry of every request")
+    packing.add_argument("cassette", nargs="?", default=CASSETTE_PATH)
+    packing.add_argument("--out", help="write the packed cassette here instead of over the original")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cassette):
+        print(f"No cassette at {args.cassette}")
+        return 1
+
+    if args.command == "pack":
+        before = os.path.getsize(args.cassette)
+        out = args.out or args.cassette
+        count = pack(args.cassette, out)
+        print(f"Packed {count} responses, {before} -> {os.path.getsize(out)} bytes")
+        return 0
+
+    cassette = Cassette(args.cassette)
+    for key, entry in sorted(cassette.entries.items()):
+        size = entry.body[1] - entry.body[0]
+        print(f"{entry.status} {entry.seconds * 1000:6.0f}ms {size:>8}B  {key}")
+    print(f"{len(cassette)} responses")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Item Catalog
+    ~~~~~~~~~~
+
+    Names, short names, slugs, wiki pages and quest flags of every item in
+    a compact binary file. It's memory-mapped read-only, so every worker
+    shares the same pages and opening it costs next to nothing.
+
+    File layout, little endian, sections 8 byte aligned:
+        header          magic, version, item and string counts, section table
+        string offsets  uint32 per string plus one, into the string data
+        string data     the interned UTF-8 strings back to back
+        records         one fixed width RECORD per item
+        name index      (name key string, record number) uint32 pairs sorted by key
+        short index     the same for the short name keys
+
+    Build it from the tarkov.dev API or a saved response of CATALOG_QUERY:
+        python -m pkg.catalog build [--source items.json] [--out _internal/catalog.bin]
+        python -m pkg.catalog find "salewa first aid kit"
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import bisect
+import functools
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import NamedTuple
+from urllib.parse import unquote
+
+import numpy as np
+
+
+CATALOG_PATH = "_internal/catalog.bin"
+CATALOG_URL = "https://api.tarkov.dev/graphql"
+CATALOG_QUERY = """{
+    items {
+        id name shortName normalizedName wikiLink basePrice width height types
+        usedInTasks { id }
+    }
+}"""
+
+MAGIC = b"TIAC"
+VERSION = 1
+SECTIONS = ("string_offsets", "string_data", "records", "name_index", "short_index")
+# Magic, version, item count, string count, then offset and length of every section
+HEADER = struct.Struct("<4sIII" + "QQ" * len(SECTIONS))
+
+# Strings are ids into the string table
+RECORD = np.dtype([
+    ("id", "<u4"),
+    ("name", "<u4"),
+    ("short_name", "<u4"),
+    ("slug", "<u4"),
+    ("wiki_name", "<u4"),
+    ("name_key", "<u4"),
+    ("short_key", "<u4"),
+    ("base_price", "<i4"),
+    ("width", "u1"),
+    ("height", "u1"),
+    ("flags", "<u2"),
+])
+
+# Record flags
+QUEST_ITEM = 1
+NO_FLEA = 2
+
+
+class CatalogItem(NamedTuple):
+    '''
+    CatalogItem
+    ~~~~~~~~~~
+
+    One record of the catalog with its strings looked up.
+    '''
+    id: str
+    name: str
+    short_name: str
+    slug: str
+    wiki_name: str
+    base_price: int
+    width: int
+    height: int
+    quest_item: bool
+    no_flea: bool
+
+
+def name_key(text: str) -> str:
+    '''
+    what names are compared by: lowercase, underscores as spaces, single spaces
+    '''
+    return " ".join(text.replace("_", " ").lower().split())
+
+
+class Catalog():
+    '''
+    Catalog
+    ~~~~~~~~~~
+
+    Read-only view of a catalog file. Lookups bisect the prebuilt indexes
+    comparing the raw UTF-8 keys, only the found item is decoded.
+    '''
+    def __init__(self, path: str = CATALOG_PATH) -> None:
+        self.path = path
+        with open(path, "rb") as catalog_file:
+            self.buffer = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.item_count, self.string_count, *table = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} isn't a version {VERSION} item catalog")
+
+        # Views into the mapping, nothing is copied
+        view = memoryview(self.buffer)
+        sections = {
+            name: view[offset:offset + length]
+            for name, offset, length in zip(SECTIONS, table[::2], table[1::2])
+        }
+        self.string_offsets = sections["string_offsets"].cast("I")
+        self.string_data = sections["string_data"]
+        self.records = np.frombuffer(sections["records"], dtype=RECORD)
+        self.name_index = sections["name_index"].cast("I")
+        self.short_index = sections["short_index"].cast("I")
+
+    def __len__(self) -> int:
+        return self.item_count
+
+    def raw_string(self, idx: int) -> bytes:
+        return self.string_data[self.string_offsets[idx]:self.string_offsets[idx + 1]].tobytes()
+
+    def string(self, idx: int) -> str:
+        return self.raw_string(idx).decode("utf-8")
+
+    def item(self, number: int) -> CatalogItem:
+        item_id, name, short_name, slug, wiki_name, _, _, base_price, width, height, flags = self.records[number].tolist()
+        return CatalogItem(
+            id=self.string(item_id),
+            name=self.string(name),
+            short_name=self.string(short_name),
+            slug=self.string(slug),
+            wiki_name=self.string(wiki_name),
+            base_price=base_price,
+            width=width,
+            height=height,
+            quest_item=bool(flags & QUEST_ITEM),
+            no_flea=bool(flags & NO_FLEA),
+        )
+
+    def search(self, index: memoryview, text: str) -> CatalogItem | None:
+        key = name_key(text).encode("utf-8")
+        # UTF-8 bytes sort like the strings they encode
+        position = bisect.bisect_left(range(len(index) // 2), key, key=lambda pos: self.raw_string(index[2 * pos]))
+        if 2 * position < len(index) and self.raw_string(index[2 * position]) == key:
+            return self.item(index[2 * position + 1])
+        return None
+
+    def by_name(self, name: str) -> CatalogItem | None:
+        return self.search(self.name_index, name)
+
+    def by_short_name(self, short_name: str) -> CatalogItem | None:
+        return self.search(self.short_index, short_name)
+
+    def find(self, text: str) -> CatalogItem | None:
+        '''
+        the item named text, or with text as its short name
+        '''
+        return self.by_name(text) or self.by_short_name(text)
+
+    def name_keys(self) -> list[str]:
+        '''
+        the name keys of every item, sorted
+        '''
+        return [self.string(key) for key in self.name_index[::2]]
+
+
+@functools.cache
+def load_catalog(path: str = CATALOG_PATH) -> Catalog | None:
+    '''
+    the catalog of this process, None when it hasn't been built
+    '''
+    if not os.path.exists(path):
+        return None
+    return Catalog(path)
+
+
+def wiki_page(wiki_link: str | None) -> str:
+    '''
+    title of the wiki page a link points at
+    '''
+    return unquote(wiki_link.rstrip("/").rsplit("/", 1)[-1]).replace("_", " ") if wiki_link else ""
+
+
+def build_catalog(items: list[dict], path: str = CATALOG_PATH) -> int:
+    '''
+    writes the catalog of items in the CATALOG_QUERY shape, returns the file size
+    '''
+    strings: dict[str, int] = {}
+
+    def intern(text: str) -> int:
+        idx = strings.get(text)
+        if idx is None:
+            idx = strings[text] = len(strings)
+        return idx
+
+    records = np.zeros(len(items), dtype=RECORD)
+    for number, item in enumerate(items):
+        flags = (QUEST_ITEM if item.get("usedInTasks") else 0) | (NO_FLEA if "noFlea" in (item.get("types") or []) else 0)
+        records[number] = (
+            intern(item["id"]),
+            intern(item["name"]),
+            intern(item["shortName"]),
+            intern(item.get("normalizedName") or ""),
+            intern(wiki_page(item.get("wikiLink"))),
+            intern(name_key(item["name"])),
+            intern(name_key(item["shortName"])),
+            item.get("basePrice") or 0,
+            item.get("width") or 1,
+            item.get("height") or 1,
+            flags,
+        )
+
+    encoded = [text.encode("utf-8") for text in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    np.cumsum([len(data) for data in encoded], out=string_offsets[1:])
+    texts = list(strings)
+
+    def index(field: str) -> np.ndarray:
+        pairs = sorted(zip(records[field].tolist(), range(len(items))), key=lambda pair: texts[pair[0]])
+        return np.array(pairs, dtype="<u4").reshape(-1)
+
+    name_index, short_index = index("name_key"), index("short_key")
+
+    payloads = [string_offsets.tobytes(), b"".join(encoded), records.tobytes(), name_index.tobytes(), short_index.tobytes()]
+    table = []
+    offset = HEADER.size
+    for payload in payloads:
+        offset += -offset % 8
+        table += [offset, len(payload)]
+        offset += len(payload)
+
+    with open(path, "wb") as catalog_file:
+        catalog_file.write(HEADER.pack(MAGIC, VERSION, len(items), len(encoded), *table))
+        for payload, payload_offset in zip(payloads, table[::2]):
+            catalog_file.write(b"\0" * (payload_offset - catalog_file.tell()))
+            catalog_file.write(payload)
+        return catalog_file.tell()
+
+
+def fetch_items() -> list[dict]:
+    from . import transport
+
+    response = transport.post(CATALOG_URL, json={"query": CATALOG_QUERY}, timeout=30)
+    response.raise_for_status()
+    return response.json()["data"]["items"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Builds and queries the item catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build the catalog from tarkov.dev or a saved response")
+    build.add_argument("--source", help="JSON file with the response of CATALOG_QUERY, fetched when left out")
+    build.add_argument("--out", default=CATALOG_PATH)
+    find = commands.add_parser("find", help="look up an item by name or short name")
+    find.add_argument("name")
+    find.add_argument("--catalog", default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.source:
+            with open(args.source, encoding="utf-8") as source_file:
+                data = json.load(source_file)
+            items = data["data"]["items"] if "data" in data else data["items"]
+        else:
+            items = fetch_items()
+        # One record per id, nameless entries are of no use
+        unique = list({item["id"]: item for item in items if (item.get("name") or "").strip()}.values())
+        size = build_catalog(unique, args.out)
+        print(f"Wrote {len(unique)} items to {args.out} ({size / 1024:.0f} KB)")
+        return 0
+
+    item = Catalog(args.catalog).find(args.name)
+    if item is None:
+        print(f"No item {args.name}")
+        return 1
+    print(json.dumps(item._asdict(), indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
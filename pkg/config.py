@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Config
+    ~~~~~~~~~~
+
+    The user settings, parsed once per process and shared by everything
+    that needs them.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import json
+import logging
+import os
+
+
+SETTINGS_PATH = "_internal/settings.json"
+DEFAULT_TESSERACT_PATH = r"D:\Program Files\Tesseract-OCR\tesseract.exe"
+DEBUG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+# Information the item popup can show
+POPUP_FIELDS = ["last_price", "24_avg", "trader", "trader_price", "quest_info", "best_to_sell", "best_to_sell_price"]
+# Every setting and its value when settings.json doesn't have it
+DEFAULTS = {
+    "tesseract_path": "",
+    "debug_level": "INFO",
+    "interact_key": "f",
+    "scan_key": "f6",
+    "speculative_lookup": False,
+    # Seconds the item popup stays up, its opacity from 0 to 1 and what it shows
+    "popup_time": 6.0,
+    "popup_opacity": 1.0,
+    "popup_fields": POPUP_FIELDS,
+}
+
+
+class Settings():
+    '''
+    Settings
+    ~~~~~~~~~~
+
+    The contents of settings.json. Saving through here keeps every reader
+    of this process up to date, nobody has to go back to the file.
+    '''
+    def __init__(self, path: str = SETTINGS_PATH) -> None:
+        self.path = path
+        self.tesseract_path = DEFAULTS["tesseract_path"]
+        self.debug_level = DEFAULTS["debug_level"]
+        self.interact_key = DEFAULTS["interact_key"]
+        self.scan_key = DEFAULTS["scan_key"]
+        self.speculative_lookup = DEFAULTS["speculative_lookup"]
+        self.popup_time = DEFAULTS["popup_time"]
+        self.popup_opacity = DEFAULTS["popup_opacity"]
+        self.popup_fields = list(DEFAULTS["popup_fields"])
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as settings_file:
+                values = json.load(settings_file)
+        except (json.JSONDecodeError, OSError) as e:
+            # The logging isn't set up yet, this goes to stderr
+            logging.getLogger().error("Failed to load settings: %s", e)
+            return
+
+        for key in DEFAULTS:
+            setattr(self, key, values.get(key, getattr(self, key)))
+
+    def save(self, **values: str | bool | float | list[str]) -> None:
+        '''
+        raises OSError when the file can't be written, the settings in memory are updated either way
+        '''
+        for key, value in values.items():
+            if key not in DEFAULTS:
+                raise ValueError(f"Unknown setting: {key}")
+            setattr(self, key, value)
+        with open(self.path, "w") as settings_file:
+            json.dump(self.to_dict(), settings_file, indent=4)
+
+    def to_dict(self) -> dict[str, str | bool | float | list[str]]:
+        return {key: getattr(self, key) for key in DEFAULTS}
+
+
+def configure_tesseract() -> None:
+    '''
+    points pytesseract at the configured binary, left on the PATH default when it doesn't exist
+    '''
+    import pytesseract
+
+    for path in (settings.tesseract_path, DEFAULT_TESSERACT_PATH):
+        if path and os.path.isfile(path):
+            pytesseract.pytesseract.tesseract_cmd = path
+            return
+
+
+# Settings of this process
+settings = Settings()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Lookup Daemon
+    ~~~~~~~~~~
+
+    Serves the item lookups over a local HTTP API so other tools don't need
+    the game: one asyncio server, the blocking OCR and scraping run on a
+    fixed pool of threads sharing the keep-alive upstream session.
+
+    Endpoints:
+        GET  /item?name=<item name>        prices and quests of an item
+        POST /ocr[?inventory=1]            the same for an image crop of the item name
+        POST /batch  {"names": [...]}      several items at once
+        GET  /stats                        request rate, latency and stage timings
+
+    Run with:
+        python -m pkg.daemon [--host 127.0.0.1] [--port 8765] [--workers 8]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+import pytesseract
+
+from logger_config import logger
+from . import metrics, transport
+from .config import configure_tesseract
+from .messages import item_record
+from .TIPA import MessageFunc
+
+
+# Largest request body accepted, an item name crop is a few KB
+MAX_BODY = 8 * 1024 * 1024
+
+# Handler method of each endpoint
+ROUTES = {
+    ("GET", "/item"): "item_endpoint",
+    ("POST", "/ocr"): "ocr_endpoint",
+    ("POST", "/batch"): "batch_endpoint",
+    ("GET", "/stats"): "stats_endpoint",
+}
+ROUTE_PATHS = {path for _, path in ROUTES}
+
+
+class BadRequest(ValueError):
+    '''
+    BadRequest
+    ~~~~~~~~~~
+
+    The query or body of a request the handler can't work with, answered
+    with a 400. Anything else a handler raises is the server's fault.
+    '''
+
+
+class ItemCache():
+    '''
+    ItemCache
+    ~~~~~~~~~~
+
+    Recently found items by search text, expiring after ttl seconds.
+    Least recently used entries go first once max_items is reached.
+    '''
+    def __init__(self, ttl: float = 300, max_items: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_items = max_items
+        self.items: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> dict | None:
+        entry = self.items.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+
+        self.items.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, record: dict) -> None:
+        self.items[key] = (time.monotonic() + self.ttl, record)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+
+
+class LookupDaemon():
+    '''
+    LookupDaemon
+    ~~~~~~~~~~
+
+    HTTP/1.1 keep-alive server on asyncio streams. Lookups of the same item
+    arriving together share one upstream fetch, and results are cached.
+    Requests are counted and timed per endpoint for /stats.
+    '''
+    def __init__(self, workers: int = 8, cache_ttl: float = 300) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Lookup")
+        self.cache = ItemCache(ttl=cache_ttl)
+        self.in_flight: dict[str, asyncio.Future] = {}
+        self.requests = metrics.MetricsRegistry()
+        self.started = time.monotonic()
+        transport.set_pool_size(workers)
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info("Lookup daemon listening on http://%s:%d", host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+
+                method, target, headers, body = request
+                start = time.perf_counter()
+                path = urlsplit(target).path
+                status, payload = await self.dispatch(method, target, body)
+                # Unknown paths share one entry so junk requests can't grow the stats
+                endpoint = "unmatched" if status == HTTPStatus.NOT_FOUND and path not in ROUTE_PATHS else f"{method} {path}"
+                self.requests.observe(endpoint, time.perf_counter() - start)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.debug("Closing connection: %s", e)
+        finally:
+            writer.close()
+
+    async def read_request(self, reader: asyncio.StreamReader) -> tuple | None:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY:
+            raise ValueError(f"Request body of {length} bytes is too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    def write_response(self, writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode()
+        writer.write((
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode("latin-1") + body)
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> tuple[HTTPStatus, dict]:
+        url = urlsplit(target)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        handler = getattr(self, ROUTES.get((method, url.path), ""), None)
+        if handler is None:
+            if url.path in ROUTE_PATHS:
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed on {url.path}"}
+            return HTTPStatus.NOT_FOUND, {"error": f"No endpoint {url.path}"}
+
+        try:
+            return await handler(query, body)
+        except BadRequest as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError, OSError, cv2.error) as e:
+            logger.exception("Lookup failed: %s", e)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            # A page the scrapers didn't expect still gets the client a response
+            logger.exception("Unexpected error handling %s %s: %s", method, url.path, e)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+    async def item_endpoint(self, query: dict, body: bytes) -> tuple[HTTPStatus, dict]:
+        name = query.get("name", "").strip()
+        if not name:
+            raise BadRequest("Missing name parameter")
+
+        record = await self.lookup(name.split())
+        if record is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Couldn't find {name}"}
+        return HTTPStatus.OK, record
+
+    async def ocr_endpoint(self, query: dict, body: bytes) -> tuple[HTTPStatus, dict]:
+        crop = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if crop is None:
+            raise BadRequest("Body isn't an image")
+
+        loop = asyncio.get_running_loop()
+        wordlist = await loop.run_in_executor(self.executor, read_crop, crop, query.get("inventory") == "1")
+        if wordlist is None:
+            return HTTPStatus.UNPROCESSABLE_ENTITY, {"error": "No item name found in the image"}
+
+        record = await self.lookup(wordlist)
+        if record is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Couldn't find {' '.join(wordlist)}"}
+        return HTTPStatus.OK, dict(record, text=" ".join(wordlist))
+
+    async def batch_endpoint(self, query: dict, body: bytes) -> tuple[HTTPStatus, dict]:
+        try:
+            names = json.loads(body or b"{}")["names"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise BadRequest("Body must be a JSON object with the item names") from e
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise BadRequest("names must be a list of item names")
+
+        records = await asyncio.gather(*(self.lookup(name.split()) for name in names))
+        return HTTPStatus.OK, {
+            "items": [
+                record if record is not None else {"item": None, "error": f"Couldn't find {name}"}
+                for name, record in zip(names, records)
+            ],
+        }
+
+    async def stats_endpoint(self, query: dict, body: bytes) -> tuple[HTTPStatus, dict]:
+        uptime = time.monotonic() - self.started
+        endpoints = self.requests.summary()
+        total = sum(endpoint["count"] for endpoint in endpoints.values())
+        return HTTPStatus.OK, {
+            "uptime_s": uptime,
+            "requests": total,
+            "requests_per_s": total / uptime if uptime else 0.0,
+            "endpoints": endpoints,
+            "stages": metrics.registry.summary(),
+            "cache": {"items": len(self.cache.items), "hits": self.cache.hits, "misses": self.cache.misses},
+            "in_flight": len(self.in_flight),
+        }
+
+    async def lookup(self, wordlist: list[str]) -> dict | None:
+        '''
+        the item record of the words, from the cache or shared with an identical lookup still running
+        '''
+        job = MessageFunc(None, {}, {})
+        corrected_text = job.correct_text(wordlist)
+        key = corrected_text.lower()
+
+        record = self.cache.get(key)
+        if record is not None:
+            return record
+
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.in_flight[key] = loop.run_in_executor(self.executor, fetch_record, job, corrected_text)
+            future.add_done_callback(lambda done: self.finish_lookup(key, done))
+        return await asyncio.shield(future)
+
+    def finish_lookup(self, key: str, future: asyncio.Future) -> None:
+        self.in_flight.pop(key, None)
+        # Misses aren't cached, they're as likely an upstream hiccup as a bad name
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            self.cache.put(key, future.result())
+
+
+def fetch_record(job: MessageFunc, corrected_text: str) -> dict | None:
+    with metrics.span("daemon_lookup"):
+        info = job.item_info(corrected_text)
+    return None if info is None else item_record(info)
+
+
+def read_crop(crop: np.ndarray, is_inventory: bool) -> list[str] | None:
+    '''
+    the cleaned words of an item name crop, None when there aren't any
+    '''
+    job = MessageFunc(None, {}, {})
+    with metrics.span("localize"):
+        image = job.process_image(1, (crop,), is_inventory)
+    if image is None:
+        return None
+
+    with metrics.span("ocr"):
+        words, _ = job.extract_words(image)
+    words = job.clean_words(words)
+    if not job.validate_wordlist([word for word, _ in words]):
+        return None
+    return job.best_reading(words)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local HTTP API for item lookups")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8, help="lookups running at once")
+    parser.add_argument("--cache-ttl", type=float, default=300, help="seconds a looked up item is served from cache")
+    args = parser.parse_args()
+
+    configure_tesseract()
+    daemon = LookupDaemon(workers=args.workers, cache_ttl=args.cache_ttl)
+    try:
+        asyncio.run(daemon.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info("Lookup daemon stopped")
+    finally:
+        daemon.executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
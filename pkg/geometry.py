@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Screen Geometry
+    ~~~~~~~~~~
+
+    Where the lookup looks on screens of any resolution. The game lays out
+    its UI for 1920x1080 and scales it with the screen (or with the width on
+    screens taller than 16:9) around the middle, so the crop boxes are kept
+    as 1080p offsets and scaled once per screen size. The name crops are
+    upscaled to the same size on every screen, so the contour size filters
+    of the name box hold everywhere.
+
+    The profiles of the common screen sizes are computed on import. A screen
+    the game lays out differently, or a different UI scale, can be measured
+    from a screenshot of the inventory, which is saved and used instead:
+        python -m pkg.geometry calibrate SCREENSHOT [--out _internal/geometry.json]
+        python -m pkg.geometry show 2560x1440
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import functools
+import json
+import os
+import sys
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from logger_config import logger
+
+
+GEOMETRY_PATH = "_internal/geometry.json"
+COMPARE_IMG_PATH = "_internal/compare_img.png"
+BASE_SIZE = (1920, 1080)
+COMMON_SIZES = (
+    (1280, 720), (1600, 900), (1920, 1080), (1920, 1200), (2560, 1080),
+    (2560, 1440), (2560, 1600), (3440, 1440), (3840, 2160),
+)
+
+# The "eyewear" slot text of the inventory at 1080p
+EYEWEAR_BOX = (598, 421, 692, 441)
+# Name box crops around the mouse in the inventory, the tight one first
+INVENTORY_AREAS = ((-16, -42, 420, -10), (-400, -65, 420, -10))
+# Loose item name crops around the middle of the screen in raid
+RAID_AREAS = ((-39, 42, 40, 57), (-32, 42, 32, 57))
+# How much a 1080p name crop is upscaled for the OCR
+UPSCALE = 3
+# Size limits of the name box contour and what's cut off its edges (top, bottom, left, right), in upscaled pixels
+CONTOUR_WIDTH = (66, 1212)
+CONTOUR_HEIGHT = (66, 168)
+CONTOUR_TRIM = (13, 11, 11, 11)
+# Left end of the name box relative to the mouse at 1080p, inside the box and over the start of the text
+TOOLTIP_ROI = (-8, -36, 56, -16)
+# Rows the whole name box can cover and where it starts, relative to the mouse at 1080p
+NAME_BOX_ROWS = (-42, -10)
+NAME_BOX_LEFT = -12
+# Stash cell pitch at 1080p and how many cells around the mouse are searched for the grid
+STASH_CELL = 63
+SEARCH_CELLS = 6
+
+# Template scales tried when calibrating, and the match needed to trust one
+CALIBRATION_SCALES = np.arange(0.5, 3.0, 0.02)
+MIN_MATCH = 0.8
+
+
+class Geometry(NamedTuple):
+    '''
+    Geometry
+    ~~~~~~~~~~
+
+    The crop boxes and size filters of one screen size, in screen pixels
+    unless noted otherwise.
+    '''
+    size: tuple[int, int]
+    scale: float
+    eyewear: tuple[int, int, int, int]
+    inventory_areas: tuple[tuple[int, int, int, int], ...]
+    raid_areas: tuple[tuple[int, int, int, int], ...]
+    upscale: float
+    contour_width: tuple[int, int]
+    contour_height: tuple[int, int]
+    contour_trim: tuple[int, int, int, int]
+    tooltip_roi: tuple[int, int, int, int]
+    name_box_rows: tuple[int, int]
+    name_box_left: int
+    search_reach: int
+
+    def search_areas(self, inventory: bool, mouse_pos: dict) -> tuple[tuple[int, int, int, int], ...]:
+        '''
+        the name crops on the screen, around the mouse in the inventory and the middle in raid
+        '''
+        if inventory:
+            x, y, areas = mouse_pos["x"], mouse_pos["y"], self.inventory_areas
+        else:
+            x, y, areas = self.size[0] // 2, self.size[1] // 2, self.raid_areas
+        return tuple((x + x1, y + y1, x + x2, y + y2) for x1, y1, x2, y2 in areas)
+
+    def tooltip_box(self, mouse_pos: dict) -> tuple[int, int, int, int]:
+        '''
+        the part of the name box at the mouse that tells whether it's up
+        '''
+        x, y = mouse_pos["x"], mouse_pos["y"]
+        x1, y1, x2, y2 = self.tooltip_roi
+        return (x + x1, y + y1, x + x2, y + y2)
+
+    def icon_search_area(self, mouse_pos: dict) -> tuple[int, int, int, int]:
+        '''
+        the part of the screen around the mouse that holds enough of the grid to find the hovered tile
+        '''
+        x, y, reach = mouse_pos["x"], mouse_pos["y"], self.search_reach
+        return (max(x - reach, 0), max(y - reach, 0), min(x + reach, self.size[0]), min(y + reach, self.size[1]))
+
+
+def ui_scale(size: tuple[int, int]) -> float:
+    '''
+    how much bigger the game draws its UI than at 1080p
+    '''
+    return min(size[0] / BASE_SIZE[0], size[1] / BASE_SIZE[1])
+
+
+def scale_box(box: tuple[int, int, int, int], scale: float) -> tuple[int, int, int, int]:
+    return tuple(int(round(value * scale)) for value in box)
+
+
+def profile(size: tuple[int, int], scale: float | None = None,
+            eyewear: tuple[int, int, int, int] | None = None) -> Geometry:
+    '''
+    the geometry of a screen size, the UI scale and eyewear box measured by calibrate() if given
+    '''
+    scale = scale or ui_scale(size)
+    if eyewear is None:
+        # The inventory stays centered on screens of other aspect ratios
+        center_x, center_y = BASE_SIZE[0] / 2, BASE_SIZE[1] / 2
+        x1, y1, x2, y2 = scale_box(
+            (EYEWEAR_BOX[0] - center_x, EYEWEAR_BOX[1] - center_y, EYEWEAR_BOX[2] - center_x, EYEWEAR_BOX[3] - center_y),
+            scale,
+        )
+        eyewear = (size[0] // 2 + x1, size[1] // 2 + y1, size[0] // 2 + x2, size[1] // 2 + y2)
+
+    return Geometry(
+        size=tuple(size),
+        scale=scale,
+        eyewear=tuple(eyewear),
+        inventory_areas=tuple(scale_box(area, scale) for area in INVENTORY_AREAS),
+        raid_areas=tuple(scale_box(area, scale) for area in RAID_AREAS),
+        upscale=UPSCALE / scale,
+        contour_width=CONTOUR_WIDTH,
+        contour_height=CONTOUR_HEIGHT,
+        contour_trim=CONTOUR_TRIM,
+        tooltip_roi=scale_box(TOOLTIP_ROI, scale),
+        name_box_rows=scale_box(NAME_BOX_ROWS, scale),
+        name_box_left=int(round(NAME_BOX_LEFT * scale)),
+        search_reach=int(round(SEARCH_CELLS * STASH_CELL * scale)),
+    )
+
+
+def size_key(size: tuple[int, int]) -> str:
+    return f"{size[0]}x{size[1]}"
+
+
+def load_calibrations(path: str = GEOMETRY_PATH) -> dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as calibration_file:
+        return json.load(calibration_file)
+
+
+# Profiles of the common screen sizes
+PROFILES = {size: profile(size) for size in COMMON_SIZES}
+
+
+@functools.cache
+def geometry_for(size: tuple[int, int], path: str = GEOMETRY_PATH) -> Geometry:
+    '''
+    the geometry of a screen size, the calibrated one when there is one. Worked out once per size and process
+    '''
+    size = tuple(size)
+    try:
+        calibrated = load_calibrations(path).get(size_key(size))
+        if calibrated is not None:
+            return profile(size, calibrated["scale"], calibrated["eyewear"])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        # A hand edited or half written calibration mustn't fail every lookup
+        logger.warning("Ignoring the calibration of %s in %s: %s", size_key(size), path, e)
+    return PROFILES.get(size) or profile(size)
+
+
+def calibrate(screenshot: np.ndarray, template: np.ndarray) -> tuple[float, tuple[int, int, int, int], float]:
+    '''
+    (UI scale, eyewear box, match) measured by finding the eyewear text of an inventory screenshot,
+    raises ValueError when it isn't on it
+    '''
+    gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+    template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    best = (-1.0, 0.0, (0, 0), (0, 0))
+    for scale in CALIBRATION_SCALES:
+        width, height = int(round(template.shape[1] * scale)), int(round(template.shape[0] * scale))
+        if width > gray.shape[1] or height > gray.shape[0] or min(width, height) < 4:
+            continue
+        scaled = cv2.resize(template, (width, height), interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC)
+        _, match, _, location = cv2.minMaxLoc(cv2.matchTemplate(gray, scaled, cv2.TM_CCOEFF_NORMED))
+        if match > best[0]:
+            best = (match, float(scale), location, (width, height))
+
+    match, scale, (x, y), (width, height) = best
+    if match < MIN_MATCH:
+        raise ValueError(f"No inventory eyewear text on the screenshot, best match {match:.2f}")
+    return round(scale, 3), (x, y, x + width, y + height), match
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Screen geometry profiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibration = commands.add_parser("calibrate", help="measure the profile of a screen from an inventory screenshot")
+    calibration.add_argument("screenshot")
+    calibration.add_argument("--template", default=COMPARE_IMG_PATH)
+    calibration.add_argument("--out", default=GEOMETRY_PATH)
+    show = commands.add_parser("show", help="print the profile of a screen size")
+    show.add_argument("size", help="WIDTHxHEIGHT")
+    show.add_argument("--calibrations", default=GEOMETRY_PATH)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        width, height = map(int, args.size.lower().split("x"))
+        for field, value in geometry_for((width, height), args.calibrations)._asdict().items():
+            print(f"{field:<16}{value}")
+        return 0
+
+    screenshot = cv2.imread(args.screenshot, cv2.IMREAD_COLOR)
+    template = cv2.imread(args.template, cv2.IMREAD_COLOR)
+    if screenshot is None or template is None:
+        print(f"Couldn't read {args.screenshot if screenshot is None else args.template}")
+        return 1
+    try:
+        scale, eyewear, match = calibrate(screenshot, template)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    size = (screenshot.shape[1], screenshot.shape[0])
+    calibrations = load_calibrations(args.out)
+    calibrations[size_key(size)] = {"scale": scale, "eyewear": eyewear}
+    with open(args.out, "w") as calibration_file:
+        json.dump(calibrations, calibration_file, indent=4)
+    print(f"{size_key(size)}: UI scale {scale} ({scale / ui_scale(size):.2f} of the default), eyewear text at {eyewear}, "
+          f"match {match:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,40 +10,33 @@
     :license: GPLv2, see LICENSE for more details.
 '''
 
-import json
 from multiprocessing import Queue
+import importlib
 import os
 import queue as q
+import time
 from collections import deque
-from datetime import datetime, timedelta
 from threading import Thread, Lock
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Optional
 
-import keyboard
-import psutil
-import pytesseract
 import tkinter as Tk
 from pubsub import pub
 from tkinter import (
-    END, Button, Entry, Label, messagebox, OptionMenu,
-    StringVar, TclError, Toplevel, N, S, E, W
+    END, BooleanVar, Button, Checkbutton, Entry, Label, filedialog, messagebox, OptionMenu,
+    StringVar, TclError, N, S, E, W, ttk
 )
 
-from .TIPA import ProcessManager
+from . import metrics
+from .backends import get_backend
+from .config import DEBUG_LEVELS, POPUP_FIELDS, configure_tesseract, settings
+from .messages import ERROR, RESULT, STASH, GuiMessage
+from .overlay import PopupScheduler, item_text
 from logger_config import logger
 
-
-if os.path.exists("_internal/settings.json"):
-    try:
-        with open("_internal/settings.json") as settings_file:
-            settings = json.load(settings_file)
-            pytesseract.pytesseract.tesseract_cmd = settings.get(
-                "tesseract_path",
-                r"D:\Program Files\Tesseract-OCR\tesseract.exe",
-            )
-    except (json.JSONDecodeError, OSError) as e:
-        logger.error(f"Failed to load settings: {e}")
-        settings = {}
+# The lookup pipeline pulls in cv2, numpy, requests and friends, it's loaded after the window is up
+if TYPE_CHECKING:
+    from .history import PriceHistory
+    from .TIPA import ProcessManager
 
 
 class App:
@@ -173,11 +166,21 @@ class GUI(App):
         parent.minsize(300, 90)
         parent.maxsize(1000, 800)
         self.alive_time = 6000
-        self.since_last_popup = datetime.now()
         self.gui_queue = gui_queue
-        self.p_manager = ProcessManager(self.gui_queue, self.cmd_queue)
-        self.popup_widget = Toplevel()
-        self.popup_widget.withdraw()
+        # Results handed from the reader thread to the Tk thread
+        self.results: q.Queue[GuiMessage] = q.Queue()
+        self.popup_scheduler = PopupScheduler()
+        # Created on the first stash scan and reused after that
+        self.stash_overlay: Optional[StashOverlay] = None
+        # Opened on the first result, numpy comes with the pipeline
+        self.price_history: Optional["PriceHistory"] = None
+        # Reused label for the messages in the main body
+        self.status_label = Label(self.body_frame)
+        self.status_after_id: Optional[str] = None
+        # Created once the lookup pipeline is loaded
+        self.p_manager: Optional["ProcessManager"] = None
+        self.pipeline_error = ""
+        self.item_overlay = ItemOverlay(self.hide_popup)
 
         # Buttons
         self.start_btn = Button(self.menu_frame, text="Start",
@@ -186,38 +189,121 @@ class GUI(App):
         self.stop_btn = Button(self.menu_frame, text="Stop",
                                command=self.stop_process_manager)
         self.stop_btn.grid(row=0, column=2, sticky=W+N)
+        self.stats_btn = Button(self.menu_frame, text="Stats",
+                                command=lambda: StatsMenu(self.p_manager))
+        self.stats_btn.grid(row=0, column=3, sticky=W+N)
         self.start_btn.config(state="disabled")
         self.settings_btn.config(state="disabled")
+        self.stop_btn.config(state="disabled")
+        self.stats_btn.config(state="disabled")
 
         # History list content
         self.history_frame = Tk.LabelFrame(self.body_frame, text="Item History", padx=5, pady=5)
         self.history_frame.grid(row=2, column=0, columnspan=5, padx=10, pady=10, sticky=E+W+N+S)
-        self.history_items: deque[tuple[Tk.LabelFrame, Label]] = deque(maxlen=self.MAX_HISTORY_ITEMS)
         self.history_frame.rowconfigure(0, weight=1)
         self.history_frame.columnconfigure(0, weight=1)
+        # Fixed pool of history slots, created once and reused for every item
+        self.history_texts: deque[str] = deque(maxlen=self.MAX_HISTORY_ITEMS)
+        self.history_slots: list[tuple[Tk.LabelFrame, StringVar]] = []
+        for idx in range(self.MAX_HISTORY_ITEMS):
+            item_frame = Tk.LabelFrame(self.history_frame, text="", padx=2, pady=2)
+            text_var = StringVar(item_frame)
+            Label(item_frame, textvariable=text_var).grid(row=0, column=0)
+            item_frame.grid(row=idx, column=0, sticky=E+W)
+            item_frame.grid_remove()
+            self.history_slots.append((item_frame, text_var))
+        # Slots in use, they stay gridded once they are
+        self.history_shown = 0
 
         pub.subscribe(self.settingsMenulistener, "otherFrameClosed")
         pub.subscribe(self.restartRequiredListener, "RestartRequired")
 
+        # Results are rendered on the Tk thread, woken up by the reader thread
+        self.root.bind("<<ResultReady>>", self.on_result_ready)
+        self.reader = Thread(target=self.read_gui_queue, name="GuiQueueReader", daemon=True)
+        self.reader.start()
+
+        # The window is usable now, the pipeline loads in the background
+        self.display_body_message("Loading analyzer...", display_time=0)
+        self.root.bind("<<PipelineLoaded>>", self.on_pipeline_loaded)
+        self.loader = Thread(target=self.load_pipeline, name="PipelineLoader", daemon=True)
+        self.loader.start()
+
+    def load_pipeline(self) -> None:
+        '''
+        imports the lookup pipeline off the Tk thread, then hands over to it
+        '''
+        start = time.perf_counter()
+        try:
+            importlib.import_module(".TIPA", __package__)
+            logger.info("Lookup pipeline loaded in %.2fs", time.perf_counter() - start)
+        except ImportError as e:
+            logger.exception("Failed to load the lookup pipeline: %s", e)
+            self.pipeline_error = str(e)
+
+        try:
+            self.root.event_generate("<<PipelineLoaded>>", when="tail")
+        except (TclError, RuntimeError):
+            # The root window is gone
+            pass
+
+    def on_pipeline_loaded(self, _event: Optional[Tk.Event] = None) -> None:
+        '''
+        starts the ProcessManager, runs on the Tk thread
+        '''
+        if self.pipeline_error:
+            self.display_body_message(f"Failed to load the analyzer: {self.pipeline_error}", display_time=0)
+            return
+
+        from .TIPA import ProcessManager
+
+        self.p_manager = ProcessManager(self.gui_queue, self.cmd_queue)
         self.p_manager.start()
-        self.menu_frame.after(100, self.queue_loop)
+        self.stop_btn.config(state="normal")
+        self.stats_btn.config(state="normal")
+        self.hide_body_message()
 
-    def queue_loop(self) -> None:
+    def read_gui_queue(self) -> None:
         '''
-        starts the thread for poping a message
+        blocks on the gui queue and wakes the Tk main loop as soon as a result arrives
         '''
-        thread = Thread(target=self.popup)
-        thread.start()
-        self.check_status(thread)
+        while True:
+            message_item = self.gui_queue.get()
+            if message_item is None:
+                break
+
+            self.results.put(message_item)
+            try:
+                self.root.event_generate("<<ResultReady>>", when="tail")
+            except (TclError, RuntimeError):
+                # The root window is gone
+                break
 
-    def check_status(self, thread: Thread) -> None:
+    def on_result_ready(self, _event: Optional[Tk.Event] = None) -> None:
         '''
-        shows main frame
+        pops up the arrived results right away, runs on the Tk thread
         '''
-        if thread.is_alive():
-            self.menu_frame.after(200, lambda thread=thread: self.check_status(thread))
-        else:
-            self.menu_frame.after(500, self.queue_loop)
+        while True:
+            try:
+                message_item = self.results.get_nowait()
+            except q.Empty:
+                break
+
+            if message_item.kind == STASH:
+                self.record_prices(message_item)
+                with metrics.span("render"):
+                    self.show_stash(message_item)
+                continue
+
+            if message_item.kind == RESULT:
+                message_item = self.record_prices(message_item)
+                if "itemName" in message_item.info:
+                    message_item = message_item._replace(text=item_text(message_item.info, settings.popup_fields))
+
+            message_item = self.popup_scheduler.accept(message_item)
+            if message_item:
+                with metrics.span("render"):
+                    self.popup(message_item)
 
     def settingsMenulistener(self) -> None:
         '''
@@ -226,14 +312,13 @@ class GUI(App):
         self.start_btn.config(state="normal")
         self.settings_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
+        self.item_overlay.apply_settings()
 
     def restartRequiredListener(self) -> None:
         '''
         listener for the restart required message
         '''
-        label = Label(self.body_frame, text="tesseract_path has been changed, please restart the application")
-        label.grid(row=0, column=0, pady=2)
-        self.body_frame.update()
+        self.display_body_message("tesseract_path has been changed, please restart the application", display_time=0)
         self.start_btn.config(state="disabled")
         self.settings_btn.config(state="disabled")
         self.stop_btn.config(state="disabled")
@@ -242,6 +327,9 @@ class GUI(App):
         '''
         starts the TIPA manager thread if tarkov is running
         '''
+        if self.p_manager is None:
+            return
+
         if self.is_tarkov_running():
             self.p_manager.resumeEvent.set()
             self.settings_btn.config(state="disabled")
@@ -254,7 +342,7 @@ class GUI(App):
         '''
         stops the TIPA manager process, and ready's a new manager thread
         '''
-        if self.p_manager.is_alive():
+        if self.p_manager is not None and self.p_manager.is_alive():
             self.p_manager.listen = False
             self.settings_btn.config(state="normal")
             self.start_btn.config(state="normal")
@@ -262,89 +350,100 @@ class GUI(App):
         else:
             self.display_body_message("Analyzer is not running")
 
-    def popup(self) -> None:
+    def popup(self, message_item: GuiMessage) -> None:
         '''
-        Pops a message overlay on the screen if one exists in the queue.
+        Pops a message overlay on the screen, replacing the one currently shown.
         '''
-        if datetime.now() > self.since_last_popup + timedelta(seconds=self.alive_time / 1000):
-            try:
-                message_item = self.gui_queue.get(timeout=1)
-            except q.Empty:
-                message_item = None
-        else:
-            message_item = None
-
-        if message_item and "ERROR" not in message_item[0]:
-            logger.debug(f"item: {message_item}")
+        if message_item.kind != ERROR:
+            logger.debug("item: %s", message_item)
             self.add_to_history(message_item)
 
-            msg = message_item[0]
-            logger.debug(f"Popping up message: {msg}")
+            msg = self.popup_scheduler.overlay_text()
+            logger.debug("Popping up message: %s", msg)
+            self.item_overlay.show(msg, message_item.sent_at)
 
-            self.popup_widget.geometry('+0+0')
-            self.popup_widget.attributes('-topmost', True)
-            self.popup_widget.overrideredirect(True)
+        else:
+            self.display_body_message(message_item.text)
 
-            label = Label(self.popup_widget, text=f"\n{msg}")
-            label.grid(row=0, column=0, pady=2)
+    def record_prices(self, message_item: GuiMessage) -> GuiMessage:
+        '''
+        keeps the prices of a result in the price history, results come back with what the history says about the item
+        '''
+        from .history import PriceHistory
 
-            self.popup_widget.update()
-            self.popup_widget.deiconify()
+        try:
+            if self.price_history is None:
+                self.price_history = PriceHistory()
 
-            self.popup_widget.after(self.alive_time, self.popup_widget.withdraw)
-            self.popup_widget.after(self.alive_time - 100, label.destroy)
+            with metrics.span("history"):
+                if message_item.kind == STASH:
+                    self.price_history.record_stash(message_item.info["items"])
+                    return message_item
 
-            self.since_last_popup = datetime.now()
+                self.price_history.record(message_item.info)
+                summary = self.price_history.summary(
+                    message_item.info["itemName"], message_item.info["traderName"].strip()
+                )
+        except (OSError, ValueError) as e:
+            logger.error("Failed to update the price history: %s", e)
+            return message_item
 
-            logger.debug("--Displayed popup--")
+        return message_item._replace(info={**message_item.info, **summary}) if summary else message_item
+
+    def show_stash(self, message_item: GuiMessage) -> None:
+        '''
+        shows the priced stash items, replacing the previous scan
+        '''
+        if self.stash_overlay is None:
+            self.stash_overlay = StashOverlay()
+        self.stash_overlay.show(message_item.info["items"])
 
-        elif message_item and "ERROR" in message_item[0]:
-            self.display_body_message(message_item[0])
+    def hide_popup(self) -> None:
+        self.popup_scheduler.clear()
+        logger.debug("Gui queue wait: %s", self.popup_scheduler.stats())
 
     def display_body_message(self, message: str, display_time: Optional[int] = None) -> None:
         '''
-        displays a message in the main body of the app
+        displays a message in the main body of the app, replacing the previous one,
+        a display_time of 0 keeps it up
         '''
         if display_time is None:
             display_time = self.alive_time
-        label = Label(self.body_frame, text=message)
-        label.grid(row=0, column=0, pady=2)
-        self.body_frame.after(display_time-100, lambda: label.destroy())
-        self.body_frame.update()
 
-    def add_to_history(self, message_item: dict[str, dict[str, str]]) -> None:
+        if self.status_after_id is not None:
+            self.body_frame.after_cancel(self.status_after_id)
+            self.status_after_id = None
+
+        self.status_label.config(text=message)
+        self.status_label.grid(row=0, column=0, pady=2)
+        if display_time:
+            self.status_after_id = self.body_frame.after(display_time-100, self.hide_body_message)
+
+    def hide_body_message(self) -> None:
+        self.status_after_id = None
+        self.status_label.grid_remove()
+
+    def add_to_history(self, message_item: GuiMessage) -> None:
         '''
         adds a message to the main apps window that doesn't expire like the popup
         '''
-        msg = message_item[0]
-        logger.debug(f"Adding to history: {msg}")
+        msg = message_item.text
+        logger.debug("Adding to history: %s", msg)
 
-        # Clear previous history items
-        for item_frame, label in self.history_items:
-            item_frame.forget()
-            label.forget()
+        self.history_texts.appendleft("\n" + msg)
 
-        # Create new history item
-        item_frame = Tk.LabelFrame(self.history_frame, text="", padx=2, pady=2)
-        label = Label(item_frame, text=str("\n"+msg))
-        self.history_items.appendleft((item_frame, label))
+        for (_, text_var), text in zip(self.history_slots, self.history_texts):
+            text_var.set(text)
 
-        # Update the history display
-        for idx, (item_frame, label) in enumerate(self.history_items):
-            item_frame.grid(row=idx, column=0, sticky=E+W)
-            label.grid(row=0, column=0)
+        # Only the slot that just got its first item needs gridding
+        if len(self.history_texts) > self.history_shown:
+            self.history_slots[len(self.history_texts) - 1][0].grid()
+            self.history_shown = len(self.history_texts)
 
         logger.debug("--Updated History--")
 
     def is_tarkov_running(self) -> bool:
-        try:
-            return any(
-                p.name().lower() == "escapefromtarkov.exe"
-                for p in psutil.process_iter(['name'])
-            )
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            logger.warning("Failed to properly check if Tarkov is running")
-            return False
+        return get_backend().game_running()
 
 
 class SettingsMenu(OtherFrame):
@@ -356,11 +455,20 @@ class SettingsMenu(OtherFrame):
     '''
 
     TITLE = "Settings"
+    FIELD_LABELS = {
+        "last_price": "Last price",
+        "24_avg": "24hr average",
+        "trader": "Trader",
+        "trader_price": "Trader price",
+        "quest_info": "Quests",
+        "best_to_sell": "Best to sell",
+        "best_to_sell_price": "Best to sell price",
+    }
 
     def __init__(self) -> None:
         super().__init__(SettingsMenu.TITLE)
 
-        self.geometry("500x300")
+        self.geometry("500x440")
         self.restart_required = False
 
         # Menu bar
@@ -392,86 +500,125 @@ class SettingsMenu(OtherFrame):
         self.interact_key_entry = Entry(self, width=5)
         self.interact_key_entry.grid(row=4, column=1, sticky=W)
 
+        # Create a label and text box for the stash scan keybinding
+        self.scan_key_label = Label(self, text="Stash Scan Keybinding:")
+        self.scan_key_label.grid(row=5, column=0, sticky=W)
+        self.scan_key_entry = Entry(self, width=5)
+        self.scan_key_entry.grid(row=5, column=1, sticky=W)
+
+        # Create a label and checkbox for looking up the hovered item ahead of the key press
+        self.speculative_label = Label(self, text="Look Up Hovered Items Early:")
+        self.speculative_label.grid(row=6, column=0, sticky=W)
+        self.speculative_var = BooleanVar(self)
+        self.speculative_check = Checkbutton(self, variable=self.speculative_var)
+        self.speculative_check.grid(row=6, column=1, sticky=W)
+
+        # Create a label and text box for how long the item popup stays up
+        self.popup_time_label = Label(self, text="Popup Time (seconds):")
+        self.popup_time_label.grid(row=7, column=0, sticky=W)
+        self.popup_time_entry = Entry(self, width=5)
+        self.popup_time_entry.grid(row=7, column=1, sticky=W)
+
+        # Create a label and slider for the popup opacity
+        self.popup_opacity_label = Label(self, text="Popup Opacity:")
+        self.popup_opacity_label.grid(row=8, column=0, sticky=W)
+        self.popup_opacity_var = Tk.DoubleVar(self)
+        self.popup_opacity_scale = Tk.Scale(
+            self, variable=self.popup_opacity_var, from_=0.2, to=1.0, resolution=0.05, orient=Tk.HORIZONTAL,
+        )
+        self.popup_opacity_scale.grid(row=8, column=1, sticky=W+E)
+
+        # Create a label and a checkbox for every information the popup can show
+        self.popup_fields_label = Label(self, text="Popup Information:")
+        self.popup_fields_label.grid(row=9, column=0, sticky=W+N)
+        self.popup_fields_frame = Tk.Frame(self)
+        self.popup_fields_frame.grid(row=9, column=1, sticky=W)
+        self.popup_field_vars: dict[str, BooleanVar] = {}
+        for idx, field in enumerate(POPUP_FIELDS):
+            self.popup_field_vars[field] = BooleanVar(self)
+            Checkbutton(self.popup_fields_frame, text=self.FIELD_LABELS[field], variable=self.popup_field_vars[field]).grid(
+                row=idx // 2, column=idx % 2, sticky=W,
+            )
+
         # Load settings from the JSON file
         self.load_settings()
 
         # Create a save button
         self.save_btn = Tk.Button(self, text="Save", command=self.save_settings)
-        self.save_btn.grid(row=5, column=0, columnspan=2, sticky=W+E+N)
+        self.save_btn.grid(row=10, column=0, columnspan=2, sticky=W+E+N)
 
-    def apply_settings(self, settings: dict) -> bool:
-        """Aly application settings with validation."""
+    def validate_settings(self, tesseract_path: str, debug_level: str, interact_key: str, scan_key: str,
+                          popup_time: str) -> bool:
+        """Validate the application settings before they're saved."""
         with Lock():  # Add a class-level lock
-            tesseract_path = settings.get("tesseract_path")
             if tesseract_path and not os.path.isfile(tesseract_path):
                 messagebox.showinfo("Save Failed", f"Invalid Tesseract path: {tesseract_path}")
                 return False
 
-            debug_level = settings.get("debug_level", "INFO")
-            if debug_level not in ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]:
+            if debug_level not in DEBUG_LEVELS:
                 messagebox.showinfo("Save Failed", f"Invalid debug level: {debug_level}")
                 return False
 
-            interact_key = settings.get("interact_key", "f")
+            for name, key in (("interact", interact_key), ("stash scan", scan_key)):
+                if not get_backend().valid_key(key):
+                    messagebox.showinfo("Save Failed", f"Invalid {name} key: {key}")
+                    return False
+
+            if interact_key == scan_key:
+                messagebox.showinfo("Save Failed", "The interact and stash scan keys must differ")
+                return False
+
             try:
-                keyboard.key_to_scan_codes(interact_key)
+                valid_time = 0.5 <= float(popup_time) <= 60
             except ValueError:
-                messagebox.showinfo("Save Failed", f"Invalid interact key: {interact_key}")
+                valid_time = False
+            if not valid_time:
+                messagebox.showinfo("Save Failed", f"Invalid popup time: {popup_time}, use 0.5 to 60 seconds")
                 return False
 
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-            logger.setLevel(debug_level)
-
             return True
 
-    def load_settings(self) -> dict[str, str] | None:
-        # Check if the settings file exists
-        if os.path.exists("_internal/settings.json"):
-            with open("_internal/settings.json") as settings_file:
-                settings = json.load(settings_file)
-                tesseract_path = settings.get("tesseract_path", "")
-                self.tesseract_path_entry.insert(0, tesseract_path)
-                debug_level = settings.get("debug_level", "INFO")
-                self.debug_level_var.set(debug_level)
-                interact_key = settings.get("interact_key", "f")
-                self.interact_key_entry.delete(0, END)
-                self.interact_key_entry.insert(0, interact_key)
-
-        self.apply_settings(settings)
-
-        return settings
+    def load_settings(self) -> None:
+        self.tesseract_path_entry.insert(0, settings.tesseract_path)
+        self.debug_level_var.set(settings.debug_level)
+        self.interact_key_entry.delete(0, END)
+        self.interact_key_entry.insert(0, settings.interact_key)
+        self.scan_key_entry.delete(0, END)
+        self.scan_key_entry.insert(0, settings.scan_key)
+        self.speculative_var.set(settings.speculative_lookup)
+        self.popup_time_entry.delete(0, END)
+        self.popup_time_entry.insert(0, f"{settings.popup_time:g}")
+        self.popup_opacity_var.set(settings.popup_opacity)
+        for field, field_var in self.popup_field_vars.items():
+            field_var.set(field in settings.popup_fields)
 
     def save_settings(self) -> None:
         # Get the form values
         tesseract_path = self.tesseract_path_entry.get()
         debug_level = self.debug_level_var.get()
         interact_key = self.interact_key_entry.get()
+        scan_key = self.scan_key_entry.get()
+        popup_time = self.popup_time_entry.get()
 
-        # Create a dictionary to hold the settings
-        settings = {
-            "tesseract_path": tesseract_path,
-            "debug_level": debug_level,
-            "interact_key": interact_key,
-        }
-
-        # Load the settings from the JSON file
-        if os.path.exists("_internal/settings.json"):
-            with open("_internal/settings.json") as settings_file:
-                old_settings = json.load(settings_file)
-                old_tesseract_path = old_settings.get("tesseract_path", "")
-        else:
-            old_tesseract_path = ""
+        old_tesseract_path = settings.tesseract_path
 
-        if not self.apply_settings(settings):
+        if not self.validate_settings(tesseract_path, debug_level, interact_key, scan_key, popup_time):
             return
 
-        # Save the updated settings to the JSON file
+        # Save the updated settings, the analyzer picks up the new keys when started again
         try:
-            with open("_internal/settings.json", "w") as settings_file:
-                json.dump(settings, settings_file, indent=4)
+            settings.save(
+                tesseract_path=tesseract_path, debug_level=debug_level, interact_key=interact_key, scan_key=scan_key,
+                speculative_lookup=self.speculative_var.get(), popup_time=float(popup_time),
+                popup_opacity=self.popup_opacity_var.get(),
+                popup_fields=[field for field, field_var in self.popup_field_vars.items() if field_var.get()],
+            )
         except IOError as e:
             messagebox.showerror("Error", f"Failed to save settings: {e}")
             return
+        finally:
+            configure_tesseract()
+            logger.setLevel(debug_level)
 
         # Optionally, show a message box to confirm the save
         if tesseract_path != old_tesseract_path:
@@ -487,3 +634,208 @@ class SettingsMenu(OtherFrame):
         super().on_close()
         if self.restart_required:
             pub.sendMessage("RestartRequired")
+
+
+class StatsMenu(OtherFrame):
+    '''
+    StatsMenu
+    ~~~~~~~~~~
+
+    Gui frame showing the lookup stage latencies and the job counts.
+    '''
+
+    TITLE = "Stats"
+
+    def __init__(self, p_manager: "ProcessManager") -> None:
+        super().__init__(StatsMenu.TITLE)
+
+        self.geometry("600x420")
+        self.p_manager = p_manager
+
+        # Menu bar buttons
+        self.refresh_btn = Tk.Button(self.menu_frame, text="Refresh", command=self.refresh)
+        self.refresh_btn.grid(row=0, column=0)
+        self.export_json_btn = Tk.Button(self.menu_frame, text="Export JSON",
+                                         command=lambda: self.export("json"))
+        self.export_json_btn.grid(row=0, column=1)
+        self.export_prom_btn = Tk.Button(self.menu_frame, text="Export Prometheus",
+                                         command=lambda: self.export("prom"))
+        self.export_prom_btn.grid(row=0, column=2)
+
+        # Stats table
+        self.stats_text = Tk.Text(self, width=80, height=22, font=("Courier", 9))
+        self.stats_text.grid(row=2, column=0, sticky=W+E+N+S)
+
+        self.refresh()
+
+    def refresh(self) -> None:
+        '''
+        collects the worker histograms and redraws the table
+        '''
+        registry = self.p_manager.collect_metrics()
+
+        lines = [f"{'stage':<36}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"]
+        for stage, row in registry.summary().items():
+            lines.append(
+                f"{stage:<36}{row['count']:>7}{row['mean'] * 1000:>10.1f}"
+                f"{row['p50'] * 1000:>10.1f}{row['p95'] * 1000:>10.1f}"
+            )
+
+        lines.append("")
+        for key, value in self.p_manager.stats().items():
+            lines.append(f"{key:<36}{value:>10.3g}")
+
+        self.stats_text.delete("1.0", END)
+        self.stats_text.insert(END, "\n".join(lines))
+
+    def export(self, fmt: str) -> None:
+        registry = self.p_manager.collect_metrics()
+        path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=f".{fmt}", initialfile=f"tia_stats.{fmt}",
+        )
+        if not path:
+            return
+
+        try:
+            with open(path, "w") as stats_file:
+                stats_file.write(registry.to_json() if fmt == "json" else registry.to_prometheus())
+        except IOError as e:
+            messagebox.showerror("Error", f"Failed to export stats: {e}")
+
+    def on_close(self) -> None:
+        # Opened without locking the main frame, nothing to notify
+        self.destroy()
+
+
+class ItemOverlay(Tk.Toplevel):
+    '''
+    ItemOverlay
+    ~~~~~~~~~~
+
+    Always on top popup of the looked up items. The window and its label
+    are set up once, a result only sets the text variable and restarts the
+    hide timer, Tk redraws it when it's idle. The time until the redraw is
+    done is recorded as popup_render, from the worker sending the result
+    as result_to_screen.
+    '''
+
+    # Long quest lists wrap instead of running off the screen
+    WRAP_LENGTH = 420
+
+    def __init__(self, on_hide: Callable[[], None]) -> None:
+        super().__init__()
+        self.withdraw()
+        self.overrideredirect(True)
+        self.attributes("-topmost", True)
+        self.geometry("+0+0")
+        self.on_hide = on_hide
+        self.text_var = StringVar(self)
+        Label(self, textvariable=self.text_var, wraplength=self.WRAP_LENGTH).grid(row=0, column=0, pady=2)
+        self.shown = False
+        self.alive_time = 0
+        self.hide_after_id: Optional[str] = None
+        self.apply_settings()
+
+    def apply_settings(self) -> None:
+        self.alive_time = int(settings.popup_time * 1000)
+        self.attributes("-alpha", settings.popup_opacity)
+
+    def show(self, text: str, sent_at: float = 0.0) -> None:
+        '''
+        shows the text, the newest popup gets the full popup time
+        '''
+        self.text_var.set(f"\n{text}")
+        if not self.shown:
+            self.deiconify()
+            self.shown = True
+
+        if self.hide_after_id is not None:
+            self.after_cancel(self.hide_after_id)
+        self.hide_after_id = self.after(self.alive_time, self.hide)
+        # Queued behind the redraw of the new text
+        self.after_idle(self.rendered, time.perf_counter(), sent_at)
+
+    def rendered(self, started: float, sent_at: float) -> None:
+        metrics.observe("popup_render", time.perf_counter() - started)
+        if sent_at:
+            metrics.observe("result_to_screen", time.time() - sent_at)
+        logger.debug("--Displayed popup--")
+
+    def hide(self) -> None:
+        self.hide_after_id = None
+        self.withdraw()
+        self.shown = False
+        self.on_hide()
+
+
+class StashOverlay(Tk.Toplevel):
+    '''
+    StashOverlay
+    ~~~~~~~~~~
+
+    Always on top table of the priced stash items, most valuable first.
+    Clicking a column header sorts by it, clicking it again reverses.
+    Closing only hides it, the next scan shows it again.
+    '''
+
+    COLUMNS = (
+        ("item", "Item", 220),
+        ("size", "Size", 50),
+        ("flea", "Flea", 80),
+        ("trader_price", "Trader", 80),
+        ("best", "Best", 80),
+        ("per_slot", "Per slot", 80),
+    )
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.title("Stash")
+        self.geometry("+0+140")
+        self.attributes("-topmost", True)
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+        self.items: list[dict] = []
+        self.sort_key = "best"
+        self.sort_reverse = True
+
+        self.total_label = Label(self)
+        self.total_label.grid(row=0, column=0, sticky=W)
+        self.table = ttk.Treeview(self, columns=[key for key, _, _ in self.COLUMNS], show="headings", height=20)
+        for key, heading, width in self.COLUMNS:
+            self.table.heading(key, text=heading, command=lambda key=key: self.sort_by(key))
+            self.table.column(key, width=width, anchor=W if key == "item" else E)
+        self.table.grid(row=1, column=0, sticky=W+E+N+S)
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.table.yview)
+        scrollbar.grid(row=1, column=1, sticky=N+S)
+        self.table.configure(yscrollcommand=scrollbar.set)
+
+    def show(self, items: list[dict]) -> None:
+        self.items = items
+        total = sum(item["best"] for item in items)
+        unknown = sum(1 for item in items if item["item"] is None)
+        self.total_label.config(text=f"{len(items)} items worth {total:,} ₽" + (f", {unknown} not recognised" if unknown else ""))
+        self.redraw()
+        self.deiconify()
+
+    def sort_by(self, key: str) -> None:
+        self.sort_reverse = not self.sort_reverse if key == self.sort_key else key != "item"
+        self.sort_key = key
+        self.redraw()
+
+    def redraw(self) -> None:
+        def sort_value(item: dict):
+            if self.sort_key == "item":
+                return (item["item"] or item["short_name"]).lower()
+            if self.sort_key == "size":
+                return item["width"] * item["height"]
+            return item[self.sort_key]
+
+        self.table.delete(*self.table.get_children())
+        for item in sorted(self.items, key=sort_value, reverse=self.sort_reverse):
+            self.table.insert("", END, values=(
+                item["item"] or f"? {item['short_name']}",
+                f"{item['width']}x{item['height']}",
+                f"{item['flea']:,}",
+                f"{item['trader_price']:,}",
+                f"{item['best']:,}",
+                f"{item['per_slot']:,}",
+            ))
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Price History
+    ~~~~~~~~~~
+
+    Every price the analyzer sees is kept in an append-only time series on
+    disk, one memory-mapped column per field, so what an item is worth and
+    where its price is heading comes from local data instead of another
+    round of requests. The analytics are computed for all items at once.
+
+    Layout of the history directory:
+        items.txt     item names, the line number is the item id
+        count.i8      number of rows written
+        <column>.bin  one fixed width column per field of COLUMNS
+
+    One process writes a history directory, the GUI does.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import os
+import re
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+
+HISTORY_DIR = "_internal/history"
+
+# Field and dtype of every column, missing prices are NaN
+COLUMNS = {
+    "time": np.float64,
+    "item": np.int32,
+    "flea": np.float64,
+    "avg24": np.float64,
+    "trader": np.float64,
+}
+INITIAL_CAPACITY = 4096
+
+# Flea market tax rates of the offer and the requirement
+TAX_OFFER = 0.03
+TAX_REQUEST = 0.03
+
+# How far back the trend and volatility look
+WINDOW = 7 * 24 * 3600
+DAY = 24 * 3600
+# Spread of the sample times a trend needs, in days
+MIN_TREND_SPAN = 1 / 24
+
+
+class Analytics(NamedTuple):
+    '''
+    Analytics
+    ~~~~~~~~~~
+
+    What the history says about each item, arrays indexed by item id.
+    '''
+    samples: np.ndarray
+    flea: np.ndarray
+    trader: np.ndarray
+    fee: np.ndarray
+    net_flea: np.ndarray
+    flea_is_best: np.ndarray
+    trend: np.ndarray
+    volatility: np.ndarray
+
+
+def parse_price(text: str | int | float | None) -> float:
+    '''
+    "22,990₽" to 22990.0, NaN when there's no price in it
+    '''
+    if isinstance(text, (int, float)):
+        return float(text) if text > 0 else np.nan
+    digits = re.sub(r"[^\d]", "", text or "")
+    return float(digits) if digits else np.nan
+
+
+def flea_fee(price: np.ndarray, base: np.ndarray) -> np.ndarray:
+    '''
+    flea market fee of selling one item for price, the trader price stands in
+    for the base price the pages don't show
+    '''
+    price = np.asarray(price, dtype=np.float64)
+    base = np.asarray(base, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offer = np.log10(base / price)
+        request = np.log10(price / base)
+        offer = np.where(price < base, offer ** 1.08, offer)
+        request = np.where(price >= base, request ** 1.08, request)
+        return base * TAX_OFFER * 4 ** offer + price * TAX_REQUEST * 4 ** request
+
+
+class PriceHistory():
+    '''
+    PriceHistory
+    ~~~~~~~~~~
+
+    Append-only price rows in memory-mapped columns. The files grow by
+    doubling, the row count is written last so a crash mid-append loses
+    at most that row.
+    '''
+    def __init__(self, directory: str = HISTORY_DIR) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.names_path = os.path.join(directory, "items.txt")
+        self.names: list[str] = []
+        if os.path.exists(self.names_path):
+            with open(self.names_path, encoding="utf-8") as names_file:
+                self.names = [line.rstrip("\n") for line in names_file]
+        self.ids = {name: idx for idx, name in enumerate(self.names)}
+
+        self.count = self.open_column("count.i8", np.int64, 1)
+        time_path = os.path.join(directory, "time.bin")
+        rows_on_disk = os.path.getsize(time_path) // np.dtype(COLUMNS["time"]).itemsize if os.path.exists(time_path) else 0
+        self.capacity = max(INITIAL_CAPACITY, rows_on_disk)
+        self.columns = {field: self.open_column(f"{field}.bin", dtype, self.capacity) for field, dtype in COLUMNS.items()}
+
+    def __len__(self) -> int:
+        return int(self.count[0])
+
+    def open_column(self, filename: str, dtype: type, length: int) -> np.memmap:
+        path = os.path.join(self.directory, filename)
+        size = length * np.dtype(dtype).itemsize
+        with open(path, "ab") as column_file:
+            if column_file.tell() < size:
+                column_file.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=(length,))
+
+    def grow(self, rows: int) -> None:
+        capacity = self.capacity
+        while capacity < rows:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+
+        for column in self.columns.values():
+            column.flush()
+        self.capacity = capacity
+        self.columns = {field: self.open_column(f"{field}.bin", dtype, capacity) for field, dtype in COLUMNS.items()}
+
+    def item_id(self, name: str) -> int:
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = self.ids[name] = len(self.names)
+            self.names.append(name)
+            with open(self.names_path, "a", encoding="utf-8") as names_file:
+                names_file.write(name + "\n")
+        return idx
+
+    def extend(self, names: list[str], flea, avg24, trader, at=None) -> None:
+        '''
+        appends one row per name, the prices and times are scalars or array-likes of the same length
+        '''
+        if not names:
+            return
+
+        start = len(self)
+        end = start + len(names)
+        self.grow(end)
+        rows = slice(start, end)
+        self.columns["time"][rows] = time.time() if at is None else at
+        self.columns["item"][rows] = [self.item_id(name) for name in names]
+        self.columns["flea"][rows] = flea
+        self.columns["avg24"][rows] = avg24
+        self.columns["trader"][rows] = trader
+        self.count[0] = end
+
+    def record(self, info: dict) -> None:
+        '''
+        appends the prices of a parsed lookup
+        '''
+        self.extend(
+            [info["itemName"]],
+            [parse_price(info["itemLastLowSoldPrice"])],
+            [parse_price(info["item24hrAvgPrice"])],
+            [parse_price(info["itemTraderPrice"])],
+        )
+
+    def record_stash(self, items: list[dict]) -> None:
+        '''
+        appends the prices of the found items of a stash scan
+        '''
+        found = [item for item in items if item["item"]]
+        self.extend(
+            [item["item"] for item in found],
+            [parse_price(item["flea"]) for item in found],
+            np.nan,
+            [parse_price(item["trader_price"]) for item in found],
+        )
+
+    def flush(self) -> None:
+        for column in self.columns.values():
+            column.flush()
+        self.count.flush()
+
+    def analyze(self, names: list[str] | None = None, window: float = WINDOW, now: float | None = None) -> Analytics:
+        '''
+        analytics of every item, or only of names, from a single pass over the rows
+        '''
+        count = len(self)
+        n_items = len(self.names)
+        times = self.columns["time"][:count]
+        items = self.columns["item"][:count]
+        flea = self.columns["flea"][:count]
+        trader = self.columns["trader"][:count]
+        if names is not None:
+            selected = np.flatnonzero(np.isin(items, [self.ids[name] for name in names if name in self.ids]))
+            times, items, flea, trader = times[selected], items[selected], flea[selected], trader[selected]
+
+        # The latest known price of each item, rows are in time order
+        latest_flea = np.full(n_items, np.nan)
+        latest_trader = np.full(n_items, np.nan)
+        for prices, latest in ((flea, latest_flea), (trader, latest_trader)):
+            known = np.flatnonzero(~np.isnan(prices))
+            ids, first = np.unique(items[known][::-1], return_index=True)
+            latest[ids] = prices[known[::-1][first]]
+
+        fee = flea_fee(latest_flea, latest_trader)
+        net_flea = latest_flea - np.nan_to_num(fee)
+        flea_is_best = np.nan_to_num(net_flea, nan=-np.inf) > np.nan_to_num(latest_trader, nan=-np.inf)
+
+        # Least squares slope and spread of the flea prices in the window
+        now = time.time() if now is None else now
+        in_window = (times >= now - window) & ~np.isnan(flea)
+        ids = items[in_window]
+        days = (times[in_window] - now) / DAY
+        prices = flea[in_window]
+
+        def per_item(weights: np.ndarray | None = None) -> np.ndarray:
+            return np.bincount(ids, weights=weights, minlength=n_items).astype(np.float64)
+
+        n = per_item()
+        sum_t, sum_p = per_item(days), per_item(prices)
+        sum_tt, sum_tp, sum_pp = per_item(days * days), per_item(days * prices), per_item(prices * prices)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_p = sum_p / n
+            spread = n * sum_tt - sum_t * sum_t
+            slope = (n * sum_tp - sum_t * sum_p) / spread
+            # Prices seen within the same hour don't make a trend
+            trend = np.where((n >= 2) & (spread >= (n * MIN_TREND_SPAN) ** 2), slope / mean_p, np.nan)
+            variance = np.maximum(sum_pp / n - mean_p * mean_p, 0)
+            volatility = np.where(n >= 2, np.sqrt(variance) / mean_p, np.nan)
+
+        return Analytics(
+            samples=n.astype(np.int64),
+            flea=latest_flea,
+            trader=latest_trader,
+            fee=fee,
+            net_flea=net_flea,
+            flea_is_best=flea_is_best,
+            trend=trend,
+            volatility=volatility,
+        )
+
+    def summary(self, name: str, trader_name: str, window: float = WINDOW) -> dict[str, str]:
+        '''
+        where the item sells best, for how much and its trend as popup fields, empty when it has no history
+        '''
+        idx = self.ids.get(name)
+        if idx is None:
+            return {}
+
+        analytics = self.analyze([name], window)
+        fields = {}
+        if analytics.flea_is_best[idx]:
+            fields["bestToSell"] = "Flea"
+            fields["bestToSellPrice"] = "{:,.0f}₽ after a {:,.0f}₽ fee".format(
+                analytics.net_flea[idx], np.nan_to_num(analytics.fee[idx]))
+        elif not np.isnan(analytics.trader[idx]):
+            fields["bestToSell"] = trader_name or "Trader"
+            fields["bestToSellPrice"] = f"{analytics.trader[idx]:,.0f}₽"
+
+        if analytics.samples[idx] >= 2 and not np.isnan(analytics.trend[idx]):
+            fields["trend"] = "Trend: {:+.1%}/day, volatility {:.0%} ({} prices in {:.0f} days)".format(
+                analytics.trend[idx], analytics.volatility[idx], analytics.samples[idx], window / DAY)
+        return fields
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Icon Identification
+    ~~~~~~~~~~
+
+    Identifies the hovered inventory item by its icon instead of reading
+    the name box: the tile under the mouse is found on the grid, hashed
+    with a 64 bit perceptual hash and looked up in a prebuilt index with
+    multi-index hashing. Only a close match with a clear lead over the next
+    item counts, anything else is left to the OCR.
+
+    The name box covers part of the hovered tile, so every icon is indexed
+    whole and as its top and bottom band, and the tile is matched by the
+    band the box leaves free.
+
+    Build the index from the tarkov.dev grid images or a directory of icons
+    named after their items:
+        python -m pkg.icons build [--icons DIR] [--out _internal/icons.npz]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import functools
+import os
+import sys
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from .geometry import Geometry
+from .stash import tile_at
+
+
+ICON_INDEX_PATH = "_internal/icons.npz"
+ICONS_URL = "https://api.tarkov.dev/graphql"
+ICONS_QUERY = """{
+    items { name gridImageLink }
+}"""
+
+# Parts of an icon that are indexed, as the (top, bottom) fraction of its height
+FULL, TOP, BOTTOM = 0, 1, 2
+VARIANTS = {
+    FULL: (0.0, 1.0),
+    TOP: (0.0, 0.45),
+    BOTTOM: (0.55, 1.0),
+}
+# Pixels of the tile border left out of the hash
+BORDER = 3
+
+# The 64 bit hashes are searched as four 16 bit chunks
+CHUNKS = 4
+CHUNK_BITS = 16
+# Bits a tile hash may differ from its icon, and the lead it needs over the next item
+MAX_DISTANCE = 6
+MIN_MARGIN = 4
+# How far the width to height ratio of a tile may be off its icon's
+MAX_ASPECT_ERROR = 0.15
+
+
+class IconMatch(NamedTuple):
+    '''
+    IconMatch
+    ~~~~~~~~~~
+
+    The item a tile was matched to, how many bits its hash is off and the
+    lead over the next closest item.
+    '''
+    name: str
+    distance: int
+    margin: int
+
+
+def phash(image: MatLike) -> int:
+    '''
+    64 bit DCT hash of a BGR or gray image: the 8x8 lowest frequencies against their median
+    '''
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def variant_crop(image: MatLike, variant: int) -> MatLike:
+    top, bottom = VARIANTS[variant]
+    height = image.shape[0]
+    return image[int(round(top * height)):int(round(bottom * height))]
+
+
+def free_variant(box: tuple[int, int, int, int], hidden_rows: tuple[int, int]) -> int | None:
+    '''
+    the part of the tile in box that the rows don't cover, None when they cover all of them
+    '''
+    _, box_top, _, box_bottom = box
+    height = box_bottom - box_top
+    for variant in (FULL, BOTTOM, TOP):
+        top, bottom = VARIANTS[variant]
+        if box_top + bottom * height <= hidden_rows[0] or box_top + top * height >= hidden_rows[1]:
+            return variant
+    return None
+
+
+def chunk_masks(radius: int) -> np.ndarray:
+    '''
+    every chunk value with at most radius bits set
+    '''
+    values = np.arange(1 << CHUNK_BITS, dtype=np.uint32)
+    return values[np.bitwise_count(values) <= radius]
+
+
+class IconIndex():
+    '''
+    IconIndex
+    ~~~~~~~~~~
+
+    Multi-index hashing over the icon hashes. A hash within MAX_DISTANCE
+    bits of the query has a chunk within MAX_DISTANCE // CHUNKS bits of the
+    query's, so only the entries sharing such a chunk are compared.
+    '''
+    def __init__(
+        self, hashes: np.ndarray, items: np.ndarray, variants: np.ndarray, names: list[str], aspects: np.ndarray,
+    ) -> None:
+        self.hashes = hashes.astype(np.uint64)
+        self.items = items.astype(np.int64)
+        self.variants = variants.astype(np.uint8)
+        self.names = names
+        # Width to height ratio of every item's icon
+        self.aspects = aspects.astype(np.float32)
+        self.probes = chunk_masks(MAX_DISTANCE // CHUNKS)
+
+        # Per variant and chunk, the entries by chunk value
+        self.tables: dict[int, list[dict[int, np.ndarray]]] = {}
+        for variant in VARIANTS:
+            entries = np.flatnonzero(self.variants == variant)
+            tables = []
+            for chunk in range(CHUNKS):
+                values = (self.hashes[entries] >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(0xFFFF)
+                order = np.argsort(values, kind="stable")
+                unique, starts = np.unique(values[order], return_index=True)
+                tables.append(dict(zip(unique.tolist(), np.split(entries[order], starts[1:]))))
+            self.tables[variant] = tables
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, query: int, variant: int, aspect: float) -> list[tuple[int, int]]:
+        '''
+        (distance, item) of every item shaped like the tile within MAX_DISTANCE bits, closest first
+        '''
+        candidates = []
+        for chunk, table in enumerate(self.tables[variant]):
+            value = (query >> (chunk * CHUNK_BITS)) & 0xFFFF
+            for probe in (value ^ self.probes).tolist():
+                entries = table.get(probe)
+                if entries is not None:
+                    candidates.append(entries)
+        if not candidates:
+            return []
+
+        entries = np.unique(np.concatenate(candidates))
+        # Parts of differently shaped icons can look alike
+        entries = entries[np.abs(self.aspects[self.items[entries]] / aspect - 1) <= MAX_ASPECT_ERROR]
+        distances = np.bitwise_count(self.hashes[entries] ^ np.uint64(query)).astype(np.int64)
+        close = distances <= MAX_DISTANCE
+        best: dict[int, int] = {}
+        for distance, item in zip(distances[close].tolist(), self.items[entries[close]].tolist()):
+            best[item] = min(distance, best.get(item, distance))
+        return sorted((distance, item) for item, distance in best.items())
+
+    def match(self, tile: MatLike, variant: int) -> IconMatch | None:
+        '''
+        the item of the tile image, None without a close match that clearly beats the rest
+        '''
+        found = self.search(phash(variant_crop(tile, variant)), variant, tile.shape[1] / tile.shape[0])
+        if not found:
+            return None
+
+        distance, item = found[0]
+        runner_up = found[1][0] if len(found) > 1 else MAX_DISTANCE + MIN_MARGIN
+        if runner_up - distance < MIN_MARGIN:
+            return None
+        return IconMatch(self.names[item], distance, runner_up - distance)
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path, hashes=self.hashes, items=self.items, variants=self.variants, names=np.array(self.names),
+            aspects=self.aspects,
+        )
+
+
+def icon_entries(icon: MatLike) -> list[tuple[int, int]]:
+    '''
+    (variant, hash) of every indexed part of an icon
+    '''
+    inner = icon[BORDER:-BORDER, BORDER:-BORDER]
+    return [(variant, phash(variant_crop(inner, variant))) for variant in VARIANTS]
+
+
+def build_index(icons: list[tuple[str, MatLike]]) -> IconIndex:
+    hashes, items, variants, aspects = [], [], [], []
+    for item, (_, icon) in enumerate(icons):
+        aspects.append((icon.shape[1] - 2 * BORDER) / (icon.shape[0] - 2 * BORDER))
+        for variant, value in icon_entries(icon):
+            hashes.append(value)
+            items.append(item)
+            variants.append(variant)
+    return IconIndex(
+        np.array(hashes, dtype=np.uint64), np.array(items), np.array(variants), [name for name, _ in icons],
+        np.array(aspects),
+    )
+
+
+@functools.cache
+def load_icon_index(path: str = ICON_INDEX_PATH) -> IconIndex | None:
+    '''
+    the icon index of this process, None when it hasn't been built
+    '''
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return IconIndex(data["hashes"], data["items"], data["variants"], data["names"].tolist(), data["aspects"])
+
+
+def identify(area: MatLike, x: int, y: int, index: IconIndex, geometry: Geometry) -> IconMatch | None:
+    '''
+    the item whose tile is at (x, y) of the BGR area around the mouse, None when it isn't certain
+    '''
+    hidden_rows = (y + geometry.name_box_rows[0], y + geometry.name_box_rows[1])
+    # The name box starts a little left of the mouse and runs off to the right
+    box = tile_at(area, x, y, (x + geometry.name_box_left, hidden_rows[0], area.shape[1], hidden_rows[1]))
+    if box is None:
+        return None
+
+    inner = (box[0] + BORDER, box[1] + BORDER, box[2] - BORDER, box[3] - BORDER)
+    variant = free_variant(inner, hidden_rows)
+    if variant is None:
+        return None
+    return index.match(area[inner[1]:inner[3], inner[0]:inner[2]], variant)
+
+
+def fetch_icons() -> list[tuple[str, MatLike]]:
+    from . import transport
+
+    response = transport.post(ICONS_URL, json={"query": ICONS_QUERY}, timeout=30)
+    response.raise_for_status()
+    icons = []
+    for item in response.json()["data"]["items"]:
+        if not item.get("gridImageLink"):
+            continue
+        image = transport.get(item["gridImageLink"], timeout=10)
+        if image.status_code != 200:
+            continue
+        icon = cv2.imdecode(np.frombuffer(image.content, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if icon is not None:
+            icons.append((item["name"], icon))
+    return icons
+
+
+def read_icons(directory: str) -> list[tuple[str, MatLike]]:
+    icons = []
+    for filename in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(filename)
+        if extension.lower() in (".png", ".jpg", ".jpeg", ".webp"):
+            icon = cv2.imread(os.path.join(directory, filename), cv2.IMREAD_COLOR)
+            if icon is not None:
+                icons.append((name, icon))
+    return icons
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Builds the icon hash index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="hash the grid icons of every item")
+    build.add_argument("--icons", help="directory of icons named after their items, fetched when left out")
+    build.add_argument("--out", default=ICON_INDEX_PATH)
+    args = parser.parse_args()
+
+    icons = read_icons(args.icons) if args.icons else fetch_icons()
+    index = build_index(icons)
+    index.save(args.out)
+    print(f"Wrote {len(index)} icons to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
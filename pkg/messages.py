@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Messages
+    ~~~~~~~~~~
+
+    Compact typed messages passed from the workers to the GUI, and the
+    plain record of a lookup the headless tools hand out.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import time
+from typing import NamedTuple
+
+
+# Message kinds
+RESULT = 0
+ERROR = 1
+STASH = 2
+
+
+class GuiMessage(NamedTuple):
+    '''
+    GuiMessage
+    ~~~~~~~~~~
+
+    One popup for the GUI, pickles as a plain tuple.
+    '''
+    kind: int
+    text: str
+    info: dict
+    generation: int = 0
+    sent_at: float = 0.0
+
+
+def result_message(text: str, info: dict, generation: int = 0) -> GuiMessage:
+    return GuiMessage(RESULT, text, info, generation, time.time())
+
+
+def error_message(err_msg: str, info: dict, generation: int = 0) -> GuiMessage:
+    return GuiMessage(ERROR, f"ERROR: {err_msg}", info, generation, time.time())
+
+
+def stash_message(items: list[dict], generation: int = 0) -> GuiMessage:
+    return GuiMessage(STASH, f"{len(items)} items in the stash", {"items": items}, generation, time.time())
+
+
+def item_record(info: dict) -> dict:
+    '''
+    the scraped item info as plain JSON fields
+    '''
+    return {
+        "item": info["itemName"],
+        "last_low_price": info["itemLastLowSoldPrice"],
+        "avg_24h_price": info["item24hrAvgPrice"],
+        "trader": info["traderName"].strip(),
+        "trader_price": info["itemTraderPrice"].strip(),
+        "quests": [] if info["quests"] == "Not Quest Item" else info["quests"].split("\n"),
+    }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Metrics
+    ~~~~~~~~~~
+
+    Lightweight per-stage timing spans aggregated into latency histograms.
+    Each process records into its own registry, the workers ship their
+    histograms to the main process which merges them for export.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from logger_config import logger
+
+
+# Upper bounds of the histogram buckets in seconds, the last one catches everything
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# The job the spans of this process are currently recorded for, and its stage timings
+current_job: ContextVar[int] = ContextVar("current_job", default=0)
+current_timings: ContextVar[dict[str, float] | None] = ContextVar("current_timings", default=None)
+
+
+class Histogram():
+    '''
+    Histogram
+    ~~~~~~~~~~
+
+    Fixed bucket latency histogram, observing is a bisect and two additions.
+    '''
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, snapshot: dict) -> None:
+        for idx, count in enumerate(snapshot["counts"]):
+            self.counts[idx] += count
+        self.count += snapshot["count"]
+        self.sum += snapshot["sum"]
+
+    def quantile(self, q: float) -> float:
+        '''
+        upper bound of the bucket holding the q-quantile, capped at the largest finite bound
+        '''
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS[:-1], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return BUCKETS[-2]
+
+    def snapshot(self) -> dict:
+        return {"counts": list(self.counts), "count": self.count, "sum": self.sum}
+
+
+class MetricsRegistry():
+    '''
+    MetricsRegistry
+    ~~~~~~~~~~
+
+    Latency histograms by stage name, safe to record into from several threads.
+    '''
+    def __init__(self) -> None:
+        self.histograms: dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+        timings = current_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        '''
+        times the block as one stage of the current job
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(stage, elapsed)
+            logger.debug("Job %d %s took %.1f ms", current_job.get(), stage, elapsed * 1000)
+
+    @contextmanager
+    def job(self, job_id: int) -> Iterator[dict[str, float]]:
+        '''
+        tags the spans inside the block with the job id, yields the job's stage timings
+        '''
+        timings: dict[str, float] = {}
+        job_token = current_job.set(job_id)
+        timings_token = current_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            current_job.reset(job_token)
+            current_timings.reset(timings_token)
+
+    def drain(self) -> dict[str, dict]:
+        '''
+        snapshot of the histograms, resets them so only the delta is shipped next time
+        '''
+        with self.lock:
+            snapshot = {stage: histogram.snapshot() for stage, histogram in self.histograms.items()}
+            self.histograms.clear()
+        return snapshot
+
+    def merge(self, snapshot: dict[str, dict]) -> None:
+        with self.lock:
+            for stage, histogram_snapshot in snapshot.items():
+                histogram = self.histograms.get(stage)
+                if histogram is None:
+                    histogram = self.histograms[stage] = Histogram()
+                histogram.merge(histogram_snapshot)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            stage: {
+                "count": histogram.count,
+                "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+            }
+            for stage, histogram in sorted(self.histograms.items())
+        }
+
+    def to_json(self) -> str:
+        summary = self.summary()
+        return json.dumps({
+            "buckets": [str(bound) for bound in BUCKETS],
+            "stages": {
+                stage: dict(histogram.snapshot(), **summary[stage])
+                for stage, histogram in sorted(self.histograms.items())
+            },
+        }, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP tia_stage_seconds Latency of the lookup stages.",
+            "# TYPE tia_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'tia_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'tia_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'tia_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+# Registry of this process
+registry = MetricsRegistry()
+span = registry.span
+observe = registry.observe
+job = registry.job
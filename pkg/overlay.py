@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Overlay
+    ~~~~~~~~~~
+
+    Decides what the popup overlay shows as results arrive from the workers,
+    and which of the item information it shows.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import time
+from collections import deque
+
+from logger_config import logger
+from . import metrics
+from .messages import ERROR, GuiMessage
+
+
+def item_text(info: dict, fields: list[str]) -> str:
+    '''
+    the popup text of a looked up item with only the chosen POPUP_FIELDS
+    '''
+    lines = [info["itemName"], ""]
+    if "last_price" in fields:
+        lines.append(f"Last lowest price: {info['itemLastLowSoldPrice']}")
+    if "24_avg" in fields:
+        lines.append(f"24hr Avg: {info['item24hrAvgPrice']}")
+
+    trader, trader_price = info["traderName"].strip(), info["itemTraderPrice"].strip()
+    if "trader" in fields and "trader_price" in fields:
+        lines.append(f"{trader}: {trader_price}")
+    elif "trader" in fields:
+        lines.append(trader)
+    elif "trader_price" in fields:
+        lines.append(f"Trader: {trader_price}")
+
+    if "quest_info" in fields and info["quests"]:
+        lines += ["", info["quests"]]
+
+    # From the price history, only there once the item was seen before
+    best = [
+        info.get(key, "") for field, key in (("best_to_sell", "bestToSell"), ("best_to_sell_price", "bestToSellPrice"))
+        if field in fields
+    ]
+    history = [f"Best to sell: {' '.join(part for part in best if part)}"] if any(best) else []
+    if info.get("trend"):
+        history.append(info["trend"])
+    if history:
+        lines += [""] + history
+    return "\n".join(lines).strip()
+
+
+class PopupScheduler():
+    '''
+    PopupScheduler
+    ~~~~~~~~~~
+
+    Results are shown the moment they arrive: a newer result replaces the
+    overlay (or stacks on top of it, up to max_stacked) instead of waiting
+    for the previous popup to expire. Results from an older job than the one
+    on screen are dropped, and repeated errors are coalesced into one message
+    with a count. Records how long each message waited in the gui queue.
+    '''
+    def __init__(self, coalesce_time: int = 2000, max_stacked: int = 1, max_samples: int = 500) -> None:
+        self.coalesce_time = coalesce_time
+        self.max_stacked = max_stacked
+        self.shown_generation = 0
+        self.stacked: deque[str] = deque(maxlen=max_stacked)
+        self.last_error = ""
+        self.last_error_at = 0.0
+        self.error_count = 0
+        self.queue_waits: deque[float] = deque(maxlen=max_samples)
+
+    def accept(self, message: GuiMessage, received_at: float | None = None) -> GuiMessage | None:
+        '''
+        returns the message to render now, None when there is nothing new to show
+        '''
+        if received_at is None:
+            received_at = time.time()
+
+        if message.sent_at:
+            queue_wait = received_at - message.sent_at
+            self.queue_waits.append(queue_wait)
+            metrics.observe("queue_wait", queue_wait)
+            logger.debug("Job %d waited %.0f ms in the gui queue", message.generation, queue_wait * 1000)
+
+        # Something newer is already on screen
+        if message.generation and message.generation < self.shown_generation:
+            logger.debug("Dropping result of superseded job %d", message.generation)
+            return None
+
+        if message.kind == ERROR:
+            return self.coalesce_error(message, received_at)
+
+        self.shown_generation = max(self.shown_generation, message.generation)
+        self.stacked.appendleft(message.text)
+        return message
+
+    def overlay_text(self) -> str:
+        '''
+        the stacked results, newest first
+        '''
+        return "\n\n".join(self.stacked)
+
+    def clear(self) -> None:
+        '''
+        the overlay expired, the next result starts a new stack
+        '''
+        self.stacked.clear()
+
+    def coalesce_error(self, message: GuiMessage, received_at: float) -> GuiMessage:
+        if message.text == self.last_error and (received_at - self.last_error_at) * 1000 < self.coalesce_time:
+            self.error_count += 1
+        else:
+            self.error_count = 1
+        self.last_error = message.text
+        self.last_error_at = received_at
+
+        if self.error_count > 1:
+            return message._replace(text=f"{message.text} (x{self.error_count})")
+        return message
+
+    def stats(self) -> dict[str, float]:
+        '''
+        queue wait of the recent messages, in seconds
+        '''
+        waits = sorted(self.queue_waits)
+        if not waits:
+            return {"count": 0, "mean": 0.0, "p95": 0.0, "max": 0.0}
+
+        return {
+            "count": len(waits),
+            "mean": sum(waits) / len(waits),
+            "p95": waits[int(len(waits) * 0.95)],
+            "max": waits[-1],
+        }
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Flight Recorder
+    ~~~~~~~~~~
+
+    Keeps the intermediate artifacts of the recent jobs on disk, written from
+    a background thread so the lookup never waits on it.
+
+    List the recorded jobs with:
+        python -m pkg.recorder [directory]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import itertools
+import json
+import os
+import queue as q
+import shutil
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from logger_config import logger
+
+
+RECORDER_DIR = "_internal/flight"
+
+
+class FlightRecorder():
+    '''
+    FlightRecorder
+    ~~~~~~~~~~
+
+    Bounded on-disk ring of job artifacts: one directory per job with its
+    images and a meta.json of the text, names and stage timings. Jobs are
+    numbered by start_job(), the ids of the callers may repeat. Only the
+    newest max_jobs directories are kept. Capturing only copies the array
+    into a bounded queue, artifacts are dropped rather than blocking when the
+    writer falls behind.
+    '''
+    def __init__(self, directory: str = RECORDER_DIR, max_jobs: int = 50, max_pending: int = 64) -> None:
+        self.directory = directory
+        self.max_jobs = max_jobs
+        self.pending: q.Queue = q.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.thread: threading.Thread | None = None
+        self.job_ids = itertools.count(1)
+        # Writer thread state
+        self.job_dirs: dict[int, str] = {}
+        self.job_meta: dict[int, dict] = {}
+
+    def start_job(self, **fields) -> int:
+        '''
+        the id of a new job with its own directory, fields go into its meta.json
+        '''
+        job_id = next(self.job_ids)
+        self.note(job_id, **fields)
+        return job_id
+
+    def capture(self, job_id: int, name: str, image: MatLike) -> None:
+        self.put(("image", job_id, name, np.array(image, copy=True)))
+
+    def note(self, job_id: int, **fields) -> None:
+        '''
+        adds fields to the job's meta.json
+        '''
+        self.put(("meta", job_id, fields, None))
+
+    def put(self, item: tuple) -> None:
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.write_loop, name="FlightRecorder", daemon=True)
+            self.thread.start()
+
+        try:
+            self.pending.put_nowait(item)
+        except q.Full:
+            self.dropped += 1
+
+    def write_loop(self) -> None:
+        while True:
+            kind, job_id, name_or_fields, image = self.pending.get()
+            try:
+                job_dir = self.job_dir(job_id)
+                if kind == "image":
+                    cv2.imwrite(os.path.join(job_dir, f"{name_or_fields}.png"), image)
+                else:
+                    meta = self.job_meta.setdefault(job_id, {"job": job_id})
+                    meta.update(name_or_fields)
+                    with open(os.path.join(job_dir, "meta.json"), "w") as meta_file:
+                        json.dump(meta, meta_file, indent=2, default=str)
+            except (OSError, cv2.error) as e:
+                logger.warning("Flight recorder couldn't write job %d: %s", job_id, e)
+
+    def job_dir(self, job_id: int) -> str:
+        job_dir = self.job_dirs.get(job_id)
+        if job_dir is not None:
+            return job_dir
+
+        # Timestamped so the ring sorts oldest first across sessions and worker processes
+        job_dir = os.path.join(self.directory, f"{time.time_ns()}_{os.getpid()}_{job_id}")
+        os.makedirs(job_dir, exist_ok=True)
+        self.job_dirs[job_id] = job_dir
+        if len(self.job_dirs) > self.max_jobs:
+            oldest = min(self.job_dirs)
+            self.job_dirs.pop(oldest)
+            self.job_meta.pop(oldest, None)
+        self.prune()
+        return job_dir
+
+    def prune(self) -> None:
+        job_dirs = sorted(os.listdir(self.directory))
+        for name in job_dirs[:max(len(job_dirs) - self.max_jobs, 0)]:
+            # Another worker may be pruning the same ring
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+
+def list_jobs(directory: str = RECORDER_DIR) -> None:
+    '''
+    prints the recorded jobs, oldest first
+    '''
+    if not os.path.isdir(directory):
+        print(f"No flight recordings in {directory}")
+        return
+
+    for name in sorted(os.listdir(directory)):
+        job_dir = os.path.join(directory, name)
+        meta = {}
+        if os.path.exists(os.path.join(job_dir, "meta.json")):
+            with open(os.path.join(job_dir, "meta.json")) as meta_file:
+                meta = json.load(meta_file)
+
+        artifacts = sorted(file for file in os.listdir(job_dir) if file.endswith(".png"))
+        timings = ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in meta.get("timings", {}).items())
+        print(f"{name}: {meta.get('name') or meta.get('text', '?')!r}")
+        print(f"    artifacts: {', '.join(artifacts)}")
+        if timings:
+            print(f"    timings: {timings}")
+
+
+# Recorder of this process
+recorder = FlightRecorder()
+
+
+if __name__ == "__main__":
+    list_jobs(*sys.argv[1:2])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Job Scheduler
+    ~~~~~~~~~~
+
+    Latest-wins scheduling of the lookup jobs handed to the worker processes.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import queue as q
+from multiprocessing import Queue, Value
+
+from logger_config import logger
+
+
+class JobScheduler():
+    '''
+    JobScheduler
+    ~~~~~~~~~~
+
+    Bounded job queue shared by the ProcessManager and the workers.
+    Every submitted job is tagged with a new generation number, and only the
+    newest generation is current: older jobs still waiting in the queue are
+    dropped, and jobs already running are cancelled at their next stage boundary.
+    '''
+    def __init__(self, maxsize: int = 3) -> None:
+        self.queue = Queue(maxsize=maxsize)
+        self.generation = Value("i", 0)
+        self.dropped = Value("i", 0)
+        self.cancelled = Value("i", 0)
+
+    def submit(self, job) -> int:
+        '''
+        tags the job with the next generation and queues it, superseding every older job
+        '''
+        job.generation = self.invalidate()
+
+        try:
+            self.queue.put(job, timeout=1)
+        except q.Full:
+            logger.warning("Job queue is full, dropping job %d", job.generation)
+            self._increment(self.dropped)
+
+        logger.debug("Submitted job %d, %s", job.generation, self.stats())
+        return job.generation
+
+    def invalidate(self) -> int:
+        '''
+        supersedes every queued and running job, returns the generation that is current now
+        '''
+        with self.generation.get_lock():
+            self.generation.value += 1
+            generation = self.generation.value
+
+        # Nothing older is worth running anymore
+        self.drain()
+        return generation
+
+    def drain(self) -> None:
+        '''
+        drops every job still waiting in the queue
+        '''
+        while True:
+            try:
+                job = self.queue.get_nowait()
+            except q.Empty:
+                return
+
+            if job is None:
+                # Keep the shutdown sentinel for the workers
+                self.queue.put(None)
+                return
+
+            self._increment(self.dropped)
+
+    def get(self):
+        return self.queue.get()
+
+    def stop(self, num_workers: int) -> None:
+        '''
+        drops the pending jobs and queues one shutdown sentinel per worker
+        '''
+        self.drain()
+        for _ in range(num_workers):
+            self.queue.put(None)
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.generation.value
+
+    def discard(self, job) -> None:
+        '''
+        a worker picked up a job that was superseded before it started
+        '''
+        logger.debug("Dropping superseded job %d", job.generation)
+        self._increment(self.dropped)
+
+    def cancel(self, job) -> None:
+        '''
+        a running job noticed it was superseded and stopped
+        '''
+        logger.debug("Cancelled superseded job %d", job.generation)
+        self._increment(self.cancelled)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "generation": self.generation.value,
+            "dropped": self.dropped.value,
+            "cancelled": self.cancelled.value,
+        }
+
+    def _increment(self, counter: Value) -> None:
+        with counter.get_lock():
+            counter.value += 1
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Speculative Lookups
+    ~~~~~~~~~~
+
+    In the inventory the cursor usually rests on an item for a while before
+    the interact key is pressed. When speculative lookups are enabled the
+    item under a resting cursor is looked up ahead of time by a single idle
+    priority worker, and the key press pops up the finished result at once.
+    Moving the cursor cancels the lookup.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+from typing import NamedTuple
+
+import numpy as np
+
+from .messages import GuiMessage
+
+
+# Seconds the cursor rests before its item is looked up
+DWELL_TIME = 0.3
+# Pixels the cursor may drift and still be resting on the same item
+MAX_DRIFT = 4
+# Seconds a speculative lookup may run before it gives up
+JOB_BUDGET = 2.5
+# Seconds a finished lookup is served for
+RESULT_TTL = 15.0
+# Mean gray level difference of two name boxes showing the same item
+MAX_ROI_DIFF = 4.0
+
+# Events of the DwellTracker
+MOVED = "moved"
+DWELL = "dwell"
+
+
+class Speculation(NamedTuple):
+    '''
+    Speculation
+    ~~~~~~~~~~
+
+    A finished speculative lookup and the name box it was started from.
+    '''
+    mouse_pos: dict
+    roi: np.ndarray
+    message: GuiMessage
+    finished_at: float
+
+
+def drift(a: dict, b: dict) -> int:
+    return max(abs(a["x"] - b["x"]), abs(a["y"] - b["y"]))
+
+
+class DwellTracker():
+    '''
+    DwellTracker
+    ~~~~~~~~~~
+
+    Follows the cursor, reporting DWELL once per resting place and MOVED
+    when it leaves a place that was reported.
+    '''
+    def __init__(self) -> None:
+        self.anchor: dict | None = None
+        self.since = 0.0
+        self.fired = False
+
+    def update(self, mouse_pos: dict, now: float) -> str | None:
+        if self.anchor is None or drift(mouse_pos, self.anchor) > MAX_DRIFT:
+            moved = self.fired
+            self.anchor, self.since, self.fired = mouse_pos, now, False
+            return MOVED if moved else None
+
+        if not self.fired and now - self.since >= DWELL_TIME:
+            self.fired = True
+            return DWELL
+        return None
+
+
+class SpeculationCache():
+    '''
+    SpeculationCache
+    ~~~~~~~~~~
+
+    The latest finished speculation. A key press gets its result when the
+    cursor is still on the same name box and the result isn't too old.
+    '''
+    def __init__(self) -> None:
+        self.latest: Speculation | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, speculation: Speculation) -> None:
+        self.latest = speculation
+
+    def has(self, mouse_pos: dict, roi: np.ndarray, now: float) -> bool:
+        '''
+        whether a speculation matching the name box is already done
+        '''
+        speculation = self.latest
+        return bool(
+            speculation is not None
+            and now - speculation.finished_at <= RESULT_TTL
+            and drift(mouse_pos, speculation.mouse_pos) <= MAX_DRIFT
+            and roi.shape == speculation.roi.shape
+            and np.abs(roi - speculation.roi).mean() <= MAX_ROI_DIFF
+        )
+
+    def match(self, mouse_pos: dict, roi: np.ndarray, now: float) -> GuiMessage | None:
+        if not self.has(mouse_pos, roi, now):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self.latest.message
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Stash Scan
+    ~~~~~~~~~~
+
+    Prices a whole stash from one screenshot: the grid and the item tiles on
+    it are found with array operations over the whole image, the short names
+    of all tiles are read in a single OCR pass, and every price comes from
+    one request for the whole market.
+
+    Scan a screenshot without the game:
+        python -m pkg.stash screenshot.png [--no-lookup]
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import argparse
+import difflib
+import json
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+import pytesseract
+from cv2.typing import MatLike
+from multiprocessing import Queue
+from multiprocessing.synchronize import Lock as LockType
+from PIL import Image
+from requests import RequestException
+
+from logger_config import logger
+from . import metrics, transport
+from .messages import error_message, stash_message
+
+
+MARKET_URL = "https://api.tarkov.dev/graphql"
+MARKET_QUERY = """{
+    items {
+        name shortName width height avg24hPrice lastLowPrice
+        sellFor { price vendor { name } }
+    }
+}"""
+# Seconds the market snapshot is reused before it's fetched again
+MARKET_TTL = 600
+
+# Brightness a grid line or tile border has over the pixels next to it
+LINE_CONTRAST = 12
+# Cell pitches that are plausible from 720p to 4K
+MIN_CELL, MAX_CELL = 30, 160
+
+
+class Tile(NamedTuple):
+    '''
+    Tile
+    ~~~~~~~~~~
+
+    One item on the grid, in cells and in pixels.
+    '''
+    column: int
+    row: int
+    width: int
+    height: int
+    box: tuple[int, int, int, int]
+
+
+def line_masks(gray: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    pixels of thin horizontal and vertical lines: brighter than the pixels two away on both sides
+    '''
+    g = gray.astype(np.int16)
+    horizontal = np.zeros(g.shape, dtype=bool)
+    vertical = np.zeros(g.shape, dtype=bool)
+    horizontal[2:-2] = (g[2:-2] - g[:-4] > LINE_CONTRAST) & (g[2:-2] - g[4:] > LINE_CONTRAST)
+    vertical[:, 2:-2] = (g[:, 2:-2] - g[:, :-4] > LINE_CONTRAST) & (g[:, 2:-2] - g[:, 4:] > LINE_CONTRAST)
+    return horizontal, vertical
+
+
+def line_positions(mask: np.ndarray, axis: int, min_run: int) -> np.ndarray:
+    '''
+    centers of the lines along the axis that have runs of at least min_run pixels
+    '''
+    kernel = np.ones((1, min_run) if axis == 0 else (min_run, 1), dtype=np.uint8)
+    runs = cv2.morphologyEx(mask.astype(np.uint8), cv2.MORPH_OPEN, kernel)
+    profile = runs.sum(axis=1 - axis)
+    candidates = np.flatnonzero(profile >= min_run)
+    if not len(candidates):
+        return candidates
+
+    # Lines a few pixels thick show up as neighbouring positions
+    groups = np.split(candidates, np.flatnonzero(np.diff(candidates) > 2) + 1)
+    return np.array([int(round(group.mean())) for group in groups])
+
+
+def lattice(positions: np.ndarray) -> np.ndarray:
+    '''
+    the longest run of evenly spaced positions, gaps of whole pitches filled in
+    '''
+    if len(positions) < 2:
+        return np.array([], dtype=int)
+
+    gaps = np.diff(positions)
+    plausible = gaps[(gaps >= MIN_CELL) & (gaps <= MAX_CELL)]
+    if not len(plausible):
+        return np.array([], dtype=int)
+
+    # Item pictures add lines between the grid lines, keep the lines most of the others are a whole pitch from
+    def agreeing(pitch: int) -> np.ndarray:
+        steps = (positions[None, :] - positions[:, None]) / pitch
+        on_lattice = np.abs(steps - np.round(steps)) * pitch <= 2
+        return on_lattice[on_lattice.sum(axis=1).argmax()]
+
+    positions = positions[max((agreeing(pitch) for pitch in np.unique(plausible)), key=np.count_nonzero)]
+    gaps = np.diff(positions)
+    plausible = gaps[(gaps >= MIN_CELL) & (gaps <= MAX_CELL)]
+    if not len(plausible):
+        return np.array([], dtype=int)
+    pitch = float(np.median(plausible))
+
+    # Split where the spacing isn't a whole number of pitches
+    steps = gaps / pitch
+    regular = (np.abs(steps - np.round(steps)) * pitch <= 2) & (np.round(steps) >= 1)
+    runs = np.split(np.arange(len(positions)), np.flatnonzero(~regular) + 1)
+    best = max(runs, key=lambda run: positions[run[-1]] - positions[run[0]])
+    first, last = positions[best[0]], positions[best[-1]]
+    count = int(round((last - first) / pitch))
+    if count < 1:
+        return np.array([], dtype=int)
+
+    # Snap the evenly spaced lattice onto the detected lines
+    expected = first + np.arange(count + 1) * (last - first) / count
+    nearest = positions[np.abs(positions[None, :] - expected[:, None]).argmin(axis=1)]
+    return np.where(np.abs(nearest - expected) <= 2, nearest, np.round(expected)).astype(int)
+
+
+def interval_sums(values: np.ndarray, edges: np.ndarray, inset: int, axis: int) -> np.ndarray:
+    '''
+    sums of the values between consecutive edges along the axis, leaving out inset pixels at both ends
+    '''
+    bounds = np.empty(2 * (len(edges) - 1), dtype=int)
+    bounds[0::2] = edges[:-1] + inset
+    bounds[1::2] = edges[1:] - inset
+    return np.add.reduceat(values, bounds, axis=axis).take(np.arange(0, len(bounds), 2), axis=axis)
+
+
+def detect_tiles(image: MatLike) -> list[Tile]:
+    '''
+    the item tiles on the stash grid of a BGR screenshot, empty when no grid is found
+    '''
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    horizontal, vertical = line_masks(gray)
+
+    min_run = max(gray.shape[0] // 40, 8)
+    ys = lattice(line_positions(horizontal, 0, min_run))
+    xs = lattice(line_positions(vertical, 1, min_run))
+    if len(ys) < 2 or len(xs) < 2:
+        return []
+
+    rows, columns = len(ys) - 1, len(xs) - 1
+    inset = max(int(np.diff(xs).min()) // 10, 2)
+
+    # Per cell interior mean and spread, every cell at once from the integral images of the grid
+    integral, squared_integral = cv2.integral2(gray[ys[0]:ys[-1] + 1, xs[0]:xs[-1] + 1])
+    top, bottom = (ys[:-1] + inset - ys[0])[:, None], (ys[1:] - inset - ys[0])[:, None]
+    left, right = xs[:-1] + inset - xs[0], xs[1:] - inset - xs[0]
+    sums = integral[bottom, right] - integral[top, right] - integral[bottom, left] + integral[top, left]
+    squares = (
+        squared_integral[bottom, right] - squared_integral[top, right]
+        - squared_integral[bottom, left] + squared_integral[top, left]
+    )
+    areas = (bottom - top) * (right - left)
+    means = sums / areas
+    spreads = np.sqrt(np.maximum(squares / areas - means ** 2, 0))
+
+    # Empty cells are flat and all look alike, anything else holds an item
+    flat = spreads < 6
+    background = np.median(means[flat]) if flat.any() else means.min()
+    occupied = ~flat | (np.abs(means - background) > 8)
+
+    # A line between two cells means they belong to different tiles
+    # (a pixel either side of the expected position still counts)
+    near_columns = vertical[:, xs[1:-1] - 1] | vertical[:, xs[1:-1]] | vertical[:, xs[1:-1] + 1]
+    near_rows = horizontal[ys[1:-1] - 1, :] | horizontal[ys[1:-1], :] | horizontal[ys[1:-1] + 1, :]
+    lines_between_columns = interval_sums(near_columns.astype(np.float64), ys, inset, 0) / (np.diff(ys) - 2 * inset)[:, None]
+    lines_between_rows = interval_sums(near_rows.astype(np.float64), xs, inset, 1) / (np.diff(xs) - 2 * inset)[None, :]
+    joined_right = occupied[:, :-1] & occupied[:, 1:] & (lines_between_columns < 0.5)
+    joined_down = occupied[:-1, :] & occupied[1:, :] & (lines_between_rows < 0.5)
+
+    # Cells and the joins between them on one lattice, a tile is a connected component of it
+    graph = np.zeros((2 * rows - 1, 2 * columns - 1), dtype=np.uint8)
+    graph[0::2, 0::2] = occupied
+    graph[0::2, 1::2] = joined_right
+    graph[1::2, 0::2] = joined_down
+    count, _, stats, _ = cv2.connectedComponentsWithStats(graph, connectivity=4)
+
+    tiles = []
+    for left, top, width, height, _ in stats[1:count]:
+        column, row = int(left) // 2, int(top) // 2
+        w, h = (int(width) + 1) // 2, (int(height) + 1) // 2
+        box = (int(xs[column]), int(ys[row]), int(xs[column + w]), int(ys[row + h]))
+        tiles.append(Tile(column, row, w, h, box))
+    return sorted(tiles, key=lambda tile: (tile.row, tile.column))
+
+
+def tile_at(
+    image: MatLike, x: int, y: int, hidden: tuple[int, int, int, int] | None = None,
+) -> tuple[int, int, int, int] | None:
+    '''
+    box of the tile at the point, None off the grid. The hidden box is covered by something
+    else, a border that can't be seen outside of it counts as a border
+    '''
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    horizontal, vertical = line_masks(gray)
+    visible = np.ones(gray.shape, dtype=bool)
+    if hidden is not None:
+        x1, y1, x2, y2 = (max(value, 0) for value in hidden)
+        visible[y1:y2, x1:x2] = False
+    horizontal &= visible
+    vertical &= visible
+
+    min_run = max(gray.shape[0] // 40, 8)
+    ys = lattice(line_positions(horizontal, 0, min_run))
+    xs = lattice(line_positions(vertical, 1, min_run))
+    if len(ys) < 2 or len(xs) < 2 or not (xs[0] <= x < xs[-1] and ys[0] <= y < ys[-1]):
+        return None
+
+    inset = max(int(np.diff(xs).min()) // 10, 2)
+
+    def border_between_columns(column: int, row: int) -> bool:
+        rows = slice(ys[row] + inset, ys[row + 1] - inset)
+        seen = visible[rows, xs[column] - 1:xs[column] + 2].all(axis=1)
+        near = vertical[rows, xs[column] - 1:xs[column] + 2].any(axis=1)
+        return not seen.any() or near.sum() >= 0.5 * seen.sum()
+
+    def border_between_rows(row: int, left: int, right: int) -> bool:
+        columns = slice(xs[left] + inset, xs[right + 1] - inset)
+        seen = visible[ys[row] - 1:ys[row] + 2, columns].all(axis=0)
+        near = horizontal[ys[row] - 1:ys[row] + 2, columns].any(axis=0)
+        return not seen.any() or near.sum() >= 0.5 * seen.sum()
+
+    column = int(np.searchsorted(xs, x, side="right")) - 1
+    row = int(np.searchsorted(ys, y, side="right")) - 1
+    left = right = column
+    while left > 0 and not border_between_columns(left, row):
+        left -= 1
+    while right < len(xs) - 2 and not border_between_columns(right + 1, row):
+        right += 1
+    top = bottom = row
+    while top > 0 and not border_between_rows(top, left, right):
+        top -= 1
+    while bottom < len(ys) - 2 and not border_between_rows(bottom + 1, left, right):
+        bottom += 1
+    return (int(xs[left]), int(ys[top]), int(xs[right + 1]), int(ys[bottom + 1]))
+
+
+def name_strip(image: MatLike, tile: Tile) -> np.ndarray:
+    '''
+    the top of the tile where the short name is, as black text on white
+    '''
+    left, top, right, bottom = tile.box
+    cell = (bottom - top) / tile.height
+    strip = image[top + 2:top + max(int(cell * 0.27), 8), left + 2:right - 2]
+    gray = cv2.cvtColor(strip, cv2.COLOR_BGR2GRAY)
+    _, threshold = cv2.threshold(gray, 120, 255, cv2.THRESH_BINARY_INV)
+    return cv2.resize(threshold, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+
+
+def read_short_names(image: MatLike, tiles: list[Tile]) -> list[str]:
+    '''
+    the short name of every tile, stacked into one image so tesseract runs once
+    '''
+    if not tiles:
+        return []
+
+    strips = [name_strip(image, tile) for tile in tiles]
+    gap = 20
+    width = max(strip.shape[1] for strip in strips) + 2 * gap
+    offsets = np.cumsum([0] + [strip.shape[0] + gap for strip in strips])
+    sheet = np.full((offsets[-1] + gap, width), 255, dtype=np.uint8)
+    for strip, offset in zip(strips, offsets):
+        # Names are right aligned on the tile
+        sheet[offset + gap:offset + gap + strip.shape[0], width - gap - strip.shape[1]:width - gap] = strip
+
+    data = pytesseract.image_to_data(sheet, lang="eng", config="--psm 6", output_type=pytesseract.Output.DICT)
+    words: list[list[tuple[int, str]]] = [[] for _ in tiles]
+    for text, top, height, left in zip(data["text"], data["top"], data["height"], data["left"]):
+        if not text.strip():
+            continue
+        idx = int(np.searchsorted(offsets, top + height / 2 - gap, side="right")) - 1
+        if 0 <= idx < len(tiles):
+            words[idx].append((left, text.strip()))
+
+    return [" ".join(text for _, text in sorted(tile_words)) for tile_words in words]
+
+
+_market: tuple[float, dict[str, dict]] | None = None
+_market_lock = threading.Lock()
+
+
+def market_items() -> dict[str, dict]:
+    '''
+    every item on the market by lowercase short name, one request refreshed every MARKET_TTL seconds
+    '''
+    global _market
+    with _market_lock:
+        if _market is None or _market[0] < time.monotonic():
+            response = transport.post(MARKET_URL, json={"query": MARKET_QUERY}, timeout=20)
+            response.raise_for_status()
+            items = response.json()["data"]["items"]
+            _market = (time.monotonic() + MARKET_TTL, {item["shortName"].lower(): item for item in items})
+        return _market[1]
+
+
+def match_item(short_name: str, items: dict[str, dict]) -> dict | None:
+    key = short_name.lower()
+    if key in items:
+        return items[key]
+    close = difflib.get_close_matches(key, items.keys(), n=1, cutoff=0.75)
+    return items[close[0]] if close else None
+
+
+def price_record(tile: Tile, short_name: str, item: dict | None) -> dict:
+    record = {
+        "short_name": short_name,
+        "item": None,
+        "column": tile.column,
+        "row": tile.row,
+        "width": tile.width,
+        "height": tile.height,
+        "flea": 0,
+        "trader": "",
+        "trader_price": 0,
+        "best": 0,
+        "per_slot": 0,
+    }
+    if item is None:
+        return record
+
+    traders = [offer for offer in item["sellFor"] or [] if offer["vendor"]["name"] != "Flea Market"]
+    best_trader = max(traders, key=lambda offer: offer["price"], default=None)
+    flea = item["lastLowPrice"] or item["avg24hPrice"] or 0
+    record.update({
+        "item": item["name"],
+        "flea": flea,
+        "trader": best_trader["vendor"]["name"] if best_trader else "",
+        "trader_price": best_trader["price"] if best_trader else 0,
+    })
+    record["best"] = max(flea, record["trader_price"])
+    record["per_slot"] = record["best"] // (tile.width * tile.height)
+    return record
+
+
+def scan_stash(image: MatLike, lookup: bool = True) -> list[dict]:
+    '''
+    a price record for every item tile on the stash screenshot
+    '''
+    with metrics.span("stash_grid"):
+        tiles = detect_tiles(image)
+    logger.info("Found %d item tiles on the stash grid", len(tiles))
+
+    with metrics.span("stash_ocr"):
+        short_names = read_short_names(image, tiles)
+
+    items = {}
+    if lookup and tiles:
+        with metrics.span("stash_lookup"):
+            items = market_items()
+
+    return [price_record(tile, name, match_item(name, items) if name else None) for tile, name in zip(tiles, short_names)]
+
+
+class StashScan():
+    '''
+    StashScan
+    ~~~~~~~~~~
+
+    Job for the workers pricing every item of a stash screenshot, posts one
+    message with all the records to the gui queue.
+    '''
+    def __init__(self, img: Image, display_info_init: dict[str, int]) -> None:
+        # Set by the JobScheduler, a newer generation supersedes this job
+        self.generation = 0
+        self.cancelled = False
+        self.timings: dict[str, float] = {}
+        self.img = img
+        self.display_info_init = display_info_init
+
+    def run(self, lock: LockType, gui_queue: Queue, scheduler=None) -> None:
+        with metrics.job(self.generation) as self.timings, metrics.span("stash_scan"):
+            try:
+                image = cv2.cvtColor(np.array(self.img), cv2.COLOR_RGB2BGR)
+                self.img = None
+                message = stash_message(scan_stash(image), self.generation)
+            except (RequestException, KeyError, ValueError) as e:
+                logger.exception("Failed to price the stash: %s", e)
+                message = error_message("Couldn't get the stash prices", self.display_info_init, self.generation)
+            except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError, cv2.error) as e:
+                logger.exception("Failed to read the stash: %s", e)
+                message = error_message("Couldn't read the stash", self.display_info_init, self.generation)
+
+        if scheduler is not None and not scheduler.is_current(self.generation):
+            self.cancelled = True
+            scheduler.cancel(self)
+            return
+
+        with lock:
+            gui_queue.put(message)
+
+
+def main() -> int:
+    from .config import configure_tesseract
+
+    parser = argparse.ArgumentParser(description="Price every item on a stash screenshot")
+    parser.add_argument("screenshot")
+    parser.add_argument("--no-lookup", action="store_true", help="only find and read the tiles")
+    args = parser.parse_args()
+
+    configure_tesseract()
+    image = cv2.imread(args.screenshot)
+    if image is None:
+        print(f"Couldn't read {args.screenshot}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    if args.no_lookup:
+        tiles = detect_tiles(image)
+        try:
+            names = read_short_names(image, tiles)
+        except pytesseract.TesseractNotFoundError as e:
+            logger.warning("Not reading the names: %s", e)
+            names = [""] * len(tiles)
+        records = [price_record(tile, name, None) for tile, name in zip(tiles, names)]
+    else:
+        records = scan_stash(image)
+
+    for record in sorted(records, key=lambda record: record["best"], reverse=True):
+        print(json.dumps(record))
+    print(f"{len(records)} tiles in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Tooltip
+    ~~~~~~~~~~
+
+    Waits for the item name box after the interact key is pressed. A small
+    region at the cursor is grabbed every few milliseconds until it holds a
+    near black box with text in it and stops changing, so the screenshot the
+    lookup runs on is taken with the name on screen.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import time
+from typing import Callable
+
+import numpy as np
+from PIL import Image
+
+from .backends import get_backend
+from .geometry import Geometry
+
+
+# Seconds to wait for the name box before capturing anyway
+TOOLTIP_TIMEOUT = 0.5
+POLL_INTERVAL = 0.01
+
+# Gray levels of the box fill and of the text drawn on it
+DARK_LEVEL = 16
+TEXT_LEVEL = 120
+MIN_DARK_FRACTION = 0.5
+MIN_TEXT_FRACTION = 0.01
+# Mean gray level change between two polls of a box that finished fading in
+MAX_SETTLE_DIFF = 2.0
+
+
+def gray_roi(img: Image.Image) -> np.ndarray:
+    return np.asarray(img.convert("L"), dtype=np.int16)
+
+
+def tooltip_present(roi: np.ndarray) -> bool:
+    '''
+    whether the gray region is mostly box fill with some text on it
+    '''
+    return bool(
+        np.count_nonzero(roi <= DARK_LEVEL) >= MIN_DARK_FRACTION * roi.size
+        and np.count_nonzero(roi >= TEXT_LEVEL) >= MIN_TEXT_FRACTION * roi.size
+    )
+
+
+def wait_for_tooltip(mouse_pos: dict, geometry: Geometry, grab: Callable[..., Image.Image] | None = None,
+                     timeout: float = TOOLTIP_TIMEOUT, interval: float = POLL_INTERVAL) -> float | None:
+    '''
+    seconds until the name box at the mouse was up and settled, None after timeout seconds without it
+    '''
+    grab = grab or get_backend().grab
+    bbox = geometry.tooltip_box(mouse_pos)
+    start = time.perf_counter()
+    previous = None
+    while True:
+        roi = gray_roi(grab(bbox=bbox))
+        elapsed = time.perf_counter() - start
+        if tooltip_present(roi):
+            if previous is not None and np.abs(roi - previous).mean() <= MAX_SETTLE_DIFF:
+                return elapsed
+            previous = roi
+        else:
+            previous = None
+
+        if elapsed >= timeout:
+            return None
+        time.sleep(interval)
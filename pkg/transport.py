@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+'''
+    Tarkov Item Price Analyzer - Transport
+    ~~~~~~~~~~
+
+    HTTP transport shared by the fetch functions of a process, keeps the
+    upstream connections alive between lookups. It can also record the
+    responses to a cassette or play them back offline, see pkg.cassette.
+
+    :copyright: (c) 2021 by Nicholas Murphy.
+    :license: GPLv2, see LICENSE for more details.
+'''
+
+import os
+import threading
+import time
+from urllib.parse import urlparse, urlsplit
+
+import requests
+from requests import RequestException, Response
+from requests.adapters import HTTPAdapter
+
+from logger_config import logger
+from . import metrics
+from .cassette import CASSETTE_PATH, Cassette, request_key
+
+
+# Every host a lookup talks to
+UPSTREAM_HOSTS = (
+    "https://www.google.com",
+    "https://google.com",
+    "https://tarkov-market.com",
+    "https://escapefromtarkov.gamepedia.com",
+    "https://api.tarkov.dev",
+)
+
+# Base URL of a stand-in for every upstream host, for load tests (http://127.0.0.1:8080)
+UPSTREAM_ENV = "TIA_UPSTREAM"
+# live, record (live and saved to the cassette) or replay (from the cassette only)
+TRANSPORT_ENV = "TIA_TRANSPORT"
+CASSETTE_ENV = "TIA_CASSETTE"
+# Seconds every played response takes, or "recorded" for as long as the recorded request took
+REPLAY_LATENCY_ENV = "TIA_REPLAY_LATENCY"
+MODES = ("live", "record", "replay")
+# Seconds a pre-opened connection may take, it's only a head start for the first lookup
+WARM_UP_TIMEOUT = 1.0
+
+_session: requests.Session | None = None
+_cassette: Cassette | None = None
+
+
+def get_session() -> requests.Session:
+    '''
+    the keep-alive session of this process, created on first use
+    '''
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def set_pool_size(size: int) -> None:
+    '''
+    keeps up to size connections per upstream host, for callers fetching from several threads
+    '''
+    adapter = HTTPAdapter(pool_connections=len(UPSTREAM_HOSTS), pool_maxsize=size)
+    get_session().mount("https://", adapter)
+    get_session().mount("http://", adapter)
+
+
+def route(url: str) -> str:
+    '''
+    the URL itself, or on the stand-in upstream with the host as the first path segment
+    '''
+    upstream = os.environ.get(UPSTREAM_ENV)
+    if not upstream:
+        return url
+    parts = urlsplit(url)
+    return f"{upstream.rstrip('/')}/{parts.netloc}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+
+def mode() -> str:
+    value = os.environ.get(TRANSPORT_ENV, "live").lower()
+    if value not in MODES:
+        raise ValueError(f"{TRANSPORT_ENV} must be one of {', '.join(MODES)}, not {value!r}")
+    return value
+
+
+def get_cassette() -> Cassette:
+    '''
+    the cassette of this process, opened on first use
+    '''
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette(os.environ.get(CASSETTE_ENV, CASSETTE_PATH))
+        if mode() == "replay":
+            logger.info("Replaying %d recorded responses from %s", len(_cassette), _cassette.path)
+    return _cassette
+
+
+def replay(key: str, url: str, timeout: float) -> Response:
+    '''
+    the recorded response after the simulated latency, raises Timeout when that's longer than timeout
+    '''
+    response = get_cassette().response(key, url)
+    latency = os.environ.get(REPLAY_LATENCY_ENV, "0")
+    seconds = response.elapsed.total_seconds() if latency == "recorded" else float(latency)
+    if seconds > timeout:
+        time.sleep(timeout)
+        raise requests.Timeout(f"Recorded response of {key} took {seconds:.1f}s")
+    time.sleep(seconds)
+    return response
+
+
+def send(method: str, url: str, timeout: float, json: dict | None = None) -> Response:
+    with metrics.span(f"fetch:{urlparse(url).netloc}"):
+        current = mode()
+        key = request_key(method, url, json)
+        if current == "replay":
+            return replay(key, url, timeout)
+
+        response = get_session().request(method, route(url), json=json, timeout=timeout)
+        if current == "record":
+            get_cassette().record(key, response)
+        return response
+
+
+def get(url: str, timeout: float = 10) -> Response:
+    return send("GET", url, timeout)
+
+
+def post(url: str, json: dict, timeout: float = 10) -> Response:
+    return send("POST", url, timeout, json)
+
+
+def warm_up_connections(timeout: float = WARM_UP_TIMEOUT) -> list[threading.Thread]:
+    '''
+    opens a pooled connection to each upstream host in the background so the first lookup doesn't pay for DNS/TLS
+    '''
+    if mode() == "replay":
+        return []
+
+    session = get_session()
+    threads = [
+        threading.Thread(target=pre_open, args=(session, host, timeout), name=f"Warm up {host}", daemon=True)
+        for host in UPSTREAM_HOSTS
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def pre_open(session: requests.Session, host: str, timeout: float) -> None:
+    try:
+        session.head(route(host), timeout=timeout)
+    except RequestException as e:
+        logger.warning("Couldn't pre-open connection to %s: %s", host, e)